@@ -0,0 +1,37 @@
+import datetime
+import time
+from typing import Optional
+
+
+class real_clock:
+    """The wall clock, sleeping blocks the interpreter for the requested time"""
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class virtual_clock:
+    """A clock which returns from sleeps immediately, advancing its time by the time slept.
+
+    Between sleeps time passes at the rate of the wall clock, so programs polling the time still
+    progress. Starting from a fixed start time gives runs a reproducible date."""
+
+    def __init__(self, start: Optional[datetime.datetime] = None) -> None:
+        self.start = start if start is not None else datetime.datetime.now()
+        self.start_monotonic = time.monotonic()
+
+        # Total time slept, skipped rather than waited for
+        self.slept = datetime.timedelta()
+
+    def now(self) -> datetime.datetime:
+        return (
+            self.start
+            + datetime.timedelta(seconds=time.monotonic() - self.start_monotonic)
+            + self.slept
+        )
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += datetime.timedelta(seconds=seconds)
@@ -0,0 +1,570 @@
+import math
+import struct
+from typing import Any, Callable, Optional
+
+from pyopo.opcode_handlers import (
+    qcode_var,
+    qcode_cmp,
+    qcode_maths,
+    qcode_gen,
+    qcode_dialog,
+    qcode_menu,
+)
+from pyopo.var_stack import stack
+from pyopo.heap import WRITERS
+
+from .opcodes import opcode_proc_handler, qcode_not_implemented
+from .decoder import (
+    INSTR_HANDLER,
+    INSTR_OPCODE,
+    INSTR_OPCODE_HINT,
+    INSTR_OPERAND_PC,
+    INSTR_NEXT_PC,
+    INSTR_OPERANDS,
+    constant_value,
+    decode_from,
+    decode_procedure,
+)
+
+import logging
+import logging.config
+
+from .trace import TRACE
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+# Basic block compilation can be disabled globally, or per executable when loading
+COMPILE_BASIC_BLOCKS = True
+
+# Blocks with fewer instructions are left to the interpreter, there is nothing to gain
+MIN_BLOCK_LENGTH = 2
+
+"""
+Basic block compilation is the tier above the decoded instruction stream. A procedure's QCode is split
+into basic blocks, which start at the procedure entry, branch targets and the instruction following a
+branch, and end at a branch (IF, GOTO, VECTOR), a procedure call or return, or an opcode that changes
+the flow of execution (STOP, TRAP and those awaiting the host).
+
+Each block is generated as Python source and compiled into a single function with the signature of an
+opcode handler, which replaces the entry of the first instruction of the block in the instruction
+stream. Values pushed and popped within the block are held in local variables instead of the stack,
+only values left at the end of the block (or before an opcode that is not compiled inline) are pushed.
+Opcodes that are not compiled inline call their original handler.
+
+Instructions that are not the first of a block keep their entries, so execution that resumes part way
+through a block (after a yielding opcode or a trapped error) carries on in the interpreter until the
+next block. While an error is trapped blocks defer to the interpreter, so the error is raised by the
+instruction that caused it.
+"""
+
+STRUCT_FORMAT_INT16 = struct.Struct("<h")
+STRUCT_FORMAT_INT32 = struct.Struct("<i")
+STRUCT_FORMAT_FLOAT64 = struct.Struct("<d")
+
+# Database field addresses are beyond regular heap addresses, see qcode_push_addr_field
+DATABASE_ADDR_BASE = 1024 * 1024
+
+CONSTANT_TYPES = {
+    0x28: 0,
+    0x29: 1,
+    0x2A: 2,
+    0x2B: 3,
+    0x4F: 0,
+    0x5F: 1,
+    0x63: 1,
+}
+
+CONSTANT = {
+    qcode_var.qcode_push_vv_plus,
+    qcode_var.qcode_push_vv_word,
+    qcode_var.qcode_push_vv_long,
+    qcode_var.qcode_push_vv_word_to_long,
+}
+
+COMPARE = {
+    qcode_cmp.qcode_cmp_less_than,
+    qcode_cmp.qcode_cmp_less_than_equal,
+    qcode_cmp.qcode_cmp_greater,
+    qcode_cmp.qcode_cmp_greater_equal,
+    qcode_cmp.qcode_cmp_equals,
+    qcode_cmp.qcode_cmp_not_equals,
+}
+
+# Comparison opcodes 0x30 - 0x47, 4 opcodes (one per type) for each operator
+COMPARE_OPERATORS = ["<", "<=", ">", ">=", "==", "!="]
+
+# Arithmetic opcodes and the first opcode of each, the type is the offset from it
+ARITHMETIC_OPERATORS = {
+    qcode_maths.qcode_cmp_plus: ("+", 0x48),
+    qcode_maths.qcode_cmp_minus: ("-", 0x4C),
+    qcode_maths.qcode_cmp_mult: ("*", 0x50),
+}
+
+# Logical opcodes and the first opcode of each, bitwise for words and longs
+LOGICAL_OPERATORS = {
+    qcode_cmp.qcode_cmp_and: ("&", "and", 0x5C),
+    qcode_cmp.qcode_cmp_or: ("|", "or", 0x60),
+}
+
+CONVERSIONS = {
+    qcode_var.qcode_push_word_pop: (0, "int"),
+    qcode_var.qcode_push_long_pop: (1, "int"),
+    qcode_var.qcode_push_real_pop: (2, "float"),
+}
+
+# Handlers which pop a fixed number of values and push a single value, without any other effect on the
+# stack. They are called with a stack of their own, so the block's values do not need to be pushed.
+PURE_HANDLERS = {
+    qcode_var.qcode_push_var_array: 1,
+    qcode_var.qcode_push_addr_array: 1,
+    qcode_var.qcode_push_ee_array_val: 1,
+    qcode_var.qcode_push_ee_array_addr: 1,
+    qcode_var.qcode_push_value_field: 1,
+    qcode_var.qcode_push_addr_field: 1,
+    qcode_var.qcode_uadd: 2,
+    qcode_var.qcode_usub: 2,
+    qcode_maths.qcode_cmp_div: 2,
+    qcode_maths.qcode_pow: 2,
+}
+
+BRANCHES = {qcode_cmp.qcode_cmp_if, qcode_gen.qcode_goto, qcode_gen.qcode_vector}
+
+# Opcodes after which execution does not simply continue with the following instruction
+TERMINATORS = BRANCHES | set(opcode_proc_handler.values()) | {
+    qcode_gen.qcode_stop,
+    qcode_gen.qcode_trap,
+    qcode_gen.qcode_get,
+    qcode_gen.qcode_get_str,
+    qcode_gen.qcode_pause,
+    qcode_dialog.qcode_dialog,
+    qcode_dialog.qcode_alert,
+    qcode_menu.qcode_menu,
+    qcode_menu.qcode_menu_var,
+}
+
+
+def _execute_handler(
+    procedure, data_stack, handler: Callable, op_code: int, operand_pc: int, *values
+) -> list[tuple[int, Any]]:
+    """Executes a handler against a stack of its own holding values, returning the stack afterwards"""
+    procedure._program_counter = operand_pc
+    procedure._last_executed_opcode = op_code
+
+    handler_stack = stack()
+    handler_stack.stack_frame.extend(values)
+    handler(procedure, data_stack, handler_stack)
+
+    return handler_stack.stack_frame
+
+
+def _branch_targets(instruction: tuple) -> list[int]:
+    """Returns the program counters a branch instruction can jump to"""
+    handler = instruction[INSTR_HANDLER]
+    opcode_pc = instruction[INSTR_OPERAND_PC] - 1
+
+    if handler is qcode_gen.qcode_vector:
+        # Label offsets are relative to the start of the VECTOR opcode
+        _, labels = instruction[INSTR_OPERANDS]
+        return [opcode_pc + label for label in labels]
+
+    # IF and GOTO offsets are relative to the start of the opcode
+    return [opcode_pc + instruction[INSTR_OPERANDS][0]]
+
+
+def find_block_leaders(qcode: bytes, instructions: list[Optional[tuple]]) -> set[int]:
+    """Returns the program counters of the first instruction of each basic block reachable from the
+    procedure entry, decoding instructions as they are found"""
+
+    leaders = set()
+    pending = [0]
+
+    while pending:
+        pc = pending.pop()
+        if pc in leaders or pc < 0 or pc >= len(qcode):
+            continue
+
+        leaders.add(pc)
+
+        while pc is not None and pc < len(qcode):
+            instruction = instructions[pc] or decode_from(qcode, instructions, pc)
+            handler = instruction[INSTR_HANDLER]
+
+            if instruction[INSTR_NEXT_PC] is None:
+                break
+
+            if handler in TERMINATORS:
+                if handler in BRANCHES:
+                    pending.extend(_branch_targets(instruction))
+
+                pending.append(instruction[INSTR_NEXT_PC])
+                break
+
+            pc = instruction[INSTR_NEXT_PC]
+            if pc in leaders:
+                break
+
+    return leaders
+
+
+def _basic_block(
+    instructions: list[Optional[tuple]], pc: int, leaders: set[int]
+) -> list[tuple]:
+    """Returns the instructions of the basic block starting at pc"""
+    block = []
+
+    while pc is not None and pc < len(instructions):
+        instruction = instructions[pc]
+        if (
+            instruction is None
+            or instruction[INSTR_HANDLER] is qcode_not_implemented
+            or instruction[INSTR_NEXT_PC] is None
+        ):
+            break
+
+        block.append(instruction)
+
+        if instruction[INSTR_HANDLER] in TERMINATORS:
+            break
+
+        pc = instruction[INSTR_NEXT_PC]
+        if pc in leaders:
+            break
+
+    return block
+
+
+class BlockCompiler:
+    """Generates the Python source of the basic blocks of a procedure"""
+
+    def __init__(self, parameter_slots: dict[int, int], bytes_strings: bool = False):
+        self.lines: list[str] = []
+
+        # EE references of the procedure's parameters, which are read from the activation
+        self.parameter_slots = parameter_slots
+
+        # Whether string constants are bytes of the Psion character set
+        self.bytes_strings = bytes_strings
+
+        # Objects referenced by the generated source
+        self.namespace: dict[str, Any] = {
+            "unpack_word": STRUCT_FORMAT_INT16.unpack_from,
+            "unpack_long": STRUCT_FORMAT_INT32.unpack_from,
+            "unpack_float": STRUCT_FORMAT_FLOAT64.unpack_from,
+            "execute_handler": _execute_handler,
+        }
+
+        # Values pushed within the block, each a (type, value, is_local_address) tuple of expressions
+        self.values: list[tuple[str, str, bool]] = []
+
+        self.variable_count = 0
+
+    def emit(self, line: str, indent: int = 1) -> None:
+        self.lines.append("    " * indent + line)
+
+    def variable(self) -> str:
+        self.variable_count += 1
+        return f"v{self.variable_count}"
+
+    def reference(self, name: str, obj: Any) -> str:
+        self.namespace[name] = obj
+        return name
+
+    def push(
+        self, value_type, value: str, local_address=False, constant=False
+    ) -> None:
+        """Pushes a value, expressions are evaluated straight away to keep the order of heap accesses"""
+        if not local_address and not constant and not value.isidentifier():
+            variable = self.variable()
+            self.emit(f"{variable} = {value}")
+            value = variable
+
+        self.values.append((str(value_type), value, local_address))
+
+    def pop(self) -> tuple[str, str, bool]:
+        """Pops a value, from the stack if it was not pushed within the block"""
+        if self.values:
+            return self.values.pop()
+
+        value_type = self.variable()
+        value = self.variable()
+        self.emit(f"{value_type}, {value} = stack.pop_with_type()")
+
+        return (value_type, value, False)
+
+    def flush(self) -> None:
+        """Pushes the values held by the block to the stack"""
+        for value_type, value, _ in self.values:
+            self.emit(f"stack.push({value_type}, {value})")
+
+        self.values = []
+
+    def read(self, value_type: int, address: str) -> str:
+        if value_type == 3:
+            return f"read_qstr({address})"
+
+        return f"{['unpack_word', 'unpack_long', 'unpack_float'][value_type]}(memory, {address})[0]"
+
+    def call_handler(self, name: str, instruction: tuple) -> None:
+        """Calls the original handler of an instruction, returning if execution needs to be interrupted"""
+        self.flush()
+
+        self.emit(f"procedure._program_counter = {instruction[INSTR_OPERAND_PC]}")
+        self.emit(f"procedure._last_executed_opcode = {instruction[INSTR_OPCODE]}")
+
+        if instruction[INSTR_HANDLER] in TERMINATORS:
+            self.emit(f"if {name}(procedure, data_stack, stack):")
+            self.emit("return True", 2)
+            self.emit("return procedure.flag_stop")
+        else:
+            self.emit(
+                f"if {name}(procedure, data_stack, stack) or procedure.flag_stop:"
+            )
+            self.emit("return True", 2)
+
+    def compile_instruction(self, name: str, instruction: tuple) -> bool:
+        """Generates the source of an instruction, returning False if the block has been exited"""
+        handler = instruction[INSTR_HANDLER]
+        op_code = instruction[INSTR_OPCODE]
+        operands = instruction[INSTR_OPERANDS]
+        operand_pc = instruction[INSTR_OPERAND_PC]
+
+        if handler is qcode_var.qcode_push_var:
+            self.push(op_code, self.read(op_code, f"fo + {operands[0]}"))
+
+        elif handler is qcode_var.qcode_push_addr:
+            self.push(4, f"fo + {operands[0]}", local_address=True)
+
+        elif handler in CONSTANT:
+            value = constant_value(instruction, self.bytes_strings)
+
+            if isinstance(value, float) and not math.isfinite(value):
+                # Infinity and NaN have no literal
+                self.push(2, self.reference(f"{name}_value", value))
+            else:
+                self.push(CONSTANT_TYPES[op_code], repr(value), constant=True)
+
+        elif (
+            handler is qcode_var.qcode_push_ee_value
+            and operands[0] in self.parameter_slots
+        ):
+            value_type = self.variable()
+            value = self.variable()
+            self.emit(
+                f"{value_type}, {value} = procedure.parameters[{self.parameter_slots[operands[0]]}]"
+            )
+            self.push(value_type, value)
+
+        elif (
+            handler is qcode_var.qcode_push_ee_value
+            or handler is qcode_var.qcode_push_ee_addr
+        ):
+            # Resolved EE references are cached by the procedure, otherwise the handler resolves it
+            offset = self.variable()
+            value = self.variable()
+            self.emit(f"{offset} = ee_cache.get({operands[0]}, -1)")
+            self.emit(f"if {offset} == -1:")
+            self.emit(
+                f"_, {value} = execute_handler(procedure, data_stack, {name}, {op_code}, {operand_pc})[-1]",
+                2,
+            )
+            self.emit("else:")
+
+            if handler is qcode_var.qcode_push_ee_value:
+                value_type = op_code - 0x08
+                self.emit(f"{value} = {self.read(value_type, offset)}", 2)
+            else:
+                value_type = 4
+                self.emit(f"{value} = {offset}", 2)
+
+            self.push(value_type, value)
+
+        elif handler in PURE_HANDLERS:
+            values = [self.pop() for _ in range(PURE_HANDLERS[handler])]
+            values.reverse()
+
+            value_type = self.variable()
+            value = self.variable()
+            arguments = "".join(f", ({t}, {v})" for t, v, _ in values)
+            self.emit(
+                f"{value_type}, {value} = execute_handler(procedure, data_stack, {name}, {op_code}, {operand_pc}{arguments})[-1]"
+            )
+            self.push(value_type, value)
+
+        elif handler in COMPARE:
+            _, b, _ = self.pop()
+            _, a, _ = self.pop()
+            operator = COMPARE_OPERATORS[(op_code - 0x30) // 4]
+            self.push(0, f"-1 if {a} {operator} {b} else 0")
+
+        elif handler in ARITHMETIC_OPERATORS:
+            operator, base_op_code = ARITHMETIC_OPERATORS[handler]
+            _, b, _ = self.pop()
+            _, a, _ = self.pop()
+            self.push(op_code - base_op_code, f"{a} {operator} {b}")
+
+        elif handler is qcode_maths.qcode_negate:
+            _, a, _ = self.pop()
+            self.push(op_code - 0x68, f"-{a}")
+
+        elif handler in LOGICAL_OPERATORS:
+            bitwise, logical, base_op_code = LOGICAL_OPERATORS[handler]
+            _, b, _ = self.pop()
+            _, a, _ = self.pop()
+
+            if op_code - base_op_code < 2:
+                self.push(0, f"int({a}) {bitwise} int({b})")
+            else:
+                self.push(0, f"-1 if ({a} != 0 {logical} {b} != 0) else 0")
+
+        elif handler is qcode_cmp.qcode_cmp_not:
+            _, a, _ = self.pop()
+
+            if op_code - 0x64 < 2:
+                self.push(0, f"~int({a})")
+            else:
+                self.push(0, f"-1 if {a} == 0 else 0")
+
+        elif handler in CONVERSIONS:
+            value_type, conversion = CONVERSIONS[handler]
+            _, a, _ = self.pop()
+            self.push(value_type, f"{conversion}({a})")
+
+        elif handler is qcode_var.qcode_pop_discard:
+            self.pop()
+
+        elif handler is qcode_var.qcode_store_pop1_in_pop2:
+            value_type, value, _ = self.pop()
+            _, address, local_address = self.pop()
+            store_type = op_code - 0x84
+
+            if local_address:
+                self.emit(
+                    f"data_stack.{WRITERS[store_type].__name__}({value}, {address})"
+                )
+            else:
+                # Database fields are stored by the handler
+                self.emit(f"if {address} < {DATABASE_ADDR_BASE}:")
+                self.emit(
+                    f"data_stack.{WRITERS[store_type].__name__}({value}, {address})", 2
+                )
+                self.emit("else:")
+                self.emit(
+                    f"execute_handler(procedure, data_stack, {name}, {op_code}, {operand_pc}, (4, {address}), ({value_type}, {value}))",
+                    2,
+                )
+
+        elif handler is qcode_cmp.qcode_cmp_if:
+            _, condition, _ = self.pop()
+            self.flush()
+
+            (target,) = _branch_targets(instruction)
+            self.emit(f"if {condition} == 0:")
+            self.emit(f"procedure._program_counter = {target}", 2)
+            self.emit("else:")
+            self.emit(
+                f"procedure._program_counter = {instruction[INSTR_NEXT_PC]}", 2
+            )
+            self.emit("return False")
+            return False
+
+        elif handler is qcode_gen.qcode_goto:
+            self.flush()
+
+            (target,) = _branch_targets(instruction)
+            self.emit(f"procedure._program_counter = {target}")
+            self.emit("return False")
+            return False
+
+        else:
+            self.call_handler(name, instruction)
+            return handler not in TERMINATORS
+
+        return True
+
+    def compile_block(
+        self, function_name: str, block: list[tuple], interpreted: Callable
+    ) -> None:
+        """Generates the function of a basic block"""
+        self.values = []
+
+        interpreted_name = self.reference(f"{function_name}_interpreted", interpreted)
+
+        self.emit(f"def {function_name}(procedure, data_stack, stack):", 0)
+        self.emit("if procedure._op_code_trapped:")
+        self.emit(f"return {interpreted_name}(procedure, data_stack, stack)", 2)
+        self.emit("memory = data_stack.memory")
+        self.emit("read_qstr = data_stack.read_qstr")
+        self.emit("fo = procedure.data_stack_frame_offset")
+        self.emit("ee_cache = procedure.ee_dsf_cache")
+
+        for index, instruction in enumerate(block):
+            name = self.reference(
+                f"{function_name}_handler_{index}", instruction[INSTR_HANDLER]
+            )
+
+            if not self.compile_instruction(name, instruction):
+                break
+        else:
+            # Fall through to the following block
+            self.flush()
+            self.emit(f"procedure._program_counter = {block[-1][INSTR_NEXT_PC]}")
+            self.emit("return False")
+
+        self.emit("", 0)
+
+
+def compile_procedure(procedure: dict, bytes_strings: bool = False) -> int:
+    """Compiles the basic blocks of a procedure into its instruction stream, string constants are
+    bytes if bytes_strings.
+
+    Returns the number of blocks compiled"""
+
+    qcode = procedure["qcode"]
+    instructions = procedure["instructions"]
+
+    # Blocks are compiled from the original instructions rather than any superinstructions
+    decoded = decode_procedure(qcode)
+    leaders = find_block_leaders(qcode, decoded)
+
+    compiler = BlockCompiler(procedure["parameter_slots"], bytes_strings)
+    compiled = []
+
+    for pc in sorted(leaders):
+        block = _basic_block(decoded, pc, leaders)
+        if len(block) < MIN_BLOCK_LENGTH:
+            continue
+
+        interpreted = (instructions[pc] or decode_from(qcode, instructions, pc))[
+            INSTR_HANDLER
+        ]
+
+        function_name = f"block_{pc}"
+        compiler.compile_block(function_name, block, interpreted)
+        compiled.append((pc, function_name, block))
+
+    if not compiled:
+        return 0
+
+    source = "\n".join(compiler.lines)
+    exec(
+        compile(source, f"<{procedure['name']} basic blocks>", "exec"),
+        compiler.namespace,
+    )
+
+    for pc, function_name, block in compiled:
+        first = block[0]
+        instructions[pc] = (
+            compiler.namespace[function_name],
+            first[INSTR_OPCODE],
+            first[INSTR_OPCODE_HINT],
+            first[INSTR_OPERAND_PC],
+            None,
+            ("block", len(block)),
+        )
+
+    if TRACE:
+        _logger.debug(f"Compiled {len(compiled)} basic blocks of {procedure['name']}")
+
+    return len(compiled)
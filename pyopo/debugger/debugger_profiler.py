@@ -1,3 +1,4 @@
+from array import array
 from typing import Optional
 from pygame.locals import *
 import logging
@@ -7,23 +8,71 @@ logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
+# Opcode sections, the primary opcodes and those prefixed by 0x57, 0xED and 0xFF
+PROFILING_SECTIONS = [0x00, 0x57, 0xED, 0xFF]
+
+# Timings are bucketed by powers of 2 nanoseconds, the last bucket holds everything above 2^30ns (~1s)
+HISTOGRAM_BUCKETS = 32
+
+NS_PER_SECOND = 1_000_000_000
+
 
 class DebuggerProfiler:
+    """Per-opcode timing counters, preallocated so the profiler does not grow however long it runs"""
+
     def __init__(self) -> None:
-        self.profiling_sections = {0x00: {}, 0x57: {}, 0xED: {}, 0xFF: {}}
+        counters = len(PROFILING_SECTIONS) * 256
+
+        self.section_index = {
+            section: index * 256 for index, section in enumerate(PROFILING_SECTIONS)
+        }
+
+        # Indexed by section offset + opcode
+        self.counts = array("Q", bytes(8 * counters))
+        self.total_ns = array("Q", bytes(8 * counters))
+        self.min_ns = array("Q", [2**64 - 1]) * counters
+        self.max_ns = array("Q", bytes(8 * counters))
+
+        # Indexed by (section offset + opcode) * HISTOGRAM_BUCKETS + bucket
+        self.histogram = array("Q", bytes(8 * counters * HISTOGRAM_BUCKETS))
 
     def store_timing(
-        self, timing: float, opcode: int, opcode_subsection: Optional[int]
+        self, timing_ns: int, opcode: int, opcode_subsection: Optional[int]
     ) -> None:
-        self.profiling_sections[
-            0x00 if not opcode_subsection else opcode_subsection
-        ].setdefault(opcode, []).append(timing)
+        index = self.section_index[opcode_subsection or 0x00] + opcode
+
+        self.counts[index] += 1
+        self.total_ns[index] += timing_ns
+
+        if timing_ns < self.min_ns[index]:
+            self.min_ns[index] = timing_ns
+        if timing_ns > self.max_ns[index]:
+            self.max_ns[index] = timing_ns
+
+        bucket = min(timing_ns.bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.histogram[index * HISTOGRAM_BUCKETS + bucket] += 1
 
     def dump_timings(self) -> None:
-        for section in self.profiling_sections:
-            for opcode in self.profiling_sections[section]:
-                total_time = sum(self.profiling_sections[section][opcode])
-                samples = len(self.profiling_sections[section][opcode])
+        for section in PROFILING_SECTIONS:
+            for opcode in range(256):
+                index = self.section_index[section] + opcode
+
+                samples = self.counts[index]
+                if samples == 0:
+                    continue
+
+                total_time = self.total_ns[index] / NS_PER_SECOND
+
+                # Histogram buckets are reported by their upper bound in ns
+                histogram = " ".join(
+                    f"<{2**bucket}:{self.histogram[index * HISTOGRAM_BUCKETS + bucket]}"
+                    if bucket < HISTOGRAM_BUCKETS - 1
+                    else f">={2**(bucket - 1)}:{self.histogram[index * HISTOGRAM_BUCKETS + bucket]}"
+                    for bucket in range(HISTOGRAM_BUCKETS)
+                    if self.histogram[index * HISTOGRAM_BUCKETS + bucket]
+                )
+
                 _logger.critical(
-                    f"{hex(section).upper()}, {hex(opcode).upper()}, {samples}, {total_time:.6f}, {total_time / samples:.6f}"
+                    f"{hex(section).upper()}, {hex(opcode).upper()}, {samples}, {total_time:.6f}, {total_time / samples:.6f}, "
+                    f"{self.min_ns[index] / NS_PER_SECOND:.6f}, {self.max_ns[index] / NS_PER_SECOND:.6f}, {histogram}"
                 )
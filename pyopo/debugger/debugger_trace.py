@@ -0,0 +1,27 @@
+import json
+import time
+from typing import IO
+import logging
+import logging.config
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+
+class DebuggerTrace:
+    """Structured execution trace, one JSON object per line for each interpreter event (procedure
+    calls and returns, key presses and stops). Separate to logging so it can be enabled on its own."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self.stream = stream
+        self.start_ns = time.perf_counter_ns()
+
+    def event(self, event: str, **fields) -> None:
+        fields["event"] = event
+        fields["t_ns"] = time.perf_counter_ns() - self.start_ns
+
+        self.stream.write(json.dumps(fields) + "\n")
+
+    def close(self) -> None:
+        self.stream.flush()
@@ -0,0 +1,260 @@
+import struct
+from typing import Any, Callable, Optional
+
+from pyopo.opcode_handlers import (
+    qcode_var,
+    qcode_cmp,
+    qcode_gen,
+    qcode_graphics,
+    qcode_dbf,
+    qcode_dialog,
+    qcode_menu,
+    qcode_kernel,
+    qcode_screen,
+    qcode_proc,
+)
+
+from .opcodes import opcode_table, opcode_prefix_tables, qcode_not_implemented
+from .loader import QSTR_ENCODING, qstr_value
+
+import logging
+import logging.config
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+"""
+A procedure's QCode is decoded once into an instruction stream, a list indexed by program counter
+where each instruction start holds a tuple of:
+
+    (handler, op_code, opcode_hint, operand_pc, next_pc, operands)
+
+    handler     - The opcode handler function, qcode_not_implemented if the opcode is not implemented
+    op_code     - The opcode (or sub opcode for 0x57, 0xED and 0xFF prefixed opcodes)
+    opcode_hint - The prefix byte of sub opcodes, None otherwise
+    operand_pc  - The program counter of the first operand byte, handlers read their operands from here
+    next_pc     - The program counter of the following instruction, None if it can not be determined
+    operands    - The pre-read operands of the instruction
+
+Pre-decoding only removes the opcode fetch and dispatch from the interpreter loop. Handlers are not
+passed the decoded operands, they still read them from the QCode through the procedure's read_qcode_*
+methods starting at operand_pc, so the decoded operands and next_pc are informational. They are used
+by the optimisation passes (superinstruction fusion and basic block compilation), which do consume
+them, and by tooling. Decoding an instruction only depends on the
+bytes at its own program counter, so an entry at a real instruction start is always correct even if a
+linear sweep has lost synchronisation. Offsets that have not been decoded are None, and are decoded
+on demand by decode_from.
+"""
+
+# Decoded instruction fields
+INSTR_HANDLER = 0
+INSTR_OPCODE = 1
+INSTR_OPCODE_HINT = 2
+INSTR_OPERAND_PC = 3
+INSTR_NEXT_PC = 4
+INSTR_OPERANDS = 5
+
+STRUCT_FORMAT_UINT16 = struct.Struct("<H")
+
+# VV+ constant formats for Word, Long and Float
+VV_PLUS_FORMATS = [struct.Struct("<h"), struct.Struct("<i"), struct.Struct("<d")]
+
+
+def _read_qstr_operand(qcode: bytes, offset: int) -> tuple[str, int]:
+    """Reads a QStr operand, returning it and the offset following it"""
+    l = qcode[offset]
+    return (
+        bytes(qcode[offset + 1 : offset + 1 + l]).decode(QSTR_ENCODING),
+        offset + 1 + l,
+    )
+
+
+def _read_vv_plus_operands(
+    qcode: bytes, op_code: int, operand_pc: int
+) -> tuple[tuple[Any, ...], int]:
+    # 0x28 - 0x2B push+ VV+, the constant is in the format of the opcode type
+    if op_code == 0x2B:
+        value, next_pc = _read_qstr_operand(qcode, operand_pc)
+        return ((value,), next_pc)
+
+    fmt = VV_PLUS_FORMATS[op_code - 0x28]
+    return (fmt.unpack_from(qcode, operand_pc), operand_pc + fmt.size)
+
+
+def _read_vector_operands(
+    qcode: bytes, op_code: int, operand_pc: int
+) -> tuple[tuple[Any, ...], int]:
+    # 0xAB VECTOR, a label count followed by a uint16 offset per label
+    label_count = STRUCT_FORMAT_UINT16.unpack_from(qcode, operand_pc)[0]
+    labels = struct.unpack_from(f"<{label_count}H", qcode, operand_pc + 2)
+    return ((label_count, labels), operand_pc + 2 + 2 * label_count)
+
+
+def _read_dbf_field_operands(
+    qcode: bytes, op_code: int, operand_pc: int
+) -> tuple[tuple[Any, ...], int]:
+    # OPEN / CREATE, the D byte followed by type code and QStr field pairs, terminated by 0xFF
+    d = qcode[operand_pc]
+    offset = operand_pc + 1
+
+    fields = []
+    while qcode[offset] != 0xFF:
+        type_code = qcode[offset]
+        type_name, offset = _read_qstr_operand(qcode, offset + 1)
+        fields.append((type_code, type_name))
+
+    return ((d, tuple(fields)), offset + 1)
+
+
+# Operand formats of handlers which read operands from the QCode, either a precompiled struct or a
+# reader function for variable length operands. Handlers not listed take no operands.
+OPERAND_FORMATS: dict[Callable, struct.Struct | Callable] = {
+    qcode_var.qcode_push_var: struct.Struct("<H"),
+    qcode_var.qcode_push_addr: struct.Struct("<H"),
+    qcode_var.qcode_push_ee_value: struct.Struct("<H"),
+    qcode_var.qcode_push_ee_addr: struct.Struct("<H"),
+    qcode_var.qcode_push_var_array: struct.Struct("<H"),
+    qcode_var.qcode_push_addr_array: struct.Struct("<H"),
+    qcode_var.qcode_push_ee_array_val: struct.Struct("<H"),
+    qcode_var.qcode_push_ee_array_addr: struct.Struct("<H"),
+    qcode_var.qcode_push_value_field: struct.Struct("<B"),
+    qcode_var.qcode_push_addr_field: struct.Struct("<B"),
+    qcode_var.qcode_push_vv_plus: _read_vv_plus_operands,
+    qcode_var.qcode_push_vv_word: struct.Struct("<B"),
+    qcode_var.qcode_push_vv_long: struct.Struct("<B"),
+    qcode_var.qcode_push_vv_word_to_long: struct.Struct("<H"),
+    qcode_cmp.qcode_cmp_if: struct.Struct("<h"),
+    qcode_cmp.qcode_max: struct.Struct("<B"),
+    qcode_cmp.qcode_min: struct.Struct("<B"),
+    qcode_cmp.qcode_mean: struct.Struct("<B"),
+    qcode_cmp.qcode_std: struct.Struct("<B"),
+    qcode_cmp.qcode_sum: struct.Struct("<B"),
+    qcode_cmp.qcode_var: struct.Struct("<B"),
+    qcode_gen.qcode_goto: struct.Struct("<h"),
+    qcode_gen.qcode_vector: _read_vector_operands,
+    qcode_gen.qcode_onerr: struct.Struct("<h"),
+    qcode_gen.qcode_giprint: struct.Struct("<B"),
+    qcode_gen.qcode_cache: struct.Struct("<B"),
+    qcode_gen.qcode_escape: struct.Struct("<B"),
+    qcode_gen.qcode_lock: struct.Struct("<B"),
+    qcode_gen.qcode_busy: struct.Struct("<B"),
+    qcode_gen.qcode_statuswin: struct.Struct("<B"),
+    qcode_gen.qcode_diaminit: struct.Struct("<B"),
+    qcode_graphics.qcode_gsetwin: struct.Struct("<B"),
+    qcode_graphics.qcode_gborder: struct.Struct("<B"),
+    qcode_graphics.qcode_gprintb: struct.Struct("<B"),
+    qcode_graphics.qcode_gupdate: struct.Struct("<B"),
+    qcode_graphics.qcode_gclock: struct.Struct("<B"),
+    qcode_graphics.qcode_gvisible: struct.Struct("<B"),
+    qcode_graphics.qcode_gloadbit: struct.Struct("<B"),
+    qcode_graphics.qcode_gxborder: struct.Struct("<B"),
+    qcode_graphics.qcode_gscroll: struct.Struct("<B"),
+    qcode_graphics.qcode_appendsprite: struct.Struct("<B"),
+    qcode_graphics.qcode_gsavebit: struct.Struct("<B"),
+    qcode_dbf.qcode_open: _read_dbf_field_operands,
+    qcode_dbf.qcode_create: _read_dbf_field_operands,
+    qcode_dbf.qcode_use: struct.Struct("<B"),
+    qcode_dialog.qcode_dinit: struct.Struct("<B"),
+    qcode_dialog.qcode_dtext: struct.Struct("<B"),
+    qcode_dialog.qcode_dbuttons: struct.Struct("<B"),
+    qcode_dialog.qcode_alert: struct.Struct("<B"),
+    qcode_menu.qcode_mcard: struct.Struct("<B"),
+    qcode_kernel.qcode_OS: struct.Struct("<B"),
+    qcode_kernel.qcode_call: struct.Struct("<B"),
+    qcode_screen.qcode_cursor: struct.Struct("<B"),
+    qcode_proc.qcode_call_proc: struct.Struct("<H"),
+    qcode_proc.qcode_call_proc_at: struct.Struct("<BB"),
+}
+
+
+def constant_value(instruction: tuple, bytes_strings: bool = False):
+    """Returns the constant pushed by a VV instruction, as the handler would push it"""
+    op_code = instruction[INSTR_OPCODE]
+    value = instruction[INSTR_OPERANDS][0]
+
+    if op_code == 0x4F or op_code == 0x5F:
+        # VV! byte, sign extended to a word or long
+        return value - 0x100 if value >= 0x80 else value
+    elif op_code == 0x63:
+        # VV% word, sign extended to a long
+        return value - 0x10000 if value >= 0x8000 else value
+    elif op_code == 0x2B:
+        # VV+ string, held as text in the decoded instruction
+        return qstr_value(value, bytes_strings)
+
+    # VV+ in the type of the opcode
+    return value
+
+
+def decode_instruction(qcode: bytes, pc: int) -> tuple:
+    """Decodes the instruction starting at the program counter"""
+
+    op_code = qcode[pc]
+    opcode_hint = None
+    operand_pc = pc + 1
+
+    prefix_table = opcode_prefix_tables.get(op_code)
+    if prefix_table is not None:
+        if operand_pc >= len(qcode):
+            # Truncated sub opcode
+            return (qcode_not_implemented, op_code, None, operand_pc, None, ())
+
+        opcode_hint = op_code
+        op_code = qcode[operand_pc]
+        operand_pc += 1
+
+        handler = prefix_table[op_code]
+    else:
+        handler = opcode_table[op_code]
+
+    if handler is qcode_not_implemented:
+        # The length of the instruction is unknown
+        return (handler, op_code, opcode_hint, operand_pc, None, ())
+
+    operand_format = OPERAND_FORMATS.get(handler)
+
+    try:
+        if operand_format is None:
+            operands = ()
+            next_pc = operand_pc
+        elif isinstance(operand_format, struct.Struct):
+            operands = operand_format.unpack_from(qcode, operand_pc)
+            next_pc = operand_pc + operand_format.size
+        else:
+            operands, next_pc = operand_format(qcode, op_code, operand_pc)
+    except (struct.error, IndexError):
+        # The operands run past the end of the QCode
+        operands = ()
+        next_pc = None
+
+    return (handler, op_code, opcode_hint, operand_pc, next_pc, operands)
+
+
+def decode_from(qcode: bytes, instructions: list[Optional[tuple]], pc: int) -> tuple:
+    """Decodes instructions from the program counter onwards, following the fall through path until
+    the end of the QCode, an already decoded instruction or an instruction of unknown length.
+
+    Returns the instruction at the program counter"""
+
+    qcode_len = len(qcode)
+    offset = pc
+
+    while offset is not None and offset < qcode_len and instructions[offset] is None:
+        instruction = decode_instruction(qcode, offset)
+        instructions[offset] = instruction
+
+        offset = instruction[INSTR_NEXT_PC]
+
+    return instructions[pc]
+
+
+def decode_procedure(qcode: bytes) -> list[Optional[tuple]]:
+    """Decodes the QCode of a procedure into its instruction stream"""
+
+    instructions = [None] * len(qcode)
+
+    if len(qcode) > 0:
+        decode_from(qcode, instructions, 0)
+
+    return instructions
@@ -9,6 +9,8 @@ from dataclasses import dataclass
 import logging
 import logging.config
 
+from .trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -103,15 +105,17 @@ class dbf:
         self.current_record_index = 0
 
     def load(self) -> None:
-        _logger.debug(f" - Loading DBF File: {self.translated_Filename}")
+        if TRACE:
+            _logger.debug(f" - Loading DBF File: {self.translated_Filename}")
         with open(self.translated_Filename, "rb") as file:
             self.binary = file.read()
 
         self.header = dbf_header.from_bytes(self.binary)
         self.records = self.read_records()
 
-        _logger.debug(json.dumps(self.header, indent=2))
-        _logger.debug(json.dumps(self.records, indent=2))
+        if TRACE:
+            _logger.debug(json.dumps(self.header, indent=2))
+            _logger.debug(json.dumps(self.records, indent=2))
 
         input()
 
@@ -150,11 +154,13 @@ class dbf:
         data_portion_size_binary = format(data_portion_size, "016b")
         data_record_type_binary = format(data_record_type, "08b")
 
-        _logger.debug(data_portion_size_binary)
-        _logger.debug(data_record_type_binary)
+        if TRACE:
+            _logger.debug(data_portion_size_binary)
+            _logger.debug(data_record_type_binary)
 
         header = data_record_type_binary[-4:] + data_portion_size_binary[-12:]
-        _logger.debug(header)
+        if TRACE:
+            _logger.debug(header)
 
         header_bytes = self.bitstring_to_bytes(header)
 
@@ -189,8 +195,9 @@ class dbf:
             record["data_size"] = int("0000" + header_bits[4:15], 2)
             record["data_record_type"] = int("0000" + header_bits[0:3], 2)
 
-            _logger.debug(f"Data Size: {record['data_size']}")
-            _logger.debug(f"Data Type: {record['data_record_type']}")
+            if TRACE:
+                _logger.debug(f"Data Size: {record['data_size']}")
+                _logger.debug(f"Data Type: {record['data_record_type']}")
 
             record["record_data_bytes"] = self.binary[offset + 2 : record["data_size"]]
 
@@ -203,7 +210,8 @@ class dbf:
             # Field Information Record
 
             for b in len(record["record_data_bytes"]):
-                _logger.debug(record["record_data_bytes"][b])
+                if TRACE:
+                    _logger.debug(record["record_data_bytes"][b])
                 pass
 
             pass
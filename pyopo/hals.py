@@ -1,4 +1,5 @@
 import datetime
+from typing import Optional
 from pygame.locals import *
 
 
@@ -18,17 +19,23 @@ class hal:
     def iowaitstat(self, status_handle):
         raise NotImplementedError()
 
+    def next_deadline(self) -> Optional[float]:
+        """Returns the seconds until the HAL next needs processing, None if it is not waiting on time"""
+        return None
+
 
 class hal_tim(hal):
     """
     S3 Timers operate at 10Hz
     https://www.fogma.co.uk/prosoft/oplzone/s3/OSCalls.txt
 
+    Timers run on the executable's clock.
     """
 
-    def __init__(self, data_stack):
+    def __init__(self, data_stack, clock):
         super().__init__(data_stack)
         self._timers = {}
+        self._clock = clock
 
     def get_identifier(self) -> str:
         return "TIM:"
@@ -36,7 +43,7 @@ class hal_tim(hal):
     def process_io(self) -> None:
         timers_to_remove = []
         for timer in self._timers.values():
-            if timer["end_datetime"] > datetime.datetime.now():
+            if timer["end_datetime"] > self._clock.now():
                 # Timer has now completed
                 self._data_stack.write(0, timer["expire"], timer["var_dsf_addr"])
 
@@ -46,7 +53,7 @@ class hal_tim(hal):
                 timers_to_remove.append(timer)
             else:
                 current_val = (
-                    datetime.datetime.now() - timer["start_dateime"]
+                    self._clock.now() - timer["start_dateime"]
                 ).seconds * 10
 
                 self._data_stack.write(0, current_val, timer["var_dsf_addr"])
@@ -79,11 +86,26 @@ class hal_tim(hal):
             "var_dsf_addr": dsf_addr,
             "value": 0,
             "expire": expire,
-            "start_datetime": datetime.datetime.now(),
-            "end_datetime": datetime.datetime.now()
+            "start_datetime": self._clock.now(),
+            "end_datetime": self._clock.now()
             + datetime.timedelta(seconds=delta_seconds),
             "signal": -46,  # Start off with initial signal
         }
 
     def has_handle(self, status_handle: int) -> bool:
         return status_handle in self._timers
+
+    def next_deadline(self) -> Optional[float]:
+        if not self._timers:
+            return None
+
+        # Expired timers do not change over time, only pending ones need a wake up
+        now = self._clock.now()
+        return min(
+            (
+                (timer["end_datetime"] - now).total_seconds()
+                for timer in self._timers.values()
+                if timer["end_datetime"] > now
+            ),
+            default=None,
+        )
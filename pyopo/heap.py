@@ -1,6 +1,9 @@
 from typing import Optional, Any, Self
+import mmap
 import struct
 
+from .loader import QSTR_ENCODING, qstr_text
+
 # Debuggers
 from .debugger.debugger_dsf import DebuggerDSF
 from .debugger.debugger_profiler import DebuggerProfiler
@@ -13,6 +16,24 @@ logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
+# Bytes at the start of the heap reserved for the procedure frame stack, the rest serves ALLOC. Both
+# frame and ALLOC addresses are handed to programs as int16, so the ALLOC region must start low
+FRAME_STACK_SIZE = 8 * 1024
+
+# Programs hold heap addresses in int16 values, so the heap spans at most the 16 bit address space.
+# As on the Psion, addresses from 32K up are held as negative values
+MAX_HEAP_SIZE = 64 * 1024
+
+
+def to_int16_address(offset: int) -> int:
+    """Returns a heap offset as the int16 value a program holds it in"""
+    return ((offset + 0x8000) & 0xFFFF) - 0x8000
+
+
+def to_heap_offset(address: int) -> int:
+    """Returns the heap offset of an address a program holds as an int16 value"""
+    return address & 0xFFFF
+
 
 class free_block:
     """Meta class to store locations of contiguous sections of free memory in the heap"""
@@ -39,31 +60,221 @@ class data_frame:
 
 
 class data_stack:
-    def __init__(self, size: int, debugger: Optional[DebuggerDSF] = None):
+    """The heap, holding procedure frames and ALLOC blocks.
+
+    Procedure frames are strictly last in first out, they are pushed to and popped from a frame stack
+    at the start of the heap by moving its top. ALLOC blocks are allocated from the rest of the heap,
+    as are frames once the frame stack is full.
+
+    A growable heap is extended when an allocation does not fit. The memory is a bytearray, or a
+    shared memory map of the backing file if given so other processes can inspect the heap live.
+
+    Free blocks are kept in segregated free lists by size class (the bit length of their size), and
+    indexed by start and end offset so freed blocks are coalesced with their free neighbours. ALLOC
+    blocks are indexed by start offset, so freeing a block does not search the heap."""
+
+    def __init__(
+        self,
+        size: int,
+        debugger: Optional[DebuggerDSF] = None,
+        frame_stack_size: Optional[int] = None,
+        growable: bool = False,
+        backing_file: Optional[str] = None,
+        bytes_strings: bool = False,
+    ):
         # Cache struct pack
         self._struct_unpacker_uint16 = struct.Struct("<H")
         self._struct_unpacker_int16 = struct.Struct("<h")
         self._struct_unpacker_float = struct.Struct("<d")
         self._struct_unpacker_long = struct.Struct("<i")
 
-        self.free_blocks: list[free_block] = [free_block(start=0, length=size)]
-        self.frames: list[data_frame] = []
+        # Bound accessors, pack_into writes in place without allocating the packed bytes and both
+        # are correct for unaligned offsets (unlike typed memoryview casts)
+        self._unpack_int16 = self._struct_unpacker_int16.unpack_from
+        self._unpack_long = self._struct_unpacker_long.unpack_from
+        self._unpack_float = self._struct_unpacker_float.unpack_from
+        self._unpack_uint16 = self._struct_unpacker_uint16.unpack_from
+        self._pack_int16 = self._struct_unpacker_int16.pack_into
+        self._pack_long = self._struct_unpacker_long.pack_into
+        self._pack_float = self._struct_unpacker_float.pack_into
+        self._pack_uint16 = self._struct_unpacker_uint16.pack_into
+
+        if size > MAX_HEAP_SIZE:
+            raise ValueError(
+                f"Heap size {size} exceeds the 16 bit address space ({MAX_HEAP_SIZE} bytes)"
+            )
+
+        if frame_stack_size is None:
+            frame_stack_size = min(FRAME_STACK_SIZE, size)
+
+        # The frame stack, the start offset of each pushed frame and the offset of the next frame
+        self.frame_stack_size = frame_stack_size
+        self.frame_stack: list[int] = []
+        self.frame_stack_top = 0
+
+        # Free blocks by start offset and by end offset (exclusive), for coalescing
+        self.free_blocks: dict[int, free_block] = {}
+        self.free_block_ends: dict[int, free_block] = {}
+
+        # Free blocks by size class, blocks of size class n are 2^(n-1) to 2^n - 1 bytes long
+        self.size_classes: list[dict[int, free_block]] = [
+            {} for _ in range(size.bit_length() + 1)
+        ]
+        if size > frame_stack_size:
+            self._add_free_block(frame_stack_size, size - frame_stack_size)
+
+        # Allocated (ALLOC) blocks by start offset
+        self.frames: dict[int, data_frame] = {}
 
         # Underlying memory
-        self.memory = bytearray(size)
+        self.size = size
+        self.growable = growable
+        self.backing_file = backing_file
+
+        if backing_file:
+            with open(backing_file, "w+b") as f:
+                f.truncate(size)
+                self.memory = mmap.mmap(f.fileno(), size)
+        else:
+            self.memory = bytearray(size)
 
         self.debugger = debugger
 
-    def allocate_frame(self, size: int) -> int:
-        """Allocates a section of specified size in the heap.
+        # Whether QStrs are read as bytes of the Psion character set rather than decoded text
+        self.bytes_strings = bytes_strings
+
+    def grow(self, size: int) -> None:
+        """Grows the heap to size bytes, at most MAX_HEAP_SIZE, the added memory is free for
+        allocation"""
+        size = min(size, MAX_HEAP_SIZE)
+        if size <= self.size:
+            return
+
+        _logger.info(f"Growing heap from {self.size} to {size} bytes")
+
+        # Both grow in place, references to the memory remain valid
+        if isinstance(self.memory, mmap.mmap):
+            self.memory.resize(size)
+        else:
+            self.memory.extend(bytes(size - self.size))
+
+        self.size_classes.extend(
+            {} for _ in range(size.bit_length() + 1 - len(self.size_classes))
+        )
+
+        added_start = self.size
+        self.size = size
+        self._release_block(added_start, size - added_start)
+
+    def push_frame(self, size: int, image: Optional[bytes] = None) -> int:
+        """Pushes a procedure frame of the specified size to the frame stack, initialised to the image
+        if given and zeroed otherwise.
+
+        Returns the start offset of the frame"""
+        # Every frame occupies at least a byte, so frames on the frame stack start below its end
+        size = max(size, 1)
+
+        start = self.frame_stack_top
+        end = start + size
+
+        if end > self.frame_stack_size:
+            # Frames beyond the frame stack are allocated from the heap, and freed when popped
+            start = self.allocate_frame(size, image)
+            self.frame_stack.append(start)
+            return start
+
+        if self.debugger:
+            self.debugger.store_alloc_block(start, end)
+
+        self.frame_stack.append(start)
+        self.frame_stack_top = end
+
+        # Reinitialise the frame
+        if image is None:
+            image = bytes(size)
+
+        self.memory[start : start + len(image)] = image
+
+        return start
+
+    def pop_frame(self, offset: int) -> None:
+        """Pops the procedure frame starting at the offset from the frame stack, along with any frames
+        pushed after it"""
+        if not self.frame_stack or self.frame_stack[-1] != offset:
+            if offset not in self.frame_stack:
+                _logger.warning(
+                    f"Frame not found on the frame stack, Offset: {offset}"
+                )
+                return
+
+            while self.frame_stack[-1] != offset:
+                _logger.warning(
+                    f"Popping frame {self.frame_stack[-1]} left on the stack"
+                )
+                self.pop_frame(self.frame_stack[-1])
+
+        self.frame_stack.pop()
+
+        if offset >= self.frame_stack_size:
+            # Allocated from the heap once the frame stack was full
+            self.free_frame(offset)
+            return
+
+        if self.debugger:
+            self.debugger.free_alloc_block(offset, self.frame_stack_top)
+            self.debugger.free_proc_vars(offset, self.frame_stack_top)
+
+        self.frame_stack_top = offset
+
+    def _add_free_block(self, start: int, length: int) -> None:
+        block = free_block(start=start, length=length)
+
+        self.free_blocks[start] = block
+        self.free_block_ends[start + length] = block
+        self.size_classes[length.bit_length()][start] = block
+
+    def _remove_free_block(self, block: free_block) -> None:
+        del self.free_blocks[block.start]
+        del self.free_block_ends[block.start + block.length]
+        del self.size_classes[block.length.bit_length()][block.start]
+
+    def _find_free_block(self, size: int) -> Optional[free_block]:
+        """Returns a free block of at least size bytes, from the smallest size class possible"""
+        size_class = size.bit_length()
+        if size_class >= len(self.size_classes):
+            # Larger than the heap
+            return None
+
+        # Blocks of the size's own class may be smaller than it
+        for block in self.size_classes[size_class].values():
+            if block.length >= size:
+                return block
+
+        # Any block of a larger class fits
+        for size_class in range(size_class + 1, len(self.size_classes)):
+            if self.size_classes[size_class]:
+                return next(iter(self.size_classes[size_class].values()))
+
+        return None
+
+    def allocate_frame(self, size: int, image: Optional[bytes] = None) -> int:
+        """Allocates a section of specified size in the heap, initialised to the image if given and
+        zeroed otherwise.
 
         Returns the start offset of the allocated frame"""
 
-        # Find an available free block large enough
-        free_block_entry = next((b for b in self.free_blocks if b.length >= size), None)
+        # Every frame occupies at least a byte, so each has its own start offset
+        size = max(size, 1)
+
+        free_block_entry = self._find_free_block(size)
+
+        if not free_block_entry and self.growable and self.size < MAX_HEAP_SIZE:
+            # At least double the heap, so repeated allocations do not each grow it
+            self.grow(max(self.size * 2, self.size + size))
+            free_block_entry = self._find_free_block(size)
 
         if not free_block_entry:
-            raise ("No available memory")
+            raise MemoryError("No available memory")
 
         # Construct Data Stack Frame
         entry = data_frame(start=free_block_entry.start, length=size)
@@ -72,23 +283,31 @@ class data_stack:
         if self.debugger:
             self.debugger.store_alloc_block(entry.start, entry.start + entry.length)
 
-        if free_block_entry.length == size:
-            self.free_blocks.remove(free_block_entry)
-        else:
-            # Resize free block instead of just removing it
-            free_block_entry.start += size
-            free_block_entry.length -= size
+        self._remove_free_block(free_block_entry)
+        if free_block_entry.length > size:
+            # Return the remainder of the free block
+            self._add_free_block(
+                free_block_entry.start + size, free_block_entry.length - size
+            )
 
-        self.frames.append(entry)
+        self.frames[entry.start] = entry
 
         # Reinitialise the frame
-        self.memory[entry.start : entry.start + entry.length] = b"\x00" * entry.length
+        if image is None:
+            image = bytes(entry.length)
+
+        self.memory[entry.start : entry.start + len(image)] = image
 
         return entry.start
 
     def free_frame(self, offset: int) -> None:
-        # Find if there is a frame where the offset resides
-        frame_to_free = next((f for f in self.frames if f.in_frame(offset)), None)
+        frame_to_free = self.frames.get(offset)
+
+        if not frame_to_free:
+            # Find if there is a frame where the offset resides
+            frame_to_free = next(
+                (f for f in self.frames.values() if f.in_frame(offset)), None
+            )
 
         if not frame_to_free:
             _logger.warning(
@@ -98,109 +317,130 @@ class data_stack:
             return
 
         if self.debugger:
-            self.debugger.free_alloc_block(offset, offset + frame_to_free.length)
-            self.debugger.free_proc_vars(offset, offset + frame_to_free.length)
+            self.debugger.free_alloc_block(
+                frame_to_free.start, frame_to_free.start + frame_to_free.length
+            )
+            self.debugger.free_proc_vars(
+                frame_to_free.start, frame_to_free.start + frame_to_free.length
+            )
+
+        del self.frames[frame_to_free.start]
 
-        self.free_blocks.append(free_block(start=offset, length=frame_to_free.length))
+        self._release_block(frame_to_free.start, frame_to_free.length)
 
-        self.frames.remove(frame_to_free)
+    def _release_block(self, start: int, length: int) -> None:
+        """Returns a block of memory to the free lists"""
+
+        # Coalesce with the free blocks either side
+        before = self.free_block_ends.get(start)
+        if before:
+            self._remove_free_block(before)
+            start = before.start
+            length += before.length
+
+        after = self.free_blocks.get(start + length)
+        if after:
+            self._remove_free_block(after)
+            length += after.length
+
+        self._add_free_block(start, length)
 
     def write(self, type: int, value: Any, offset: int) -> None:
-        if type == 0:
-            # 2 Byte Word
-            data_bytes = self._struct_unpacker_int16.pack(value)
-        elif type == 1:
-            # 4 Byte Long
-            data_bytes = self._struct_unpacker_long.pack(value)
-        elif type == 2:
-            # Float
-            data_bytes = self._struct_unpacker_float.pack(value)
-        elif type == 3:
-            # QStr
-            data_bytes = bytearray([len(value)]) + value.encode("utf-8")
-        elif type == 4:
-            # 2 byte unsigned word (addr)
-            data_bytes = self._struct_unpacker_uint16.pack(value)
-        else:
+        if type < 0 or type >= len(WRITERS):
             raise ("Invalid data type - dsf write")
 
-        if self.debugger:
-            self.debugger.store_var(type, offset, "Unknown", value, len(data_bytes))
-
-        # Update memory in place
-        self.memory[offset : offset + len(data_bytes)] = data_bytes
+        WRITERS[type](self, value, offset)
 
     def write_int16(self, value: Any, offset: int) -> None:
         """Optimised write for int16 to the heap"""
-        data_bytes = self._struct_unpacker_int16.pack(value)
-
         if self.debugger:
-            self.debugger.store_var(type, offset, "Unknown", value, 2)
+            self.debugger.store_var(0, offset, "Unknown", value, 2)
 
         # Update memory in place
-        self.memory[offset : offset + 2] = data_bytes
+        self._pack_int16(self.memory, offset, value)
 
     def write_long(self, value: Any, offset: int) -> None:
         """Optimised write for int32(long) to the heap"""
-        data_bytes = self._struct_unpacker_long.pack(value)
-
         if self.debugger:
-            self.debugger.store_var(type, offset, "Unknown", value, 4)
+            self.debugger.store_var(1, offset, "Unknown", value, 4)
 
         # Update memory in place
-        self.memory[offset : offset + 4] = data_bytes
+        self._pack_long(self.memory, offset, value)
 
     def write_float(self, value: Any, offset: int) -> None:
         """Optimised write for ieee 64bit floats to the heap"""
-        data_bytes = self._struct_unpacker_float.pack(value)
+        if self.debugger:
+            self.debugger.store_var(2, offset, "Unknown", value, 8)
 
+        # Update memory in place
+        self._pack_float(self.memory, offset, value)
+
+    def write_qstr(self, value: str | bytes, offset: int) -> None:
+        """Write of a QStr (length byte followed by the characters) to the heap, in the Psion
+        character set. Characters outside of it are replaced, and a QStr holds at most 255"""
+        if isinstance(value, str):
+            data_bytes = value.encode(QSTR_ENCODING, "replace")[:255]
+        else:
+            data_bytes = value[:255]
+
+        if self.debugger:
+            self.debugger.store_var(
+                3, offset, "Unknown", qstr_text(value), len(data_bytes) + 1
+            )
+
+        # Update memory in place
+        self.memory[offset] = len(data_bytes)
+        self.memory[offset + 1 : offset + 1 + len(data_bytes)] = data_bytes
+
+    def write_uint16(self, value: int, offset: int) -> None:
+        """Optimised write for 2 byte unsigned words (addresses) to the heap"""
         if self.debugger:
-            self.debugger.store_var(type, offset, "Unknown", value, 8)
+            self.debugger.store_var(4, offset, "Unknown", value, 2)
 
         # Update memory in place
-        self.memory[offset : offset + 8] = data_bytes
+        self._pack_uint16(self.memory, offset, value)
 
     def read(
         self, type: int, offset: int, array_index: int = 1
     ) -> Any:  # OPL arrays start at 1
-        if type == 0:
-            # 2 Byte Word
-            return self._struct_unpacker_int16.unpack_from(
-                self.memory, offset + 2 * (array_index - 1)
-            )[0]
-        elif type == 1:
-            # 4 Byte Long
-            return self._struct_unpacker_long.unpack_from(
-                self.memory, offset + 4 * (array_index - 1)
-            )[0]
-        elif type == 2:
-            # 8 Byte Float
-            return self._struct_unpacker_float.unpack_from(
-                self.memory, offset + 8 * (array_index - 1)
-            )[0]
-        elif type == 3:
-            # Read the string control entry on maximum length
-            string_length = self.memory[offset - 1]
-
-            # QStr (read the current length)
-            l = self.memory[offset + string_length * (array_index - 1)]
-            if l == 0:
-                return ""
-
-            return self.memory[
-                offset
-                + 1
-                + string_length * (array_index - 1) : offset
-                + 1
-                + string_length * (array_index - 1)
-                + l
-            ].decode("utf-8", "replace")
-
-        raise ("Invalid data type - dsf read")
-
-    def read_int16(self, offset: int) -> int:  # OPL arrays start at 1
+        if type < 0 or type >= len(READERS):
+            raise ("Invalid data type - dsf read")
+
+        if array_index != 1:
+            if type == 3:
+                # Strings are spaced by the string control entry on maximum length
+                offset += self.memory[offset - 1] * (array_index - 1)
+            else:
+                offset += TYPE_SIZES[type] * (array_index - 1)
+
+        return READERS[type](self, offset)
+
+    def read_int16(self, offset: int) -> int:
         # 2 Byte Word
-        return self._struct_unpacker_int16.unpack_from(self.memory, offset)[0]
+        return self._unpack_int16(self.memory, offset)[0]
+
+    def read_long(self, offset: int) -> int:
+        # 4 Byte Long
+        return self._unpack_long(self.memory, offset)[0]
+
+    def read_float(self, offset: int) -> float:
+        # 8 Byte Float
+        return self._unpack_float(self.memory, offset)[0]
+
+    def read_qstr(self, offset: int) -> str | bytes:
+        # QStr (read the current length), as bytes for bytes strings
+        l = self.memory[offset]
+        if self.bytes_strings:
+            return bytes(self.memory[offset + 1 : offset + 1 + l])
+
+        if l == 0:
+            return ""
+
+        return self.memory[offset + 1 : offset + 1 + l].decode(QSTR_ENCODING)
+
+    def read_uint16(self, offset: int) -> int:
+        # 2 Byte unsigned Word (addr)
+        return self._unpack_uint16(self.memory, offset)[0]
 
     def read_int16_array(
         self, offset: int, array_index: int = 1
@@ -209,3 +449,24 @@ class data_stack:
         return self._struct_unpacker_int16.unpack_from(
             self.memory, offset + 2 * (array_index - 1)
         )[0]
+
+
+# Size of each data type (Word, Long, Float, QStr, Addr), QStr sizes vary
+TYPE_SIZES = [2, 4, 8, None, 2]
+
+# Accessors for each data type, for handlers to select once rather than on every access. Unbound,
+# readers are called as reader(data_stack, offset) and writers as writer(data_stack, value, offset)
+READERS = [
+    data_stack.read_int16,
+    data_stack.read_long,
+    data_stack.read_float,
+    data_stack.read_qstr,
+    data_stack.read_uint16,
+]
+WRITERS = [
+    data_stack.write_int16,
+    data_stack.write_long,
+    data_stack.write_float,
+    data_stack.write_qstr,
+    data_stack.write_uint16,
+]
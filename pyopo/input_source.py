@@ -0,0 +1,167 @@
+import collections
+import math
+from typing import Optional
+import pygame
+from pygame.locals import *
+import logging
+import logging.config
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+
+class input_source:
+    """Source of the key presses delivered to an executable, polled once per host tick"""
+
+    # Whether key presses are timed by instructions executed rather than by the clock
+    by_instructions = False
+
+    def poll(self, executable) -> None:
+        raise NotImplementedError()
+
+    def instruction_budget(self, executable, budget: int) -> int:
+        """Returns the number of instructions the next batch may execute, at most budget"""
+        return budget
+
+    def wait(self, executable, timeout: float) -> None:
+        """Waits up to timeout seconds for input, then polls"""
+        self.poll(executable)
+
+    def is_key_down(self, key: int) -> bool:
+        raise NotImplementedError()
+
+
+class pygame_input(input_source):
+    """Key presses from the PyGame event loop"""
+
+    def handle_event(self, executable, event) -> None:
+        if event.type == pygame.QUIT:
+            _logger.info("User has triggered App exit")
+            pygame.quit()
+            executable.running = False
+        elif event.type == pygame.KEYDOWN:
+            executable.handle_key_down(event.key)
+
+    def poll(self, executable) -> None:
+        for event in pygame.event.get():
+            self.handle_event(executable, event)
+            if not executable.running:
+                return
+
+    def wait(self, executable, timeout: float) -> None:
+        # Block in the event loop rather than sleeping, so the process is idle until an event arrives
+        event = pygame.event.wait(max(1, int(timeout * 1000)))
+        if event.type != pygame.NOEVENT:
+            self.handle_event(executable, event)
+
+        if executable.running:
+            self.poll(executable)
+
+    def is_key_down(self, key: int) -> bool:
+        return pygame.key.get_pressed()[key]
+
+
+class scripted_input(input_source):
+    """Replays a script of key presses, for unattended runs.
+
+    Each entry of the script is a key (PyGame key code or character), or a (when, key) tuple to press
+    the key no earlier than when. When is measured in seconds of the executable's clock since execution
+    started, or in instructions executed if by_instructions is set.
+
+    Instructions executed are counted in dispatches, a superinstruction or compiled basic block counts
+    as one. A script timed by instructions is reproducible for the same fusion and compilation
+    settings, batches end when its next key press is due and their size is not tuned to the host.
+
+    Awaiting opcodes (GET, PAUSE, DIALOG, MENU) take the key from the script, waiting on the clock for
+    it to be due (instantly with a virtual clock). Otherwise the key is held down and left as the last
+    key press for KEY polling, and only removed from the script once consumed."""
+
+    def __init__(self, script: list = (), by_instructions: bool = False) -> None:
+        self.by_instructions = by_instructions
+
+        # (when, key) entries, when is None for keys pressed as soon as possible
+        self.script: collections.deque[tuple[Optional[float], int]] = (
+            collections.deque()
+        )
+        self.queue(script)
+
+        # The key at the head of the script is held down, and pending until it has been consumed
+        self.key_down = None
+        self.key_pending = False
+
+    def queue(self, script: list) -> None:
+        """Appends entries to the script"""
+        for entry in script:
+            when, key = entry if isinstance(entry, tuple) else (None, entry)
+            self.script.append((when, ord(key) if isinstance(key, str) else key))
+
+    def is_key_down(self, key: int) -> bool:
+        return key == self.key_down
+
+    def wait(self, executable, timeout: float) -> None:
+        if self.script and not self.by_instructions:
+            # Only the clock brings a timed entry forward, sleep until it is due at most
+            until_due = self.until_due(executable, self.script[0][0])
+            executable.clock.sleep(max(0.0, min(timeout, until_due)))
+
+        self.poll(executable)
+
+    def instruction_budget(self, executable, budget: int) -> int:
+        if not self.by_instructions or not self.script or self.script[0][0] is None:
+            return budget
+
+        # End the batch on the instruction the next key press is due
+        until_due = math.ceil(self.until_due(executable, self.script[0][0]))
+        if until_due > 0:
+            return min(budget, until_due)
+
+        return budget
+
+    def until_due(self, executable, when: Optional[float]) -> float:
+        """Returns how long until a script entry is due, in seconds or instructions"""
+        if when is None:
+            return 0
+
+        if self.by_instructions:
+            return when - executable.instructions_executed
+
+        elapsed = executable.clock.now() - executable.execution_start_time
+        return when - elapsed.total_seconds()
+
+    def poll(self, executable) -> None:
+        if not executable.headless:
+            # Keep the window responsive
+            pygame.event.pump()
+
+        if self.key_pending and executable.last_keypress == 0:
+            # The key press was consumed by KEY
+            self.script.popleft()
+            self.key_pending = False
+
+        if not self.script:
+            self.key_down = None
+
+            if executable.awaiting_action():
+                _logger.warning("Scripted input exhausted while awaiting a key press")
+                executable.running = False
+            return
+
+        when, key = self.script[0]
+        until_due = self.until_due(executable, when)
+
+        if executable.awaiting_action():
+            if until_due > 0 and not self.by_instructions:
+                # No instructions are executed while awaiting, only the clock can bring the key forward
+                executable.clock.sleep(until_due)
+
+            self.key_down = key
+            self.script.popleft()
+            self.key_pending = False
+            executable.handle_key_down(key)
+        elif until_due > 0:
+            self.key_down = None
+        elif not self.key_pending:
+            self.key_down = key
+            self.key_pending = True
+            executable.handle_key_down(key)
@@ -22,6 +22,32 @@ logging.logMultiprocessing = False
 
 SIBO_TRANSLATOR_VERSION = 4383
 
+# The Psion (SIBO) character set, a single byte per character so a QStr's length byte is its length
+QSTR_ENCODING = "cp850"
+
+# Hold string values as bytes of the Psion character set rather than decoded text, so string data
+# round trips through the heap unchanged. Can be set globally, or per executable when loading
+BYTES_STRINGS = False
+
+
+def qstr_text(value: Any) -> Any:
+    """Returns a string value as text, values of other types are returned unchanged"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode(QSTR_ENCODING)
+
+    return value
+
+
+def qstr_value(text: str, bytes_strings: bool) -> str | bytes:
+    """Returns text as a string value, encoded to the Psion character set for bytes strings"""
+    if bytes_strings:
+        return text.encode(QSTR_ENCODING, "replace")
+
+    return text
+
+# Parse every procedure body when loading, rather than on the first call of each procedure
+PARSE_PROCEDURES_EAGERLY = False
+
 
 class opo_header:
     """Combined First and Second header component of a OPO/OPA file"""
@@ -122,7 +148,10 @@ class loader:
         translator_version: int,
         binary: bytes,
         src_filename: str,
+        parse_eagerly: bool = PARSE_PROCEDURES_EAGERLY,
     ) -> list[Any]:
+        """Reads the procedure table, each entry is a stub until its body is parsed by _parse_procedure.
+        With parse_eagerly the bodies are parsed up front, validating the whole file"""
         procedures = []
 
         binary_offset = procedure_table_offset
@@ -142,13 +171,13 @@ class loader:
                 "src_file": src_filename,  # Store the source filename to aid loadm
                 "proc_offset": proc_info[0],
                 "line_no": proc_info[1],
+                "translator_version": translator_version,
+                "binary": binary,
+                "parsed": False,
             }
 
-            proc_body = loader._read_procedure(
-                procedure_entry["proc_offset"], translator_version, binary
-            )
-
-            procedure_entry = {**procedure_entry, **proc_body}
+            if parse_eagerly:
+                loader._parse_procedure(procedure_entry)
 
             procedures.append(procedure_entry)
 
@@ -156,6 +185,18 @@ class loader:
 
         return procedures
 
+    def _parse_procedure(procedure_entry: dict) -> None:
+        """Parses the body of a procedure table stub into the entry, in place so references to the
+        entry (call links, caller lookups) remain valid"""
+        proc_body = loader._read_procedure(
+            procedure_entry["proc_offset"],
+            procedure_entry["translator_version"],
+            procedure_entry["binary"],
+        )
+
+        procedure_entry.update(proc_body)
+        procedure_entry["parsed"] = True
+
     def _read_procedure(
         offset: int, translator_version: int, binary: bytes
     ) -> list[Any]:
@@ -297,6 +338,26 @@ class loader:
                 {"data_stack_frame_offset": dsf_offset, "length": array_length}
             )
 
+        # The initial contents of the procedure's frame, copied into the heap on each call. Strings
+        # are preceded by their declared length and arrays by their element count (Word)
+        frame_image = bytearray(procedure_info["data_stack_frame_size"])
+        for dsf_offset, string_dec in procedure_info["string_declarations"].items():
+            frame_image[dsf_offset] = string_dec["length"]
+
+        for arr_dec in procedure_info["array_declarations"]:
+            struct.pack_into(
+                "<h", frame_image, arr_dec["data_stack_frame_offset"], arr_dec["length"]
+            )
+
+        procedure_info["frame_image"] = bytes(frame_image)
+
+        # String length of each global, strings are preceded by their declared length
+        for gd_entry in procedure_info["global_declarations"].values():
+            string_dec = procedure_info["string_declarations"].get(
+                gd_entry["data_stack_frame_offset"] - 1, None
+            )
+            gd_entry["string_length"] = string_dec["length"] if string_dec else 0
+
         # Update removing EE Refs
         for i in range(
             procedure_info["parameter_count"] - 1, -1, -1
@@ -314,6 +375,11 @@ class loader:
             for gr_entry in procedure_info["global_references"].values()
         }
 
+        # Parameter values are held by each activation of the procedure, indexed by slot
+        procedure_info["parameter_slots"] = {
+            param["ee"]: slot for slot, param in enumerate(procedure_info["parameters"])
+        }
+
         procedure_info["cached_cp"] = {
             cp_entry["ee"]: cp_entry for cp_entry in procedure_info["called_procedures"]
         }
@@ -327,15 +393,18 @@ class loader:
             loader.first_proc = False
 
         procedure_info["max_ee_ref"] = external_ref_counter
-        procedure_info["qcode"] = binary[
+
+        # A view of the QCode within the binary rather than a copy
+        procedure_info["qcode_offset"] = binary_offset
+        procedure_info["qcode"] = memoryview(binary)[
             binary_offset : binary_offset + procedure_info["qcode_len"]
         ]
 
         return procedure_info
 
-    def _read_qstr(offset: int, buffer: bytes) -> str:
+    def _read_qstr(offset: int, buffer: bytes | memoryview) -> str:
         l = buffer[offset]
         if l == 0:
             return ""
 
-        return buffer[offset + 1 : offset + 1 + l].decode("ascii", "replace")
+        return bytes(buffer[offset + 1 : offset + 1 + l]).decode(QSTR_ENCODING)
@@ -5,6 +5,8 @@ import logging.config
 from pyopo.heap import data_stack
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -142,7 +144,8 @@ def qcode_cmp_or(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_max(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x93 - Na MAX")
+    if TRACE:
+        _logger.debug("0x57 0x93 - Na MAX")
     na = procedure.read_qcode_byte()
 
     max_value = max(get_na_array_list(na, data_stack, stack))
@@ -151,7 +154,8 @@ def qcode_max(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_min(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x95 - Na MIN")
+    if TRACE:
+        _logger.debug("0x57 0x95 - Na MIN")
     na = procedure.read_qcode_byte()
 
     max_value = min(get_na_array_list(na, data_stack, stack))
@@ -160,7 +164,8 @@ def qcode_min(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_mean(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x94 - Na MEAN")
+    if TRACE:
+        _logger.debug("0x57 0x94 - Na MEAN")
     na = procedure.read_qcode_byte()
 
     num_list = get_na_array_list(na, data_stack, stack)
@@ -170,7 +175,8 @@ def qcode_mean(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_std(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x96 - Na STD")
+    if TRACE:
+        _logger.debug("0x57 0x96 - Na STD")
     na = procedure.read_qcode_byte()
 
     max_value = statistics.stdev(get_na_array_list(na, data_stack, stack))
@@ -179,7 +185,8 @@ def qcode_std(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_sum(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x97 - Na SUM")
+    if TRACE:
+        _logger.debug("0x57 0x97 - Na SUM")
     na = procedure.read_qcode_byte()
 
     max_value = sum(get_na_array_list(na, data_stack, stack))
@@ -188,7 +195,8 @@ def qcode_sum(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_var(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x98 - Na VAR")
+    if TRACE:
+        _logger.debug("0x57 0x98 - Na VAR")
     na = procedure.read_qcode_byte()
 
     max_value = statistics.variance(get_na_array_list(na, data_stack, stack))
@@ -5,58 +5,70 @@ import logging
 import logging.config
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_value
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
 
 def qcode_year(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x1E - YEAR")
-    stack.push(0, datetime.datetime.now().year)
+    if TRACE:
+        _logger.debug(f"0x57 0x1E - YEAR")
+    stack.push(0, procedure.executable.clock.now().year)
 
 
 def qcode_month(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x17 - MONTH")
-    stack.push(0, datetime.datetime.now().month)
+    if TRACE:
+        _logger.debug(f"0x57 0x17 - MONTH")
+    stack.push(0, procedure.executable.clock.now().month)
 
 
 def qcode_day(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x04 - DAY")
-    stack.push(0, datetime.datetime.now().day)
+    if TRACE:
+        _logger.debug(f"0x57 0x04 - DAY")
+    stack.push(0, procedure.executable.clock.now().day)
 
 
 def qcode_datetosecs(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x45 - DATETOSECS")
-    stack.push(1, int(datetime.datetime.now().timestamp()))
+    if TRACE:
+        _logger.debug(f"0x57 0x45 - DATETOSECS")
+    stack.push(1, int(procedure.executable.clock.now().timestamp()))
 
 
 def qcode_hour(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x12 - HOUR")
-    stack.push(0, datetime.datetime.now().hour)
+    if TRACE:
+        _logger.debug(f"0x57 0x12 - HOUR")
+    stack.push(0, procedure.executable.clock.now().hour)
 
 
 def qcode_minute(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x16 - MINUTE")
-    stack.push(0, datetime.datetime.now().minute)
+    if TRACE:
+        _logger.debug(f"0x57 0x16 - MINUTE")
+    stack.push(0, procedure.executable.clock.now().minute)
 
 
 def qcode_second(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x1C- SECOND")
-    stack.push(0, datetime.datetime.now().second)
+    if TRACE:
+        _logger.debug(f"0x57 0x1C- SECOND")
+    stack.push(0, procedure.executable.clock.now().second)
 
 
 def qcode_datim(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0xC1- DATIM$")
+    if TRACE:
+        _logger.debug(f"0x57 0xC1- DATIM$")
     # Example output: Tue 26 May 1992 13:01:44
 
-    datetime_string = datetime.datetime.now().strftime("%a %d %b %Y %H:%M:%S")
-    stack.push(3, datetime_string)
+    datetime_string = procedure.executable.clock.now().strftime("%a %d %b %Y %H:%M:%S")
+    stack.push(3, qstr_value(datetime_string, procedure.executable.bytes_strings))
 
 
 def qcode_month_str(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0xCD - MONTH$ pop%")
+    if TRACE:
+        _logger.debug(f"0x57 0xCD - MONTH$ pop%")
 
     months = [
         "Jan",
@@ -78,11 +90,12 @@ def qcode_month_str(procedure, data_stack: data_stack, stack: stack):
     if m < 1 or m > 12:
         raise (KErrOutOfRange)
 
-    stack.push(3, months[m - 1])
+    stack.push(3, qstr_value(months[m - 1], procedure.executable.bytes_strings))
 
 
 def qcode_dayname(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0xC2 - DAYNAME$ pop%1")
+    if TRACE:
+        _logger.debug(f"0x57 0xC2 - DAYNAME$ pop%1")
 
     daynames = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
 
@@ -91,11 +104,12 @@ def qcode_dayname(procedure, data_stack: data_stack, stack: stack):
     if dow < 1 or dow > 7:
         raise (KErrOutOfRange)
 
-    stack.push(3, daynames[dow - 1])
+    stack.push(3, qstr_value(daynames[dow - 1], procedure.executable.bytes_strings))
 
 
 def qcode_days(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x40 - DAYS pop%3 pop%2 pop%1")
+    if TRACE:
+        _logger.debug(f"0x57 0x40 - DAYS pop%3 pop%2 pop%1")
 
     d, m, y = stack.pop_n(3)
 
@@ -118,7 +132,8 @@ def qcode_days(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_secstodate(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xFB - secstodate pop8 pop%7 pop%6 pop%5 pop%4 pop%3 pop%2 pop%1")
+    if TRACE:
+        _logger.debug(f"0xFB - secstodate pop8 pop%7 pop%6 pop%5 pop%4 pop%3 pop%2 pop%1")
 
     s, yr_addr, mo_addr, dy_addr, hr_addr, mn_addr, sc_addr, yrday_addr = stack.pop_n(8)
 
@@ -6,20 +6,24 @@ from pyopo import loader
 from pyopo.heap import data_stack
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
 
 def qcode_open(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x84 - OPEN pop$1")
+    if TRACE:
+        _logger.debug(f"0x84 - OPEN pop$1")
 
-    filename = stack.pop()
+    filename = loader.qstr_text(stack.pop())
 
     # Retrieve DBF D index
     d = procedure.read_qcode_byte()
 
-    _logger.debug(f" - OPEN {d} {filename}")
+    if TRACE:
+        _logger.debug(f" - OPEN {d} {filename}")
 
     dbf_vars = []
 
@@ -34,27 +38,31 @@ def qcode_open(procedure, data_stack: data_stack, stack: stack):
         procedure.set_program_counter_delta(len(type_name) + 1)
 
         dbf_vars.append((type_code, type_name))
-        _logger.debug(f"{type_code} - {type_name}")
+        if TRACE:
+            _logger.debug(f"{type_code} - {type_name}")
 
     procedure.executable.open_dbf(filename=filename, d=d, vars=dbf_vars, readonly=False)
     procedure.set_trap(False)
 
 
 def qcode_close(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xA1 - CLOSE ")
+    if TRACE:
+        _logger.debug(f"0xA1 - CLOSE ")
     procedure.executable.close_dbf()
     procedure.set_trap(False)
 
 
 def qcode_create(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xA5 - CREATE pop$1")
+    if TRACE:
+        _logger.debug(f"0xA5 - CREATE pop$1")
 
-    filename = stack.pop()
+    filename = loader.qstr_text(stack.pop())
 
     # Retrieve DBF D Index
     d = procedure.read_qcode_byte()
 
-    _logger.debug(f" - CREATE {d} {filename}")
+    if TRACE:
+        _logger.debug(f" - CREATE {d} {filename}")
 
     dbf_vars = []
 
@@ -69,7 +77,8 @@ def qcode_create(procedure, data_stack: data_stack, stack: stack):
         procedure.set_program_counter_delta(len(type_name) + 1)
 
         dbf_vars.append((type_code, type_name))
-        _logger.debug(f"{type_code} - {type_name}")
+        if TRACE:
+            _logger.debug(f"{type_code} - {type_name}")
 
     procedure.executable.create_dbf(filename=filename, d=d, vars=dbf_vars)
 
@@ -77,7 +86,8 @@ def qcode_create(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_append(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x9D - APPEND ")
+    if TRACE:
+        _logger.debug(f"0x9D - APPEND ")
 
     for db in procedure.executable.databases:
         if db["d"] == procedure.executable.current_database:
@@ -88,7 +98,8 @@ def qcode_append(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_update(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xBD - UPDATE ")
+    if TRACE:
+        _logger.debug(f"0xBD - UPDATE ")
 
     for db in procedure.executable.databases:
         if db["d"] == procedure.executable.current_database:
@@ -99,7 +110,8 @@ def qcode_update(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_use(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xBE - USE ")
+    if TRACE:
+        _logger.debug(f"0xBE - USE ")
 
     # Retrieve DBF D Index
     d = procedure.read_qcode_byte()
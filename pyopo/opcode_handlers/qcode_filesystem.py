@@ -8,9 +8,12 @@ import logging
 import logging.config
 
 
-from pyopo.heap import data_stack
+from pyopo.heap import data_stack, to_heap_offset
+from pyopo.loader import qstr_text, qstr_value
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -19,9 +22,10 @@ SPECIAL_IO_HANDLES = ["TIM:"]
 
 
 def qcode_dir(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC3 - push$ DIR$ pop$")
+    if TRACE:
+        _logger.debug("0x57 0xC3 - push$ DIR$ pop$")
 
-    d = stack.pop()
+    d = qstr_text(stack.pop())
 
     if d != "":
         # Generate new Directory listing
@@ -40,20 +44,22 @@ def qcode_dir(procedure, data_stack: data_stack, stack: stack):
     print(f" - DIR$({d}) = {dir_response}")
     input()
 
-    stack.push(3, dir_response)
+    stack.push(3, qstr_value(dir_response, procedure.executable.bytes_strings))
 
 
 def qcode_trap(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xBC - TRAP")
+    if TRACE:
+        _logger.debug(f"0xBC - TRAP")
 
     # Not used by itself, sets the trap flag for the follow on command
     procedure.set_trap(True)
 
 
 def qcode_setpath(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xFA - SETPATH pop$1")
+    if TRACE:
+        _logger.debug(f"0xFA - SETPATH pop$1")
 
-    new_path = stack.pop()
+    new_path = qstr_text(stack.pop())
 
     procedure.executable.current_path = new_path
 
@@ -64,9 +70,10 @@ def qcode_setpath(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_mkdir(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xF8 - MKDIR pop$1")
+    if TRACE:
+        _logger.debug(f"0xF8 - MKDIR pop$1")
 
-    d = stack.pop()
+    d = qstr_text(stack.pop())
 
     translated_d = translate_path_from_sibo(d, procedure.executable)
 
@@ -77,9 +84,10 @@ def qcode_mkdir(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_exist(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x08 - push% EXIST pop$")
+    if TRACE:
+        _logger.debug(f"0x57 0x08 - push% EXIST pop$")
 
-    d = stack.pop()
+    d = qstr_text(stack.pop())
 
     translated_d = translate_path_from_sibo(d, procedure.executable)
 
@@ -93,7 +101,7 @@ def qcode_exist(procedure, data_stack: data_stack, stack: stack):
 def qcode_delete_file(procedure, data_stack: data_stack, stack: stack):
     print(f"0xA7 - DELETE pop$")
 
-    d = stack.pop()
+    d = qstr_text(stack.pop())
 
     translated_d = translate_path_from_sibo(d, procedure.executable)
 
@@ -170,7 +178,8 @@ def qcode_iosignal(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_iowait(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x11 - IOWAIT - STUB")
+    if TRACE:
+        _logger.debug("0x57 0x11 - IOWAIT - STUB")
     pass
 
 
@@ -180,7 +189,7 @@ def qcode_ioopen(procedure, data_stack: data_stack, stack: stack):
     # ret%=IOOPEN(var handle%,name$,mode%)
 
     mode = stack.pop()
-    filename = stack.pop()
+    filename = qstr_text(stack.pop())
     addr = stack.pop()
 
     # Generate an io_handle_value, as the latest entry in the handle list
@@ -282,7 +291,8 @@ def qcode_ioopen(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_ioread(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x0F - push% IOREAD pop%,pop%,pop%)")
+    if TRACE:
+        _logger.debug(f"0x57 0x0F - push% IOREAD pop%,pop%,pop%)")
 
     maxlen = stack.pop()
     addr = stack.pop()
@@ -302,7 +312,8 @@ def qcode_ioread(procedure, data_stack: data_stack, stack: stack):
             # input()
             ret = len(read_chars)
 
-            data_stack.memory[addr : addr + len(read_chars)] = read_chars
+            offset = to_heap_offset(addr)
+            data_stack.memory[offset : offset + len(read_chars)] = read_chars
             break
 
     stack.push(0, ret)
@@ -313,7 +324,8 @@ def qcode_ioread(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_iowrite(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x0E - push% IOWRITE pop%,pop%,pop%)")
+    if TRACE:
+        _logger.debug(f"0x57 0x0E - push% IOWRITE pop%,pop%,pop%)")
 
     write_len = stack.pop()
     addr = stack.pop()
@@ -324,7 +336,8 @@ def qcode_iowrite(procedure, data_stack: data_stack, stack: stack):
     ret = -1  # Error occured, invalid handle
     for io_obj in procedure.executable.io_handles:
         if handle == io_obj["io_handle"]:
-            bytes_to_write = data_stack.memory[addr : addr + write_len]
+            offset = to_heap_offset(addr)
+            bytes_to_write = data_stack.memory[offset : offset + write_len]
 
             io_obj["handle"].write(bytes_to_write)
 
@@ -337,7 +350,8 @@ def qcode_iowrite(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_ioclose(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x10 - push% IOCLOSE pop%")
+    if TRACE:
+        _logger.debug(f"0x57 0x10 - push% IOCLOSE pop%")
 
     handle = stack.pop()
 
@@ -358,7 +372,8 @@ def qcode_ioclose(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_ioseek(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x21 - push% IOSEEK pop%")
+    if TRACE:
+        _logger.debug(f"0x57 0x21 - push% IOSEEK pop%")
 
     offset_addr = stack.pop()
     mode = stack.pop()
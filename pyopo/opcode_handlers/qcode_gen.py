@@ -8,8 +8,14 @@ import logging.config
 
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_text, qstr_value
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
+# Consecutive KEY polls without a key press or drawing after which the program is treated as idle
+KEY_POLL_IDLE_LIMIT = 16
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -27,11 +33,13 @@ def qcode_usr(procedure, data_stack: data_stack, stack: stack):
 
 def qcode_pause(procedure, data_stack: data_stack, stack: stack):
     timcode = stack.pop()
-    _logger.info(f"0x85 - PAUSE {timcode}")
+    if TRACE:
+        _logger.debug(f"0x85 - PAUSE {timcode}")
 
     if timcode == 0:
         # Await for keypress
-        _logger.info(f" - AWAITING KeyPress")
+        if TRACE:
+            _logger.debug(f" - AWAITING KeyPress")
         procedure.executable.pause_await = True
     elif timcode < 0:
         # Await till the sleep period is complete
@@ -39,43 +47,69 @@ def qcode_pause(procedure, data_stack: data_stack, stack: stack):
         pass
     else:
         # The PAUSE function argument is expressed in 1/20 of a second intervals
-        time.sleep(1.0 / 20.0 * float(timcode))
+        procedure.executable.clock.sleep(1.0 / 20.0 * float(timcode))
 
+    # Yield to the host, ending the executable's batch of instructions
+    return True
 
-def qcode_get(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x0A - GET")
 
-    _logger.info(f" - AWAITING KeyPress")
+def qcode_get(procedure, data_stack: data_stack, stack: stack):
+    if TRACE:
+        _logger.debug("0x57 0x0A - GET")
+        _logger.debug(f" - AWAITING KeyPress")
 
     # Getting and storing the keypress is done via the main execution loop
     procedure.executable.get_await = True
     procedure.executable.get_await_str = False
 
+    # Yield to the host, ending the executable's batch of instructions
+    return True
 
-def qcode_get_str(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC7 - GET$")
 
-    _logger.info(f" - AWAITING KeyPress")
+def qcode_get_str(procedure, data_stack: data_stack, stack: stack):
+    if TRACE:
+        _logger.debug("0x57 0xC7 - GET$")
+        _logger.debug(f" - AWAITING KeyPress")
 
     # Getting and storing the keypress is done via the main execution loop
     procedure.executable.get_await = True
     procedure.executable.get_await_str = True
 
+    # Yield to the host, ending the executable's batch of instructions
+    return True
+
 
 def qcode_key(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x13 - KEY")
+    executable = procedure.executable
+
+    if TRACE:
+        _logger.debug(f"0x57 0x13 - KEY - Last Keypress = {executable.last_keypress}")
+
+    key = executable.last_keypress
+    stack.push(0, key)
+    executable.last_keypress = 0
 
-    print(f" - Last Keypress = {procedure.executable.last_keypress}")
+    if executable.window_manager.draw_pending():
+        # Present what has been drawn, as the program may be waiting on the player
+        executable.window_manager.composite(executable, True)
+    elif key == 0:
+        # Nothing drawn and no key, the program may be busy polling KEY
+        executable.idle_key_polls += 1
+        if executable.idle_key_polls >= KEY_POLL_IDLE_LIMIT:
+            executable.idle_key_polls = 0
+            executable.key_poll_wait = True
 
-    stack.push(0, procedure.executable.last_keypress)
-    procedure.executable.last_keypress = 0
+            # Yield to the host, ending the executable's batch of instructions
+            return True
 
-    # Force composition
-    procedure.executable.window_manager.composite(procedure.executable, True)
+        return
+
+    executable.idle_key_polls = 0
 
 
 def qcode_cmd(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD6 - push$ CMD$ pop%")
+    if TRACE:
+        _logger.debug("0x57 0xD6 - push$ CMD$ pop%")
 
     cmd_flag = stack.pop()
     cmd_res = ""
@@ -98,11 +132,12 @@ def qcode_cmd(procedure, data_stack: data_stack, stack: stack):
 
     print(f" - CMD({cmd_flag}) = {cmd_res}")
 
-    stack.push(0, cmd_res)
+    stack.push(3, qstr_value(cmd_res, procedure.executable.bytes_strings))
 
 
 def qcode_goto(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xBF - GOTO JJ")
+    if TRACE:
+        _logger.debug("0xBF - GOTO JJ")
 
     # jmp offset is from the start of the opcode, so negate opcode and opand len
     jmp_offset = procedure.read_qcode_int16() - 3
@@ -111,7 +146,8 @@ def qcode_goto(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_vector(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xAB - VECTOR")
+    if TRACE:
+        _logger.debug("0xAB - VECTOR")
 
     pc = procedure.get_program_counter()
     label_count = struct.unpack_from("<H", procedure.procedure["qcode"], pc)[0]
@@ -128,7 +164,8 @@ def qcode_vector(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_onerr(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xB1 - ONERR")
+    if TRACE:
+        _logger.debug(f"0xB1 - ONERR")
 
     pc = procedure.get_program_counter()
     jmp_offset = struct.unpack_from("<h", procedure.procedure["qcode"], pc)[0]
@@ -144,9 +181,12 @@ def qcode_onerr(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_parse(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD7 - p$=PARSE$(f$,rel$,var off%())")
+    if TRACE:
+        _logger.debug("0x57 0xD7 - p$=PARSE$(f$,rel$,var off%())")
 
     f, rel, off_addr = stack.pop_n(3)
+    f = qstr_text(f)
+    rel = qstr_text(rel)
 
     print(f" - PARSE('{f}', '{rel}' -> {off_addr})")
 
@@ -184,11 +224,12 @@ def qcode_parse(procedure, data_stack: data_stack, stack: stack):
     # off%(6) flags for wildcards in returned string
     data_stack.write_int16(0, off_addr + 10)
 
-    stack.push(3, rel)
+    stack.push(3, qstr_value(rel, procedure.executable.bytes_strings))
 
 
 def qcode_giprint(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFC - GIPRINT")
+    if TRACE:
+        _logger.debug("0xFC - GIPRINT")
 
     pc = procedure.get_program_counter()
     arg_count = int(procedure.procedure["qcode"][pc])  # N' format
@@ -199,22 +240,25 @@ def qcode_giprint(procedure, data_stack: data_stack, stack: stack):
         # gIPRINT str$, c%
         loc = stack.pop()
 
-    str_val = stack.pop()
+    str_val = qstr_text(stack.pop())
 
     procedure.executable.window_manager.GIPRINT(str_val, loc)
 
 
 def qcode_cache(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x0E - CACHE")
+    if TRACE:
+        _logger.debug("0xFF 0x0E - CACHE")
 
     cache_arg = procedure.read_qcode_byte()  # Qa format
 
     if cache_arg == 2:
         cache_min, cache_max = stack.pop_2()
-        _logger.debug(f" - CACHE min%={cache_min}, max%={cache_max} - Not implemented")
+        if TRACE:
+            _logger.debug(f" - CACHE min%={cache_min}, max%={cache_max} - Not implemented")
     else:
         # CACHE ON / OFF
-        _logger.debug(f" - CACHE {bool(cache_arg)} - Not implemented")
+        if TRACE:
+            _logger.debug(f" - CACHE {bool(cache_arg)} - Not implemented")
         pass
 
 
@@ -224,12 +268,14 @@ def qcode_testevent(procedure, data_stack: data_stack, stack: stack):
 
     event = -1 if procedure.executable.last_keypress != 0 else 0
 
-    _logger.debug(f"0x34 - TESTEVENT {event}")
+    if TRACE:
+        _logger.debug(f"0x34 - TESTEVENT {event}")
     stack.push(0, event)
 
 
 def qcode_getevent(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xE4 - GETEVENT")
+    if TRACE:
+        _logger.debug("0xE4 - GETEVENT")
 
     addr = stack.pop()
     # GETEVENT returns a limited subset in the emulator
@@ -237,28 +283,32 @@ def qcode_getevent(procedure, data_stack: data_stack, stack: stack):
 
     getevent = [procedure.executable.last_keypress, 0]
 
-    _logger.debug(f" - GETEVENT DSF Offset={addr} -> {getevent}")
+    if TRACE:
+        _logger.debug(f" - GETEVENT DSF Offset={addr} -> {getevent}")
 
     data_stack.write_int16(getevent[0], addr)
     data_stack.write_int16(getevent[1], addr + 2)
 
 
 def qcode_escape(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xA9 - ESCAPE")
+    if TRACE:
+        _logger.debug("0xA9 - ESCAPE")
 
     q = procedure.read_qcode_byte()  # N' format
     # _logger.warning(f" - ESCAPE {q} - Not Implemented")
 
 
 def qcode_lock(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xF1 - LOCK")
+    if TRACE:
+        _logger.debug("0xF1 - LOCK")
 
     q = procedure.read_qcode_byte()  # N' format
     _logger.warning(f" - LOCK {q} - Not Implemented")
 
 
 def qcode_busy(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xF0 - BUSY")
+    if TRACE:
+        _logger.debug("0xF0 - BUSY")
 
     args = procedure.read_qcode_byte()  # N' format
 
@@ -269,7 +319,8 @@ def qcode_busy(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_statuswin(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xEF - STATUSWIN")
+    if TRACE:
+        _logger.debug("0xEF - STATUSWIN")
 
     args = procedure.read_qcode_byte()  # N' format
 
@@ -281,12 +332,14 @@ def qcode_statuswin(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_randomize(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xB9 - RANDOMIZE pop&1")
+    if TRACE:
+        _logger.debug("0xB9 - RANDOMIZE pop&1")
     random.seed = stack.pop()
 
 
 def qcode_kmod(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x22 - KMOD")
+    if TRACE:
+        _logger.debug("0x57 0x22 - KMOD")
 
     _logger.warning(f" - KMOD - Not Implemented")
     input()
@@ -294,12 +347,14 @@ def qcode_kmod(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_rnd(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x8E - push&1 RND")
+    if TRACE:
+        _logger.debug("0x57 0x8E - push&1 RND")
     stack.push(2, random.random())
 
 
 def qcode_trap(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xBC - TRAP")
+    if TRACE:
+        _logger.debug("0xBC - TRAP")
 
     # Not used by itself, sets the trap flag for the follow on command
     # Set the flag to newly raised
@@ -307,22 +362,25 @@ def qcode_trap(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_err_virt(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x07 - ERR")
+    if TRACE:
+        _logger.debug("0x57 0x07 - ERR")
 
     # Pushes the virtual flag for ERR
     stack.push(0, 9999)
 
 
 def qcode_beep(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xA0 - BEEP pop%2 pop% - NOT IMPLEMENTED")
+    if TRACE:
+        _logger.debug("0xA0 - BEEP pop%2 pop% - NOT IMPLEMENTED")
 
     stack.pop_2()
 
 
 def qcode_eval(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x99 - EVAL pop$1")
+    if TRACE:
+        _logger.debug(f"0x57 0x99 - EVAL pop$1")
 
-    s = stack.pop()
+    s = qstr_text(stack.pop())
 
     print(f" - EVAL {s}")
 
@@ -340,22 +398,27 @@ def qcode_eval(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_err_str(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC4 - push$ ERR$ pop%1 - STUB")
+    if TRACE:
+        _logger.debug("0x57 0xC4 - push$ ERR$ pop%1 - STUB")
 
     stack.pop()
 
-    stack.push(3, "An Error has occured")
+    stack.push(
+        3, qstr_value("An Error has occured", procedure.executable.bytes_strings)
+    )
 
 
 def qcode_stop(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xBB - STOP")
+    if TRACE:
+        _logger.debug("0xBB - STOP")
 
     # Stop Execution of the program
     procedure.flag_stop = True
 
 
 def qcode_raise(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xB8 - RAISE")
+    if TRACE:
+        _logger.debug("0xB8 - RAISE")
 
     err_code = stack.pop()
     # _logger.warning(f"User Error Raised! {err_code}")
@@ -365,19 +428,22 @@ def qcode_raise(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_diaminit(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x02 - DIAMINIT - Not Implemented")
+    if TRACE:
+        _logger.debug("0xFF 0x02 - DIAMINIT - Not Implemented")
 
     args = procedure.read_qcode_byte()  # DBF D Byte
     stack.pop_n(args)
 
 
 def qcode_diampos(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xFF 0x03 - DIAMPOS - Not Implemented")
+    if TRACE:
+        _logger.debug(f"0xFF 0x03 - DIAMPOS - Not Implemented")
 
     stack.pop()
 
 
 def qcode_statuswininfo(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x53 - STATWININFO - Not Implemented")
+    if TRACE:
+        _logger.debug(f"0x57 0x53 - STATWININFO - Not Implemented")
 
     stack.push(0, 0)
@@ -5,8 +5,11 @@ import logging
 import logging.config
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_text
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -15,63 +18,75 @@ from pyopo import pyopo
 
 
 def qcode_gcls(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xD1 - gCLS")
+    if TRACE:
+        _logger.debug("0xD1 - gCLS")
     procedure.get_graphics_context().gCLS()
 
 
 def qcode_gclose(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xC6 - gCLOSE pop%1")
+    if TRACE:
+        _logger.debug("0xC6 - gCLOSE pop%1")
     procedure.get_window_manager().gCLOSE(stack.pop())
     procedure.set_trap(False)
 
 
 def qcode_setname(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xEE - SETNAME pop$1")
+    if TRACE:
+        _logger.debug("0xEE - SETNAME pop$1")
     procedure.get_window_manager().set_window_name(stack.pop())
 
 
 def qcode_ggmode(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xCC - gGMODE pop%1")
+    if TRACE:
+        _logger.debug("0xCC - gGMODE pop%1")
     procedure.get_graphics_context().gGMODE(stack.pop())
 
 
 def qcode_gwidth(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x2E - PUSH% gWIDTH")
+    if TRACE:
+        _logger.debug("0x57 0x2E - PUSH% gWIDTH")
     stack.push(0, procedure.get_graphics_context().gWIDTH())
 
 
 def qcode_gidentity(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x2B - PUSH% gIDENTITY")
+    if TRACE:
+        _logger.debug("0x57 0x2B - PUSH% gIDENTITY")
     stack.push(0, procedure.get_graphics_context().gIDENTITY())
 
 
 def qcode_gx(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x2C - PUSH% gX")
+    if TRACE:
+        _logger.debug("0x57 0x2C - PUSH% gX")
     stack.push(0, procedure.get_graphics_context().gX())
 
 
 def qcode_gy(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x2D - PUSH% gY")
+    if TRACE:
+        _logger.debug("0x57 0x2D - PUSH% gY")
     stack.push(0, procedure.get_graphics_context().gY())
 
 
 def qcode_goriginx(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x30 - PUSH% gORIGINX")
+    if TRACE:
+        _logger.debug("0x57 0x30 - PUSH% gORIGINX")
     stack.push(0, procedure.get_graphics_context().gORIGINX())
 
 
 def qcode_goriginy(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x31 - PUSH% gORIGINY")
+    if TRACE:
+        _logger.debug("0x57 0x31 - PUSH% gORIGINY")
     stack.push(0, procedure.get_graphics_context().gORIGINY())
 
 
 def qcode_gheight(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x2F - PUSH% gHEIGHT")
+    if TRACE:
+        _logger.debug("0x57 0x2F - PUSH% gHEIGHT")
     stack.push(0, procedure.get_graphics_context().gHEIGHT())
 
 
 def qcode_gsetwin(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xC8 - PUSH% gSETWIN")
+    if TRACE:
+        _logger.debug("0xC8 - PUSH% gSETWIN")
 
     arg_count = procedure.read_qcode_byte()
     if arg_count == 4:
@@ -86,7 +101,8 @@ def qcode_gsetwin(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_gcreate_5(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x26 - PUSH% gCREATE")
+    if TRACE:
+        _logger.debug(f"0x57 0x26 - PUSH% gCREATE")
 
     # x%,y%,w%,h%,v%
 
@@ -98,7 +114,8 @@ def qcode_gcreate_5(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_gcreate_6(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x39 - PUSH% gCREATE")
+    if TRACE:
+        _logger.debug(f"0x57 0x39 - PUSH% gCREATE")
 
     # 5 series: x%,y%,w%,h%,v%, flags%
     # 3 series: x%,y%,w%,h%,v%, grey%
@@ -121,36 +138,42 @@ def qcode_gborder(procedure, data_stack, stack) -> None:
 
     flags = stack.pop()
 
-    _logger.debug(f" - gBORDER {flags}, {width}, {height}")
+    if TRACE:
+        _logger.debug(f" - gBORDER {flags}, {width}, {height}")
 
     procedure.get_graphics_context().gBORDER(flags, width, height)
 
 
 def qcode_gat(procedure, data_stack, stack) -> None:
-    _logger.debug("0xD2 - gAT pop%2, pop%1")
+    if TRACE:
+        _logger.debug("0xD2 - gAT pop%2, pop%1")
 
     x, y = stack.pop_2()
     procedure.get_graphics_context().gAT(x, y)
 
 
 def qcode_gmove(procedure, data_stack, stack) -> None:
-    _logger.debug("0xD3 - gMOVE pop%2, pop%1")
+    if TRACE:
+        _logger.debug("0xD3 - gMOVE pop%2, pop%1")
 
     x, y = stack.pop_2()
     procedure.get_graphics_context().gMOVE(x, y)
 
 
 def qcode_gorder(procedure, data_stack, stack) -> None:
-    _logger.debug("0xCF - gORDER pop%2, pop%1")
+    if TRACE:
+        _logger.debug("0xCF - gORDER pop%2, pop%1")
 
     id, index = stack.pop_2()
 
-    _logger.debug(f" - gORDER {id}, {index}")
+    if TRACE:
+        _logger.debug(f" - gORDER {id}, {index}")
     procedure.get_window_manager().gORDER(id, index)
 
 
 def qcode_glineto(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xE5 - gLINETO pop%2, pop%1")
+    if TRACE:
+        _logger.debug("0xE5 - gLINETO pop%2, pop%1")
 
     x, y = stack.pop_2()
     procedure.get_graphics_context().gLINETO(x, y)
@@ -163,7 +186,8 @@ def qcode_gpoly(procedure, data_stack: data_stack, stack: stack) -> None:
     y = data_stack.read_int16(dsf_offset + 2)
     operations = data_stack.read(0, dsf_offset + 4)
 
-    _logger.debug(f"0xDE - gPOLY: {x}, {y}, Operations: {operations}")
+    if TRACE:
+        _logger.debug(f"0xDE - gPOLY: {x}, {y}, Operations: {operations}")
 
     ops = [
         (
@@ -177,45 +201,53 @@ def qcode_gpoly(procedure, data_stack: data_stack, stack: stack) -> None:
 
 
 def qcode_glineby(procedure, data_stack, stack) -> None:
-    _logger.debug("0xDA - gLINEBY pop%2, pop%1")
+    if TRACE:
+        _logger.debug("0xDA - gLINEBY pop%2, pop%1")
 
     dx, dy = stack.pop_2()
     procedure.get_graphics_context().gLINEBY(dx, dy)
 
 
 def qcode_gstyle(procedure, data_stack, stack) -> None:
-    _logger.debug("0xCE - gSTYLE pop%1")
+    if TRACE:
+        _logger.debug("0xCE - gSTYLE pop%1")
 
     style = stack.pop()
 
-    _logger.debug(f" - gSTYLE {style} - STUB")
+    if TRACE:
+        _logger.debug(f" - gSTYLE {style} - STUB")
 
 
 def qcode_gtwidth(procedure, data_stack, stack) -> None:
-    _logger.debug("0x57 0x32 - push% gTWIDTH pop$1")
-    text_len = procedure.get_graphics_context().gTWIDTH(stack.pop())
+    if TRACE:
+        _logger.debug("0x57 0x32 - push% gTWIDTH pop$1")
+    text_len = procedure.get_graphics_context().gTWIDTH(qstr_text(stack.pop()))
     stack.push(0, text_len)
 
 
 def qcode_gprint(procedure, data_stack, stack) -> None:
     op_code = procedure.get_executed_opcode()
-    _logger.debug(f"{hex(op_code)} - gPRINT pop+ ;")
+    if TRACE:
+        _logger.debug(f"{hex(op_code)} - gPRINT pop+ ;")
 
     # Sanitise text
-    text = str(stack.pop()).replace("\00", "") + " "
+    text = str(qstr_text(stack.pop())).replace("\00", "") + " "
 
     if len(text) > 0:
-        _logger.debug(f" - gPRINT '{text}' {len(text)} characters")
+        if TRACE:
+            _logger.debug(f" - gPRINT '{text}' {len(text)} characters")
         procedure.get_graphics_context().gPRINT(text)
 
 
 def qcode_gprint_comma(procedure, data_stack, stack) -> None:
-    _logger.debug("0xD8 - gPRINT ,")
+    if TRACE:
+        _logger.debug("0xD8 - gPRINT ,")
     procedure.get_graphics_context().gPRINT(" ")
 
 
 def qcode_gprintb(procedure, data_stack, stack) -> None:
-    _logger.debug("0xD9 - N' gPRINTB pop+ ;")
+    if TRACE:
+        _logger.debug("0xD9 - N' gPRINTB pop+ ;")
 
     arg_count = procedure.read_qcode_byte()
 
@@ -226,13 +258,15 @@ def qcode_gprintb(procedure, data_stack, stack) -> None:
     w = stack.pop()
     t = stack.pop()
 
-    _logger.debug(f" - gPRINTB args={arg_count} {t}, {w}, {al}, {tp}, {bt}, {m}")
+    if TRACE:
+        _logger.debug(f" - gPRINTB args={arg_count} {t}, {w}, {al}, {tp}, {bt}, {m}")
 
-    procedure.get_graphics_context().gPRINTB(str(t), w, al, tp, bt, m)
+    procedure.get_graphics_context().gPRINTB(str(qstr_text(t)), w, al, tp, bt, m)
 
 
 def qcode_gfont(procedure, data_stack, stack) -> None:
-    _logger.debug(f"0xCA - gFONT")
+    if TRACE:
+        _logger.debug(f"0xCA - gFONT")
 
     font_id = stack.pop()
     procedure.get_graphics_context().gFONT(font_id)
@@ -240,72 +274,87 @@ def qcode_gfont(procedure, data_stack, stack) -> None:
 
 
 def qcode_guse(procedure, data_stack, stack) -> None:
-    _logger.debug(f"0xC7 - gUSE pop%1")
+    if TRACE:
+        _logger.debug(f"0xC7 - gUSE pop%1")
     procedure.get_window_manager().gUSE(stack.pop())
     procedure.set_trap(False)
 
 
 def qcode_gbutton(procedure, data_stack, stack) -> None:
-    _logger.debug(f"0xFF 0x0F - gBUTTON pop%1")
+    if TRACE:
+        _logger.debug(f"0xFF 0x0F - gBUTTON pop%1")
 
     text, ty, width, height, st = stack.pop_n(5)
+    text = qstr_text(text)
 
-    _logger.debug(f" - gBUTTON '{text}', {ty}, {width}, {height}, {st}")
+    if TRACE:
+        _logger.debug(f" - gBUTTON '{text}', {ty}, {width}, {height}, {st}")
     procedure.get_graphics_context().gBUTTON(text, ty, width, height, st)
 
 
 def qcode_gupdate(procedure, data_stack, stack) -> None:
-    _logger.debug("0xE3 - gUPDATE")
+    if TRACE:
+        _logger.debug("0xE3 - gUPDATE")
 
     # Qn format 0,1,FF (Off, On, Omitted)
     procedure.get_window_manager().gUPDATE(procedure.read_qcode_byte())
 
 
 def qcode_defaultwin(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x01 - DEFAULTWIN")
+    if TRACE:
+        _logger.debug("0xFF 0x01 - DEFAULTWIN")
     procedure.get_window_manager().DEFAULTWIN(stack.pop())
 
 
 def qcode_ggrey(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x00 - gGREY")
+    if TRACE:
+        _logger.debug("0xFF 0x00 - gGREY")
 
     mode = stack.pop()
 
-    _logger.debug(f" -gGREY {mode}")
+    if TRACE:
+        _logger.debug(f" -gGREY {mode}")
 
     procedure.get_graphics_context().gGREY(mode)
 
 
 def qcode_gfill(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xDF - gFILL")
+    if TRACE:
+        _logger.debug("0xDF - gFILL")
 
     width, height, gmode = stack.pop_n(3)
 
-    _logger.debug(f"gFILL {width}, {height}, {gmode}")
+    if TRACE:
+        _logger.debug(f"gFILL {width}, {height}, {gmode}")
     procedure.get_graphics_context().gFILL(width, height, gmode)
 
 
 def qcode_gbox(procedure, data_stack, stack) -> None:
-    _logger.debug("0xD8 - gBOX")
+    if TRACE:
+        _logger.debug("0xD8 - gBOX")
 
     width, height = stack.pop_2()
     procedure.get_graphics_context().gBOX(width, height)
 
 
 def qcode_gclock(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xF5 - gCLOCK")
+    if TRACE:
+        _logger.debug(f"0xF5 - gCLOCK")
 
     arg = procedure.read_qcode_byte()
 
     if arg > 1:
         for _ in range(arg - 1):
             stack.pop()
-        _logger.debug(f" - gCLOCK arg count = {arg-1}")
+        if TRACE:
+            _logger.debug(f" - gCLOCK arg count = {arg-1}")
     elif arg == 0:
-        _logger.debug(f" - gCLOCK OFF")
+        if TRACE:
+            _logger.debug(f" - gCLOCK OFF")
         pass
     elif arg == 1:
-        _logger.debug(f" - gCLOCK ON")
+        if TRACE:
+            _logger.debug(f" - gCLOCK ON")
         pass
 
     # _logger.warning(f"gCLOCK - STUB")
@@ -314,18 +363,22 @@ def qcode_gclock(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_gvisible(procedure, data_stack, stack) -> None:
-    _logger.debug("0xC9 - gVISIBLE")
+    if TRACE:
+        _logger.debug("0xC9 - gVISIBLE")
     procedure.get_graphics_context().gVISIBLE(procedure.read_qcode_byte())
 
 
 def qcode_gpeekline(procedure, data_stack, stack) -> None:
-    _logger.debug("0xE6 - gPEEKLINE  pop%5 pop%4 pop%3 pop%2 pop%1")
+    if TRACE:
+        _logger.debug("0xE6 - gPEEKLINE  pop%5 pop%4 pop%3 pop%2 pop%1")
 
     id, x, y, d_addr, ln = stack.pop_n(5)
 
-    _logger.debug(f" - gPEEKLINE {id}, {x}, {y}, {d_addr}, {ln}")
+    if TRACE:
+        _logger.debug(f" - gPEEKLINE {id}, {x}, {y}, {d_addr}, {ln}")
     line_data_bits = procedure.get_window_manager().gPEEKLINE(id, x, y, ln)
-    _logger.debug(line_data_bits)
+    if TRACE:
+        _logger.debug(line_data_bits)
 
     # Bits need to be packed to 16bit words
     bits_required = int(len(line_data_bits) / 16)
@@ -335,28 +388,31 @@ def qcode_gpeekline(procedure, data_stack, stack) -> None:
     for i in range(0, len(bitstring), 16):
         bitvalue = int(bitstring[i : i + 16], 2)
 
-        _logger.debug(
-            f"{bitstring[i:i+16]} > {bitvalue} to DSF {d_addr + int(i/16) * 2}"
-        )
+        if TRACE:
+            _logger.debug(
+                f"{bitstring[i:i+16]} > {bitvalue} to DSF {d_addr + int(i/16) * 2}"
+            )
         # Iterate through the DSF as a word as we write it out
         data_stack.write(4, bitvalue, d_addr + int(i / 16) * 2)
 
 
 def qcode_gloadbit(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x28 - gLOADBIT")
+    if TRACE:
+        _logger.debug("0x57 0x28 - gLOADBIT")
 
     args = procedure.read_qcode_byte()
 
     index = stack.pop() if args == 3 else 0
     write = stack.pop() if args >= 2 else 1
-    name = stack.pop()
+    name = qstr_text(stack.pop())
 
     if not "." in name:
         # If there is no extension on the given file, .pic is assummed
         name += ".PIC"
 
     trans_name = translate_path_from_sibo(name, procedure.executable)
-    _logger.debug(f" - gLOADBIT {name} > {trans_name} {write} {index}")
+    if TRACE:
+        _logger.debug(f" - gLOADBIT {name} > {trans_name} {write} {index}")
 
     # Depending on whether the the source file is the OPA itself or a PIC file, choose a different path
 
@@ -373,7 +429,8 @@ def qcode_gloadbit(procedure, data_stack: data_stack, stack: stack):
         for e in procedure.executable.embedded_files:
             if not open_addr_offset or open_addr_offset == e.start_offset:
                 if e.type == "PIC":
-                    _logger.debug(" - Loading internal PIC from OPA")
+                    if TRACE:
+                        _logger.debug(" - Loading internal PIC from OPA")
                     pic_binary = procedure.executable.binary[
                         e.start_offset : e.end_offset
                     ]
@@ -393,7 +450,8 @@ def qcode_gloadbit(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_gxborder(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x10 - gXBORDER")
+    if TRACE:
+        _logger.debug("0xFF 0x10 - gXBORDER")
 
     arg_count = procedure.read_qcode_byte()
 
@@ -406,44 +464,52 @@ def qcode_gxborder(procedure, data_stack: data_stack, stack: stack):
     flags = stack.pop()
     type = stack.pop()
 
-    _logger.debug(f" - gXBORDER {type}, {flags}, {width}, {height}")
+    if TRACE:
+        _logger.debug(f" - gXBORDER {type}, {flags}, {width}, {height}")
 
     procedure.get_graphics_context().gXBORDER(type, flags, width, height)
 
 
 def qcode_gxprint(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xF3 - gXPRINT pop$ pop%")
+    if TRACE:
+        _logger.debug("0xF3 - gXPRINT pop$ pop%")
 
     flags = stack.pop()
-    text = stack.pop()
+    text = qstr_text(stack.pop())
 
-    _logger.debug(f" - gXPRINT {text} {flags}")
+    if TRACE:
+        _logger.debug(f" - gXPRINT {text} {flags}")
     procedure.get_graphics_context().gPRINT(text)
 
 
 def qcode_gcopy(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xE1 - gCOPY pop% pop% pop% pop% pop% pop%")
+    if TRACE:
+        _logger.debug("0xE1 - gCOPY pop% pop% pop% pop% pop% pop%")
 
     # gCOPY id%,x%,y%,w%,h%,mode%
     id, x, y, w, h, mode = stack.pop_n(6)
 
-    _logger.debug(f" - gCOPY {id} {x} {y} {w} {h} {mode}")
+    if TRACE:
+        _logger.debug(f" - gCOPY {id} {x} {y} {w} {h} {mode}")
     procedure.get_window_manager().gCOPY(id, x, y, w, h, mode)
     procedure.set_trap(False)
 
 
 def qcode_gpatt(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xE0 - gPATT pop% pop% pop% pop%")
+    if TRACE:
+        _logger.debug("0xE0 - gPATT pop% pop% pop% pop%")
 
     id, w, h, mode = stack.pop_n(4)
 
-    _logger.debug(f" - gPATT {id} {w} {h} {mode}")
+    if TRACE:
+        _logger.debug(f" - gPATT {id} {w} {h} {mode}")
     procedure.get_window_manager().gPATT(id, w, h, mode)
     procedure.set_trap(False)
 
 
 def qcode_gtmode(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xCD - gTMODE pop%")
+    if TRACE:
+        _logger.debug("0xCD - gTMODE pop%")
 
     mode = stack.pop()
 
@@ -452,13 +518,15 @@ def qcode_gtmode(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_ginfo(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xD0 - gINFO pop%")
+    if TRACE:
+        _logger.debug("0xD0 - gINFO pop%")
 
     dsf_offset = stack.pop()
 
     ginfo = procedure.get_graphics_context().gINFO()
 
-    _logger.debug(f" - gINFO {dsf_offset}")
+    if TRACE:
+        _logger.debug(f" - gINFO {dsf_offset}")
 
     # Write out gINFO struct to memory
     for i in range(32):
@@ -470,7 +538,8 @@ def qcode_gcreatebit(procedure, data_stack: data_stack, stack: stack):
 
     id = procedure.get_window_manager().gCREATE(0, 0, w, h, False, 0, drawable=True)
 
-    _logger.debug(f"0x57 0x27 - gCREATEBIT({w}, {h}) -> {id}")
+    if TRACE:
+        _logger.debug(f"0x57 0x27 - gCREATEBIT({w}, {h}) -> {id}")
 
     stack.push(0, id)
 
@@ -480,7 +549,8 @@ def qcode_ginvert(procedure, data_stack: data_stack, stack: stack):
 
     procedure.get_graphics_context().gINVERT(w, h)
 
-    _logger.debug(f"0xF2 - gINVERT({w}, {h})")
+    if TRACE:
+        _logger.debug(f"0xF2 - gINVERT({w}, {h})")
 
 
 def qcode_gscroll(procedure, data_stack: data_stack, stack: stack):
@@ -499,18 +569,21 @@ def qcode_gscroll(procedure, data_stack: data_stack, stack: stack):
 
     procedure.get_graphics_context().gSCROLL(dx, dy, xpos, ypos, width, height)
 
-    _logger.debug(f"0xE2 - gSCROLL({dx}, {dy}, {xpos}, {ypos}, {width}, {height})")
+    if TRACE:
+        _logger.debug(f"0xE2 - gSCROLL({dx}, {dy}, {xpos}, {ypos}, {width}, {height})")
 
 
 def qcode_createsprite(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0x3B - CREATESPRITE")
+    if TRACE:
+        _logger.debug(f"0x57 0x3B - CREATESPRITE")
     sprite_id = DrawableSprite.create_sprite()
 
     stack.push(0, sprite_id)
 
 
 def qcode_appendsprite(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x07 - APPENDSPRITE")
+    if TRACE:
+        _logger.debug("0x57 0x07 - APPENDSPRITE")
 
     # Nx: 0 = 2 arguments, 1 = 4 arguments
     nx = procedure.read_qcode_byte()
@@ -524,39 +597,44 @@ def qcode_appendsprite(procedure, data_stack: data_stack, stack: stack):
     bitmap_arr_addr = stack.pop()
     tenths = stack.pop()
 
-    _logger.debug(f"APPENDSPRITE {tenths}, {dx}, {dy}, {bitmap_arr_addr}")
+    if TRACE:
+        _logger.debug(f"APPENDSPRITE {tenths}, {dx}, {dy}, {bitmap_arr_addr}")
 
     spritelist = []
     for i in range(6):
-        dsf_text = data_stack.read(3, bitmap_arr_addr, i)
+        dsf_text = qstr_text(data_stack.read(3, bitmap_arr_addr, i))
 
         if len(dsf_text) == 0:
             trans_name = ""
         else:
             trans_name = translate_path_from_sibo(dsf_text, procedure.executable)
 
-        _logger.debug(f"{dsf_text} -> {trans_name}")
+        if TRACE:
+            _logger.debug(f"{dsf_text} -> {trans_name}")
         spritelist.append(trans_name)
 
     DrawableSprite.append_sprite(tenths, spritelist, dx, dy)
 
 
 def qcode_drawsprite(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x08 - DRAWSPRITE")
+    if TRACE:
+        _logger.debug("0x57 0x08 - DRAWSPRITE")
 
     dx, dy = stack.pop_2()
     procedure.get_window_manager().DRAWSPRITE(dx, dy)
 
 
 def qcode_posssprite(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x0A - POSSSPRITE")
+    if TRACE:
+        _logger.debug("0x57 0x0A - POSSSPRITE")
 
     dx, dy = stack.pop_2()
     procedure.get_window_manager().POSSSPRITE(dx, dy)
 
 
 def qcode_gsavebit(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xC5 - gSAVEBIT")
+    if TRACE:
+        _logger.debug("0xC5 - gSAVEBIT")
 
     # Nx: 0 = 1 argument, 1 = 3 arguments
     nx = procedure.read_qcode_byte()
@@ -564,7 +642,7 @@ def qcode_gsavebit(procedure, data_stack: data_stack, stack: stack):
     height = None if nx == 0 else stack.pop()
     width = None if nx == 0 else stack.pop()
 
-    name = stack.pop()
+    name = qstr_text(stack.pop())
     trans_name = translate_path_from_sibo(name, procedure.executable)
 
     procedure.get_graphics_context().gSAVEBIT(trans_name, width, height)
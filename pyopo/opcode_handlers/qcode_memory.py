@@ -1,9 +1,11 @@
 import logging
 import logging.config
 
-from pyopo.heap import data_stack
+from pyopo.heap import data_stack, to_heap_offset, to_int16_address
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -12,10 +14,11 @@ _logger = logging.getLogger()
 def qcode_pokeb(procedure, data_stack: data_stack, stack: stack):
     addr, val = stack.pop_2()
 
-    _logger.debug(f"0x9C - POKEB {addr}, {val}")
+    if TRACE:
+        _logger.debug(f"0x9C - POKEB {addr}, {val}")
 
     # Push a byte directly into memory
-    data_stack.memory[addr] = val
+    data_stack.memory[to_heap_offset(addr)] = val
 
 
 def qcode_poke(procedure, data_stack: data_stack, stack: stack):
@@ -24,33 +27,37 @@ def qcode_poke(procedure, data_stack: data_stack, stack: stack):
 
     addr, val = stack.pop_2()
 
-    _logger.debug(f"{hex(op_code)} - POKE {addr}, {val}")
+    if TRACE:
+        _logger.debug(f"{hex(op_code)} - POKE {addr}, {val}")
 
     # Push a byte directly into memory
-    data_stack.write(opcode_type, val, addr)
+    data_stack.write(opcode_type, val, to_heap_offset(addr))
 
 
 def qcode_peekb(procedure, data_stack: data_stack, stack: stack):
     addr = stack.pop()
-    val = data_stack.memory[addr]
+    val = data_stack.memory[to_heap_offset(addr)]
 
-    _logger.debug(f"0x57 0x1B - PEEKB({addr}) -> {val}")
+    if TRACE:
+        _logger.debug(f"0x57 0x1B - PEEKB({addr}) -> {val}")
     stack.push(0, val)
 
 
 def qcode_peekw(procedure, data_stack: data_stack, stack: stack):
     addr = stack.pop()
-    val = data_stack.read_int16(addr)
+    val = data_stack.read_int16(to_heap_offset(addr))
 
-    _logger.debug(f"0x57 0x19 - PEEKW({addr}) -> {val}")
+    if TRACE:
+        _logger.debug(f"0x57 0x19 - PEEKW({addr}) -> {val}")
     stack.push(0, val)
 
 
 def qcode_peekf(procedure, data_stack: data_stack, stack: stack):
     addr = stack.pop()
-    val = data_stack.read(2, addr)
+    val = data_stack.read(2, to_heap_offset(addr))
 
-    _logger.debug(f"0x57 0x8B - PEEKF({addr}) -> {val}")
+    if TRACE:
+        _logger.debug(f"0x57 0x8B - PEEKF({addr}) -> {val}")
     stack.push(0, val)
 
 
@@ -60,15 +67,17 @@ def qcode_alloc(procedure, data_stack: data_stack, stack: stack):
     # Allocate Dynamic Storage on the heap
     offset = data_stack.allocate_frame(size)
 
-    _logger.debug(f"0x57 0x4B - ALLOC({size}) -> {offset}")
+    if TRACE:
+        _logger.debug(f"0x57 0x4B - ALLOC({size}) -> {offset}")
 
-    stack.push(0, offset)
+    stack.push(0, to_int16_address(offset))
 
 
 def qcode_peek_str(procedure, data_stack: data_stack, stack: stack):
     addr = stack.pop()
-    val = data_stack.read(3, addr)
+    val = data_stack.read(3, to_heap_offset(addr))
 
-    _logger.debug(f"0x57 0xCF - PEEK$({addr}) -> {val}")
+    if TRACE:
+        _logger.debug(f"0x57 0xCF - PEEK$({addr}) -> {val}")
 
     stack.push(3, val)
@@ -4,28 +4,34 @@ import logging.config
 from pyopo import menu_manager
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_text
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
 
 def qcode_minit(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xEA - mINIT")
+    if TRACE:
+        _logger.debug("0xEA - mINIT")
 
     # Initialise new Menu
     procedure.executable.menu_manager = menu_manager.Menu()
 
 
 def qcode_mcard(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xEB - mCARD")
+    if TRACE:
+        _logger.debug("0xEB - mCARD")
 
     arg_count = procedure.read_qcode_byte()
 
     mcard_items = []
     for _ in range(arg_count):
         menu_title, menu_key_shortcut = stack.pop_2()
+        menu_title = qstr_text(menu_title)
 
         mcard_items.append((menu_title, menu_key_shortcut))
 
@@ -34,14 +40,15 @@ def qcode_mcard(procedure, data_stack: data_stack, stack: stack):
     # Reverse the menu item order to be in correct visual order
     mcard_items.reverse()
 
-    mcard_title = stack.pop()
+    mcard_title = qstr_text(stack.pop())
     print(f"Menu Title: {mcard_title}")
 
     procedure.executable.menu_manager.mCARD(mcard_title, mcard_items)
 
 
 def qcode_menu_var(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x3A - MENU pop%")
+    if TRACE:
+        _logger.debug("0x57 0x3A - MENU pop%")
 
     dsf_offset = stack.pop()
     value = data_stack.read(0, dsf_offset)
@@ -56,8 +63,15 @@ def qcode_menu_var(procedure, data_stack: data_stack, stack: stack):
 
     procedure.executable.menu_manager.MENU(mcard_index, item_index)
 
+    # Yield to the host, ending the executable's batch of instructions
+    return True
+
 
 def qcode_menu(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x36 - MENU")
+    if TRACE:
+        _logger.debug("0x57 0x36 - MENU")
 
     procedure.executable.menu_manager.MENU(0, 0)
+
+    # Yield to the host, ending the executable's batch of instructions
+    return True
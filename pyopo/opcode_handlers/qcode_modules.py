@@ -3,6 +3,7 @@ import logging
 import logging.config
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_text
 from pyopo.var_stack import stack
 
 from pyopo import pyopo
@@ -13,10 +14,20 @@ _logger = logging.getLogger()
 
 
 def qcode_loadm(procedure, data_stack: data_stack, stack: stack):
-    module_name = stack.pop()
+    module_name = qstr_text(stack.pop())
     translated_name = translate_path_from_sibo(module_name, procedure.executable)
 
-    loadm_module = pyopo.executable.load_executable(translated_name)
+    loadm_module = pyopo.executable.load_executable(
+        translated_name,
+        fuse_superinstructions=procedure.executable.fuse_superinstructions,
+        headless=procedure.executable.headless,
+        compile_basic_blocks=procedure.executable.compile_basic_blocks,
+        stack_implementation=procedure.executable.stack_implementation,
+        clock=procedure.executable.clock,
+        parse_procedures_eagerly=procedure.executable.parse_procedures_eagerly,
+        cache_procedures=procedure.executable.cache_procedures,
+        bytes_strings=procedure.executable.bytes_strings,
+    )
     procedure.executable.loadm(loadm_module)
 
     print(f"0xAE - LOADM {module_name} -> {translated_name}")
@@ -0,0 +1,100 @@
+import logging
+import logging.config
+
+from pyopo.heap import data_stack
+from pyopo.loader import qstr_value
+from pyopo.var_stack import stack
+
+from pyopo.trace import TRACE
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+# Procedure call and return opcodes change which procedure is executing, rather than completing
+# in place they raise a procedure flag and return True so the executable's main loop can act upon it.
+# Calls to procedures linked when loading (or on LOADM) are pushed onto the procedure stack directly.
+
+
+def qcode_call_proc(procedure, data_stack: data_stack, stack: stack):
+    # 0x53 - Call a procedure EE:
+    ee = procedure.read_qcode_uint16()
+
+    cp_match = procedure.procedure["cached_cp"].get(ee, None)
+    if not cp_match:
+        _logger.warning("Failed to determine called procedure")
+        procedure.flag_error = True
+        return True
+
+    if TRACE:
+        _logger.debug(
+            f" - PROCEDURE CALL! EE Ref {ee} - Calling PROC {cp_match['name']}:"
+        )
+
+    callee = cp_match["procedure"]
+    if callee is not None:
+        procedure.executable.call_procedure(callee)
+        return False
+
+    # Not linked, the callee is looked up by name
+    procedure.flag_callproc = cp_match["name"]
+    return True
+
+
+def qcode_call_proc_at(procedure, data_stack: data_stack, stack: stack):
+    # 0x6B - @(...) operator - Call a procedure by name
+    args = procedure.read_qcode_byte()
+    return_type = procedure.read_qcode_byte()
+    if TRACE:
+        _logger.debug(f"Return Type: {return_type}")
+
+    for _ in range(args):
+        # Retrieve the arguments
+        type_code = stack.pop()
+        arg_name = stack.pop()
+
+    # We do not currently use the arguments to validate the callee
+
+    procedure.flag_callproc = stack.pop()
+
+    # Add in the type code to the calling proc name, return type 0 is float
+    if return_type != 0:
+        # Floats don't have a return type character as they do not have a symbol
+        procedure.flag_callproc += chr(return_type)
+
+    if TRACE:
+        _logger.debug(
+            f" - Calling @ PROC {procedure.flag_callproc}(args = {args}) Return type = {return_type}:"
+        )
+
+    return True
+
+
+def qcode_return_default(procedure, data_stack: data_stack, stack: stack):
+    # 0x74 - 0x77 - RETURN with no value, the default of the procedure type is returned
+    op_code = procedure.get_executed_opcode()
+    if TRACE:
+        _logger.debug(" - 0x74 - 0x77 RETURN called")
+
+    # Store default values (none provided)
+    if op_code == 0x74:
+        stack.push(0, 0)
+    elif op_code == 0x75:
+        stack.push(1, 0)
+    elif op_code == 0x76:
+        stack.push(2, 0.0)
+    elif op_code == 0x77:
+        stack.push(3, qstr_value("", procedure.executable.bytes_strings))
+
+    procedure.flag_return = True
+    return True
+
+
+def qcode_return_pop(procedure, data_stack: data_stack, stack: stack):
+    # 0xC0 - RETURN pop+ (type popped depends on procedure type)
+    if TRACE:
+        _logger.debug(
+            f" - 0xCO RETURN pop+ called - {procedure.get_program_counter()} / {procedure.procedure['qcode_len']} / {len(stack)}"
+        )
+    procedure.flag_return = True
+    return True
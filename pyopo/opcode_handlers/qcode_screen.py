@@ -2,8 +2,11 @@ import logging
 import logging.config
 
 from pyopo.heap import data_stack
+from pyopo.loader import qstr_text
 from pyopo.var_stack import stack
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -11,23 +14,27 @@ _logger = logging.getLogger()
 
 def qcode_print_semi(procedure, data_stack: data_stack, stack: stack):
     op_code = procedure.get_executed_opcode()
-    _logger.debug(
-        f"{hex(op_code)} - PRINT pop+ ; (i.e. with no following space or newline)"
-    )
+    if TRACE:
+        _logger.debug(
+            f"{hex(op_code)} - PRINT pop+ ; (i.e. with no following space or newline)"
+        )
 
     value = stack.pop()
-    _logger.debug(f" - PRINT {value} ; - STUB")
+    if TRACE:
+        _logger.debug(f" - PRINT {qstr_text(value)} ; - STUB")
 
 
 def qcode_style(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x05 - STYLE")
+    if TRACE:
+        _logger.debug("0xFF 0x05 - STYLE")
 
     value = stack.pop()
     procedure.executable.window_manager.text_window.STYLE(value)
 
 
 def qcode_screen_4(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xC3 - SCREEN pop%4 pop%3 pop%2 pop%1 - STUB")
+    if TRACE:
+        _logger.debug(f"0xC3 - SCREEN pop%4 pop%3 pop%2 pop%1 - STUB")
 
     value = stack.pop()
     value = stack.pop()
@@ -38,31 +45,36 @@ def qcode_screen_4(procedure, data_stack: data_stack, stack: stack):
 
 def qcode_print(procedure, data_stack: data_stack, stack: stack):
     op_code = procedure.get_executed_opcode()
-    _logger.debug(f"{hex(op_code)} - PRINT (i.e. newline at end of printing) - STUB")
+    if TRACE:
+        _logger.debug(f"{hex(op_code)} - PRINT (i.e. newline at end of printing) - STUB")
 
 
 def qcode_font(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xFF 0x04 - FONT pop%2 pop%1 - STUB")
+    if TRACE:
+        _logger.debug("0xFF 0x04 - FONT pop%2 pop%1 - STUB")
 
     pop_1 = stack.pop()
     pop_2 = stack.pop()
 
 
 def qcode_at(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x9E - AT pop%2 pop%1")
+    if TRACE:
+        _logger.debug("0x9E - AT pop%2 pop%1")
 
     x, y = stack.pop_2()
     procedure.executable.window_manager.text_window.AT(x, y)
 
 
 def qcode_cls(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0xA2 - CLS)")
+    if TRACE:
+        _logger.debug("0xA2 - CLS)")
 
     procedure.executable.window_manager.text_window.CLS()
 
 
 def qcode_cursor(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xA6 - CURSOR")
+    if TRACE:
+        _logger.debug(f"0xA6 - CURSOR")
 
     cursor_arg = procedure.read_qcode_byte()
     if cursor_arg > 1:
@@ -73,7 +85,8 @@ def qcode_cursor(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_screeninfo(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0xFF 0x14 - SCREENINFO var%()")
+    if TRACE:
+        _logger.debug(f"0xFF 0x14 - SCREENINFO var%()")
 
     addr = stack.pop()
     dsf_offset = data_stack.read_int16(addr)
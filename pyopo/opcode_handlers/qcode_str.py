@@ -2,6 +2,7 @@ import struct
 import time
 
 from pyopo.heap import data_stack
+from pyopo.loader import QSTR_ENCODING, qstr_value
 from pyopo.var_stack import stack
 
 from pyopo.opl_exceptions import *
@@ -9,49 +10,106 @@ from pyopo.opl_exceptions import *
 import logging
 import logging.config
 
+from pyopo.trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
 
 
+def _case_table(convert) -> bytes:
+    """Returns a bytes.translate table converting the case of the Psion character set, characters
+    without a single character counterpart in it are left unchanged"""
+    table = bytearray(range(256))
+    for code in range(256):
+        converted = convert(bytes([code]).decode(QSTR_ENCODING))
+        if len(converted) == 1:
+            try:
+                table[code] = converted.encode(QSTR_ENCODING)[0]
+            except UnicodeEncodeError:
+                pass
+
+    return bytes(table)
+
+
+# Case conversion of bytes strings
+UPPER_TABLE = _case_table(str.upper)
+LOWER_TABLE = _case_table(str.lower)
+
+
+def _upper(value):
+    """Returns a string value in upper case"""
+    if isinstance(value, bytes):
+        return value.translate(UPPER_TABLE)
+
+    return str(value).upper()
+
+
+def _lower(value):
+    """Returns a string value in lower case"""
+    if isinstance(value, bytes):
+        return value.translate(LOWER_TABLE)
+
+    return str(value).lower()
+
+
 def qcode_val(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x92 - VAL(pop$)")
+    if TRACE:
+        _logger.debug("0x57 0x92 - VAL(pop$)")
     stack.push(2, float(stack.pop()))
 
 
 def qcode_chr(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC0 - CHR$(pop+%1)")
-    stack.push(3, chr(int(stack.pop())))
+    if TRACE:
+        _logger.debug("0x57 0xC0 - CHR$(pop+%1)")
+    code = int(stack.pop())
+
+    # Character codes are of the Psion character set
+    if code < 0 or code > 255:
+        raise ValueError(
+            f"CHR$({code}): {opl_error_code_descriptions[KErrInvalidArgs]}"
+        )
+
+    character = bytes([code])
+    if not procedure.executable.bytes_strings:
+        character = character.decode(QSTR_ENCODING)
+
+    stack.push(3, character)
 
 
 def qcode_asc(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x01 - ASC(pop$1)")
+    if TRACE:
+        _logger.debug("0x57 0x01 - ASC(pop$1)")
 
     pop_1 = stack.pop()
 
     res = 0
-    if len(pop_1) > 0:
-        res = ord(pop_1[0])
-
-    if res > 255:
-        # Outside ASCII range
-        # _logger.warning('Warning: ASC outside ASCII range - defaulting to 0')
-        res = 0
+    if isinstance(pop_1, bytes):
+        res = pop_1[0] if len(pop_1) > 0 else 0
+    elif len(pop_1) > 0:
+        try:
+            res = pop_1[0].encode(QSTR_ENCODING)[0]
+        except UnicodeEncodeError:
+            # Outside the Psion character set
+            # _logger.warning('Warning: ASC outside character set - defaulting to 0')
+            res = 0
 
     stack.push(0, res)
 
 
 def qcode_len(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x14 - LEN(pop$1)")
+    if TRACE:
+        _logger.debug("0x57 0x14 - LEN(pop$1)")
     stack.push(0, len(stack.pop()))
 
 
 def qcode_loc(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x15 - push% LOC(pop$2, pop$1)")
+    if TRACE:
+        _logger.debug("0x57 0x15 - push% LOC(pop$2, pop$1)")
 
     # Search is case invariant
-    pop_1: str = stack.pop().upper()
-    pop_2: str = stack.pop().upper()
+    pop_1 = _upper(stack.pop())
+    pop_2 = _upper(stack.pop())
 
     # Find returns -1 if not found, or 0 based otherwise.
     # The OPL command is 0 if not found and 1 based
@@ -61,7 +119,8 @@ def qcode_loc(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_left(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xCA - push$ LEFT$(pop$2, pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xCA - push$ LEFT$(pop$2, pop%1)")
 
     """
     Emulator Testing Notes:
@@ -86,7 +145,8 @@ def qcode_left(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_rept(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD0 - push$ REPT$(pop$2, pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xD0 - push$ REPT$(pop$2, pop%1)")
 
     pop_2, pop_1 = stack.pop_2()
 
@@ -96,7 +156,8 @@ def qcode_rept(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_gen(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC6 - push$ GEN$(pop*2, pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xC6 - push$ GEN$(pop*2, pop%1)")
 
     x, y = stack.pop_2()
     if int(x) == x:
@@ -123,16 +184,18 @@ def qcode_gen(procedure, data_stack: data_stack, stack: stack):
 
     # print(f" - = '{res}'")
 
-    stack.push(3, res)
+    stack.push(3, qstr_value(res, procedure.executable.bytes_strings))
 
 
 def qcode_num(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xCE - push$ NUM$(pop*2, pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xCE - push$ NUM$(pop*2, pop%1)")
 
     x, y = stack.pop_2()
 
     if abs(x) == x:
-        _logger.debug(f"{x} is abs(x), ignoring decimal")
+        if TRACE:
+            _logger.debug(f"{x} is abs(x), ignoring decimal")
         x = abs(x)
 
     res = str(int(x))
@@ -145,11 +208,12 @@ def qcode_num(procedure, data_stack: data_stack, stack: stack):
 
     # print(f" - NUM$({x}, {y}) = {res}")
 
-    stack.push(3, res)
+    stack.push(3, qstr_value(res, procedure.executable.bytes_strings))
 
 
 def qcode_fix(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"0x57 0xC5 - push$ FIX$(pop*3, pop%2, pop%1)")
+    if TRACE:
+        _logger.debug(f"0x57 0xC5 - push$ FIX$(pop*3, pop%2, pop%1)")
 
     x, y, z = stack.pop_n(3)
 
@@ -169,11 +233,12 @@ def qcode_fix(procedure, data_stack: data_stack, stack: stack):
 
     # print(f" - FIX$({x}, {y}, {z}) = {res}")
 
-    stack.push(3, res)
+    stack.push(3, qstr_value(res, procedure.executable.bytes_strings))
 
 
 def qcode_mid(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xCC - push$ MID$ pop$3 pop%2 pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xCC - push$ MID$ pop$3 pop%2 pop%1)")
 
     a, x, y = stack.pop_n(3)
 
@@ -186,7 +251,8 @@ def qcode_mid(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_right(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD1 - push$ RIGHT$(pop*2, pop%1)")
+    if TRACE:
+        _logger.debug("0x57 0xD1 - push$ RIGHT$(pop*2, pop%1)")
 
     """
     Emulator Testing Notes:
@@ -211,22 +277,26 @@ def qcode_right(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_upper(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD3 - push$ UPPER$ pop$")
-    stack.push(3, str(stack.pop()).upper())
+    if TRACE:
+        _logger.debug("0x57 0xD3 - push$ UPPER$ pop$")
+    stack.push(3, _upper(stack.pop()))
 
 
 def qcode_lower(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xCB - push$ LOWER$ pop$")
-    stack.push(3, str(stack.pop()).lower())
+    if TRACE:
+        _logger.debug("0x57 0xCB - push$ LOWER$ pop$")
+    stack.push(3, _lower(stack.pop()))
 
 
 def qcode_hex(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xC8 - push$ HEX$ pop&")
-    stack.push(3, hex(stack.pop()))
+    if TRACE:
+        _logger.debug("0x57 0xC8 - push$ HEX$ pop&")
+    stack.push(3, qstr_value(hex(stack.pop()), procedure.executable.bytes_strings))
 
 
 def qcode_sci(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0xD2 - push$ LOWER$ pop$")
+    if TRACE:
+        _logger.debug("0x57 0xD2 - push$ LOWER$ pop$")
 
     x, y, z = stack.pop_n(3)
 
@@ -243,4 +313,4 @@ def qcode_sci(procedure, data_stack: data_stack, stack: stack):
     elif len(res) > z:
         res = "*" * z
 
-    stack.push(3, res)
+    stack.push(3, qstr_value(res, procedure.executable.bytes_strings))
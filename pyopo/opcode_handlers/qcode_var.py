@@ -4,10 +4,12 @@ from pyopo.opl_exceptions import *
 import logging
 import logging.config
 
-from pyopo.heap import data_stack
+from pyopo.heap import data_stack, READERS, WRITERS, to_int16_address
 from pyopo.var_stack import stack
 
-from pyopo.loader import loader
+from pyopo.loader import loader, qstr_text, qstr_value
+
+from pyopo.trace import TRACE
 
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
@@ -18,13 +20,42 @@ STRUCT_FORMAT_UINT16 = struct.Struct("<H")
 STRUCT_FORMAT_INT16 = struct.Struct("<h")
 
 
+def resolve_ee_global(procedure, ee_ref: int):
+    """Returns the (DSF offset, declaring frame, string length) of the global declared or referenced
+    by the procedure's EE reference, None if it is not a global (i.e. a parameter)"""
+    entry = procedure.procedure["cached_gd"].get(ee_ref) or procedure.procedure[
+        "cached_gr"
+    ].get(ee_ref)
+
+    if entry is None:
+        return None
+
+    # Globals are indexed by the executable as procedures are entered and exited
+    return procedure.executable.global_index.get(entry["name"])
+
+
+def resolve_ee_array(procedure, ee_ref: int) -> tuple[int, int]:
+    """Returns the DSF offset and string length (0 unless a string) of a global array, caching it"""
+    array_entry = procedure.ee_array_cache.get(ee_ref)
+
+    if array_entry is None:
+        global_entry = resolve_ee_global(procedure, ee_ref)
+        if global_entry is None:
+            raise KeyError(f"Unable to determine EE ref: {ee_ref}")
+
+        array_entry = (global_entry[0], global_entry[2])
+        procedure.ee_array_cache[ee_ref] = array_entry
+
+    return array_entry
+
+
 def qcode_push_var(procedure, data_stack: data_stack, stack: stack):
     dsf_offset = procedure.data_stack_frame_offset + procedure.read_qcode_uint16()
 
     op_code = procedure.get_executed_opcode()
     assert op_code >= 0 and op_code < 4
 
-    value = data_stack.read(op_code, dsf_offset)
+    value = READERS[op_code](data_stack, dsf_offset)
 
     # _logger.debug(f"{hex(op_code)} - push+ {value} of Type: {op_code} at LL+ DSF Offset: {dsf_offset}")
 
@@ -68,15 +99,16 @@ def qcode_push_addr_array(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_push_addr_field(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(
-        f"{hex(procedure.get_executed_opcode())} - push= the address of field pop$+ of data file D"
-    )
+    if TRACE:
+        _logger.debug(
+            f"{hex(procedure.get_executed_opcode())} - push= the address of field pop$+ of data file D"
+        )
 
     array_type = procedure.get_executed_opcode() - 0x24
 
     d = procedure.read_qcode_byte()  # DBF D Byte
 
-    var_name = stack.pop()
+    var_name = qstr_text(stack.pop())
 
     dsf_offset = -1
     for database in procedure.executable.databases:
@@ -96,29 +128,37 @@ def qcode_push_addr_field(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_push_value_field(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(
-        f"{hex(procedure.get_executed_opcode())} - push= the value of field pop$+ of data file D"
-    )
+    if TRACE:
+        _logger.debug(
+            f"{hex(procedure.get_executed_opcode())} - push= the value of field pop$+ of data file D"
+        )
 
     d = procedure.read_qcode_byte()  # DBF D Byte
 
-    var_name = stack.pop()
+    var_name = qstr_text(stack.pop())
 
     found_db_field = False
     for database in procedure.executable.databases:
         if database["d"] == d:
-            _logger.debug(f"Found DB: {d}")
+            if TRACE:
+                _logger.debug(f"Found DB: {d}")
             for i in range(len(database["vars"])):
                 if database["vars"][i][1] == var_name:
-                    _logger.debug("Found DB Field Var")
+                    if TRACE:
+                        _logger.debug("Found DB Field Var")
                     db_field_val = database["handler"].current_record[
                         database["vars"][i][1]
                     ]
                     db_field_type = database["vars"][i][0]
+                    if db_field_type == 3:
+                        db_field_val = qstr_value(
+                            db_field_val, procedure.executable.bytes_strings
+                        )
 
-                    _logger.debug(
-                        f"Found DB Field Var {var_name} of value {db_field_val} of type {db_field_type}"
-                    )
+                    if TRACE:
+                        _logger.debug(
+                            f"Found DB Field Var {var_name} of value {db_field_val} of type {db_field_type}"
+                        )
 
                     stack.push(db_field_type, db_field_val)
                     found_db_field = True
@@ -176,21 +216,23 @@ def qcode_push_addr(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_uadd(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x50 - push= UADD pop%2 pop%1")
+    if TRACE:
+        _logger.debug("0x57 0x50 - push= UADD pop%2 pop%1")
 
     # Convert INT16 vals to UINT16
     y = STRUCT_FORMAT_UINT16.unpack_from(STRUCT_FORMAT_INT16.pack(stack.pop()))[0]
     x = STRUCT_FORMAT_UINT16.unpack_from(STRUCT_FORMAT_INT16.pack(stack.pop()))[0]
-    stack.push(0, x + y)
+    stack.push(0, to_int16_address(x + y))
 
 
 def qcode_usub(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x51 - push= USUB pop%2 pop%1")
+    if TRACE:
+        _logger.debug("0x57 0x51 - push= USUB pop%2 pop%1")
 
     # Convert INT16 vals to UINT16
     y = STRUCT_FORMAT_UINT16.unpack_from(STRUCT_FORMAT_INT16.pack(stack.pop()))[0]
     x = STRUCT_FORMAT_UINT16.unpack_from(STRUCT_FORMAT_INT16.pack(stack.pop()))[0]
-    stack.push(0, x - y)
+    stack.push(0, to_int16_address(x - y))
 
 
 def qcode_push_vv_plus(procedure, data_stack: data_stack, stack: stack):
@@ -213,6 +255,7 @@ def qcode_push_vv_plus(procedure, data_stack: data_stack, stack: stack):
         stack_val = loader._read_qstr(pc, procedure.procedure["qcode"])
         # _logger.info(f"VV+ value: {stack_type} {len(stack_val)} {stack_val}")
         procedure.set_program_counter_delta(len(stack_val) + 1)
+        stack_val = qstr_value(stack_val, procedure.executable.bytes_strings)
     else:
         raise ("Invalid VV opcode type")
 
@@ -240,7 +283,8 @@ def qcode_push_vv_long(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_push_vv_word_to_long(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"{hex(procedure.get_executed_opcode())} - push& VV%")
+    if TRACE:
+        _logger.debug(f"{hex(procedure.get_executed_opcode())} - push& VV%")
 
     vv_val_raw = procedure.read_qcode_uint16()
 
@@ -258,7 +302,8 @@ def qcode_push_vv_word_to_long(procedure, data_stack: data_stack, stack: stack):
 
 
 def qcode_push_vv_word(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x4F - push% VV! ($80 to $FF convert to $FF80 to $FFFF)")
+    if TRACE:
+        _logger.debug("0x4F - push% VV! ($80 to $FF convert to $FF80 to $FFFF)")
 
     # Takes a byte and returns a Word
     vv_val_byte = procedure.read_qcode_byte()
@@ -271,7 +316,8 @@ def qcode_push_vv_word(procedure, data_stack: data_stack, stack: stack):
     # Convert UInt16 to Int16
     vv_val = STRUCT_FORMAT_INT16.unpack(STRUCT_FORMAT_UINT16.pack(vv_val))[0]
 
-    _logger.debug(f"push% {vv_val} VV! {vv_val_byte}")
+    if TRACE:
+        _logger.debug(f"push% {vv_val} VV! {vv_val_byte}")
 
     stack.push(0, vv_val)  # Push Word
 
@@ -296,11 +342,12 @@ def qcode_store_pop1_in_pop2(procedure, data_stack: data_stack, stack: stack):
                     if i == field_index:
                         database["handler"].current_record[
                             database["vars"][i][1]
-                        ] = stack_val
+                        ] = qstr_text(stack_val)
                         stored = True
-                        _logger.debug(
-                            f" - Storing {stack_val} to Database {d} field {field_index} {database['vars'][i][1]}"
-                        )
+                        if TRACE:
+                            _logger.debug(
+                                f" - Storing {stack_val} to Database {d} field {field_index} {database['vars'][i][1]}"
+                            )
                         break
                 break
 
@@ -309,7 +356,7 @@ def qcode_store_pop1_in_pop2(procedure, data_stack: data_stack, stack: stack):
 
     else:
         # print(f" - Storing {stack_val} to DSF Addr {stack_addr}")
-        data_stack.write(stack_type, stack_val, stack_addr)
+        WRITERS[stack_type](data_stack, stack_val, stack_addr)
 
 
 def qcode_push_ee_addr(procedure, data_stack: data_stack, stack: stack):
@@ -321,43 +368,15 @@ def qcode_push_ee_addr(procedure, data_stack: data_stack, stack: stack):
     dsf_offset = procedure.ee_dsf_cache.get(ee_ref, -1)
 
     if dsf_offset == -1:
-        # Attempt to find the EE
-        gd_entry = procedure.procedure["cached_gd"].get(ee_ref)
-        if gd_entry:
-            gd_name = gd_entry["name"]
-
-            # Check the first instance in the DS
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gd_name, None)
-                if gd:
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    # print(f"Found Global Reference {gd_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}")
-                    break
-
-    if dsf_offset == -1:
-        gr_entry = procedure.procedure["cached_gr"].get(ee_ref)
-        if gr_entry:
-            gr_name = gr_entry["name"]
-
-            # Find which procedure declared it
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gr_name, None)
-                if gd:
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    # print(f"Found Global Reference {gr_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}")
-                    break
+        global_entry = resolve_ee_global(procedure, ee_ref)
+        if global_entry is None:
+            raise KeyError(f"Unable to find EE value: {ee_ref}")
 
-    if dsf_offset == -1:
-        raise (f"Unable to find EE value: {ee_ref}")
+        dsf_offset = global_entry[0]
 
-    # Cache the DSF offset for future use
-    procedure.ee_dsf_cache[ee_ref] = dsf_offset
+        # Cache the DSF offset for future use
+        procedure.ee_dsf_cache[ee_ref] = dsf_offset
 
-    # print(f" - max EE ref: {procedure.procedure['max_ee_ref']}")
     # print(f" - Storing DSF Addr {dsf_offset} of EE ref {ee_ref}")
 
     stack.push(4, dsf_offset)
@@ -371,142 +390,66 @@ def qcode_push_ee_value(procedure, data_stack: data_stack, stack: stack):
     # Check to see if the EE reference is already cached, to remove the lookup overhead
     dsf_offset = procedure.ee_dsf_cache.get(ee_ref, -1)
 
-    # Attempt to find the EE
-    if dsf_offset == -1:
-        gd_entry = procedure.procedure["cached_gd"].get(ee_ref)
-        if gd_entry:
-            gd_name = gd_entry["name"]
-
-            # Check the first instance in the DS
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gd_name, None)
-                if gd:
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    # print(f"Found Global Reference {gd_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}")
-                    break
-
-    if dsf_offset == -1:
-        gr_entry = procedure.procedure["cached_gr"].get(ee_ref)
-        if gr_entry:
-            gr_name = gr_entry["name"]
-
-            # Find which procedure declared it
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gr_name, None)
-                if gd:
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    # print(f"Found Global Reference {gr_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}")
-                    break
-
     if dsf_offset == -1:
-        for param in procedure.procedure["parameters"]:
-            if param["ee"] == ee_ref:
-                # Params are read only
+        slot = procedure.procedure["parameter_slots"].get(ee_ref)
+        if slot is not None:
+            # Params are read only
+            value_type, value = procedure.parameters[slot]
+            stack.push(value_type, value)
+            return
 
-                # print(param)
-                # print(f" - Value: { param['value']} of Type: {param['type']} at EE Ref: {ee_ref}")
+        global_entry = resolve_ee_global(procedure, ee_ref)
+        if global_entry is None:
+            raise KeyError(f"Unable to find EE ref: {ee_ref}")
 
-                stack.push(param["type"], param["value"])
-                return
+        dsf_offset = global_entry[0]
 
-    if dsf_offset == -1:
-        raise (f"Unable to find EE ref: {ee_ref}")
-    else:
         # Cache the DSF offset for future use (when not a param)
         procedure.ee_dsf_cache[ee_ref] = dsf_offset
 
-    # print(f" - max EE ref: {procedure.procedure['max_ee_ref']}")
-    # print(f" - Retrieving value for DSF Addr {dsf_offset} of EE ref {ee_ref}")
-
     ee_type = procedure.get_executed_opcode() - 0x08
 
-    value = data_stack.read(ee_type, dsf_offset)
-    _logger.debug(f" - Value: {value} of Type: {ee_type} at DSF Offset: {dsf_offset}")
+    value = READERS[ee_type](data_stack, dsf_offset)
+    if TRACE:
+        _logger.debug(f" - Value: {value} of Type: {ee_type} at DSF Offset: {dsf_offset}")
 
     stack.push(ee_type, value)
 
 
 def qcode_pop_discard(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"{hex(procedure.get_executed_opcode())} - pop+ and discard")
+    if TRACE:
+        _logger.debug(f"{hex(procedure.get_executed_opcode())} - pop+ and discard")
     stack.pop()
 
 
 def qcode_push_word_pop(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"{hex(procedure.get_executed_opcode())} - push% value of pop+")
+    if TRACE:
+        _logger.debug(f"{hex(procedure.get_executed_opcode())} - push% value of pop+")
     stack.push(0, int(stack.pop()))
 
 
 def qcode_push_long_pop(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"{hex(procedure.get_executed_opcode())} - push& value of pop+")
+    if TRACE:
+        _logger.debug(f"{hex(procedure.get_executed_opcode())} - push& value of pop+")
     stack.push(1, int(stack.pop()))
 
 
 def qcode_push_real_pop(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(f"{hex(procedure.get_executed_opcode())} - push* value of pop+")
+    if TRACE:
+        _logger.debug(f"{hex(procedure.get_executed_opcode())} - push* value of pop+")
     stack.push(2, float(stack.pop()))
 
 
 def qcode_push_ee_array_addr(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(
-        f"{hex(procedure.get_executed_opcode())} - push+ the addr of EE+(pop%)"
-    )
+    if TRACE:
+        _logger.debug(
+            f"{hex(procedure.get_executed_opcode())} - push+ the addr of EE+(pop%)"
+        )
 
     ee_ref = procedure.read_qcode_uint16()
     array_type = procedure.get_executed_opcode() - 0x1C
 
-    # Check to see if the EE reference is already cached when not referencing a string
-    dsf_offset = -1 if array_type == 3 else procedure.ee_dsf_cache.get(ee_ref, -1)
-
-    ref_proc = None
-
-    # Attempt to find the EE
-
-    if dsf_offset == -1:
-        gd_entry = procedure.procedure["cached_gd"].get(ee_ref)
-        if gd_entry:
-            gd_name = gd_entry["name"]
-
-            # Check the first instance in the DS
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gd_name, None)
-                if gd:
-                    ref_proc = proc
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    _logger.debug(
-                        f"Found Global Declaration {gd_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}"
-                    )
-                    break
-
-    if dsf_offset == -1:
-        gr = procedure.procedure["cached_gr"].get(ee_ref, None)
-
-        if gr:
-            gr_name = gr["name"]
-
-            # Find which procedure declared it
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gr_name, None)
-                if gd:
-                    ref_proc = proc
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    _logger.debug(
-                        f"Found Global Reference {gr_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}"
-                    )
-                    break
-
-    if dsf_offset == -1:
-        raise (f"Unable to find EE Ref: {ee_ref}")
-
-    # Cache the DSF offset for future use
-    procedure.ee_dsf_cache[ee_ref] = dsf_offset
+    dsf_offset, string_length = resolve_ee_array(procedure, ee_ref)
 
     array_index = stack.pop() - 1  # OPL addresses start at 1
 
@@ -521,102 +464,53 @@ def qcode_push_ee_array_addr(procedure, data_stack: data_stack, stack: stack):
         dsf_offset += 8 * array_index
     elif array_type == 3:
         # String Array
-        string_dec_entry = ref_proc.procedure["string_declarations"].get(
-            dsf_offset - ref_proc.data_stack_frame_offset - 1, None
-        )
-
-        if string_dec_entry:
-            dsf_offset += (
-                string_dec_entry["length"] + 1
-            ) * array_index  # QStrs have length byte too
-        else:
+        if not string_length:
             raise ("Unable to determine string length")
 
-    _logger.debug(
-        f" - Storing DSF Addr {dsf_offset} of EE ref {ee_ref} ({array_index})"
-    )
+        dsf_offset += (string_length + 1) * array_index  # QStrs have length byte too
+
+    if TRACE:
+        _logger.debug(
+            f" - Storing DSF Addr {dsf_offset} of EE ref {ee_ref} ({array_index})"
+        )
 
     stack.push(4, dsf_offset)
 
 
 def qcode_addr(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x00 - push% ADDR pop=")
+    if TRACE:
+        _logger.debug("0x57 0x00 - push% ADDR pop=")
 
     # Convert from uint16 addr to int16
     # print(f" - Pushing Addr {addr} to Stack as Word")
 
-    stack.push(0, stack.pop())  # Push Word
+    stack.push(0, to_int16_address(stack.pop()))  # Push Word
 
 
 def qcode_addr_str(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug("0x57 0x1F - push% ADDR pop= (str)")
+    if TRACE:
+        _logger.debug("0x57 0x1F - push% ADDR pop= (str)")
 
     # Convert from uint16 addr to int16
-    addr = stack.pop() - 1  # String addresses having leading length byte
+    # String addresses having leading length byte
+    addr = to_int16_address(stack.pop() - 1)
 
-    _logger.debug(f" - Pushing Addr {addr} to Stack as Word")
+    if TRACE:
+        _logger.debug(f" - Pushing Addr {addr} to Stack as Word")
 
     stack.push(0, addr)  # Push Word
 
 
 def qcode_push_ee_array_val(procedure, data_stack: data_stack, stack: stack):
-    _logger.debug(
-        f"{hex(procedure.get_executed_opcode())} - push+ the value of EE+(pop%)"
-    )
+    if TRACE:
+        _logger.debug(
+            f"{hex(procedure.get_executed_opcode())} - push+ the value of EE+(pop%)"
+        )
 
     ee_ref = procedure.read_qcode_uint16()
     array_type = procedure.get_executed_opcode() - 0x18
 
-    # Check to see if the EE reference is already cached if its not a string
-    dsf_offset = -1 if array_type == 3 else procedure.ee_dsf_cache.get(ee_ref, -1)
-
-    ref_proc = None
-
-    if dsf_offset == -1:
-        # Attempt to find the EE
-
-        gd = procedure.procedure["cached_gd"].get(ee_ref, None)
-
-        if gd:
-            gd_name = gd["name"]
-
-            # Check the first instance in the DS
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gd_name, None)
-                if gd:
-                    ref_proc = proc
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    _logger.debug(
-                        f"Found Global Declaration {gd_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}"
-                    )
-                    break
-
-    if dsf_offset == -1:
-        gr = procedure.procedure["cached_gr"].get(ee_ref, None)
-        if gr:
-            gr_name = gr["name"]
-
-            # Find which procedure declared it
-            for proc in procedure.executable.proc_stack:
-                gd = proc.procedure["global_declarations"].get(gr_name, None)
-                if gd:
-                    ref_proc = proc
-                    dsf_offset = (
-                        proc.data_stack_frame_offset + gd["data_stack_frame_offset"]
-                    )  # DSF Offset is for callee Proc
-                    _logger.debug(
-                        f"Found Global Reference!! {gr_name} Originally declared in Stack Proc {proc.procedure['name']} at DSF Offset {dsf_offset}"
-                    )
-                    break
-
-    if dsf_offset == -1:
-        # _logger.warning(f'Unable to determine EE ref: {ee_ref}')
-        raise (f"Unable to determine EE ref: {ee_ref}")
-
-    # Cache the DSF offset for future use
-    procedure.ee_dsf_cache[ee_ref] = dsf_offset
+    dsf_offset, string_length = resolve_ee_array(procedure, ee_ref)
 
     if array_type != 3:
         ee_val = data_stack.read(array_type, dsf_offset, stack.pop())
@@ -626,19 +520,14 @@ def qcode_push_ee_array_val(procedure, data_stack: data_stack, stack: stack):
         assert array_index >= 0
 
         # String Array
-        string_dec_entry = ref_proc.procedure["string_declarations"].get(
-            dsf_offset - ref_proc.data_stack_frame_offset - 1, None
-        )
-
-        if string_dec_entry:
-            dsf_offset += (
-                string_dec_entry["length"] + 1
-            ) * array_index  # QStrs have length byte too
-        else:
+        if not string_length:
             raise ("Unable to determine string length")
 
+        dsf_offset += (string_length + 1) * array_index  # QStrs have length byte too
+
         ee_val = data_stack.read(array_type, dsf_offset)
 
-    _logger.debug(f" - Storing Value {ee_val} DSF Addr {dsf_offset} of EE ref {ee_ref}")
+    if TRACE:
+        _logger.debug(f" - Storing Value {ee_val} DSF Addr {dsf_offset} of EE ref {ee_ref}")
 
     stack.push(array_type, ee_val)
@@ -1,3 +1,5 @@
+from typing import Callable
+
 from pyopo.opcode_handlers import (
     qcode_var,
     qcode_cmp,
@@ -14,6 +16,7 @@ from pyopo.opcode_handlers import (
     qcode_datetime,
     qcode_kernel,
     qcode_dialog,
+    qcode_proc,
 )
 
 from .opl_exceptions import *
@@ -41,6 +44,15 @@ def qcode_invalid_opcode(procedure, data_stack: data_stack, stack: stack):
     procedure.flag_stop = True
 
 
+def qcode_not_implemented(procedure, data_stack: data_stack, stack: stack):
+    # Fallback of the dispatch tables, the opcode is valid but the emulator does not implement it
+    opcode = procedure.get_executed_opcode()
+    _logger.error(f"Opcode not yet implemented: {hex(opcode)}")
+
+    procedure.flag_error = True
+    return True
+
+
 opcode_handler = {
     0x00: qcode_var.qcode_push_var,
     0x01: qcode_var.qcode_push_var,
@@ -429,3 +441,38 @@ opcode_0xFF_handler = {
     0x10: qcode_graphics.qcode_gxborder,  # STUB - uses gBORDER
     0x14: qcode_screen.qcode_screeninfo,
 }
+
+# Opcodes that call or return from procedures, these flag the executable to switch procedure
+opcode_proc_handler = {
+    0x53: qcode_proc.qcode_call_proc,
+    0x6B: qcode_proc.qcode_call_proc_at,
+    0x74: qcode_proc.qcode_return_default,
+    0x75: qcode_proc.qcode_return_default,
+    0x76: qcode_proc.qcode_return_default,
+    0x77: qcode_proc.qcode_return_default,
+    0xC0: qcode_proc.qcode_return_pop,
+}
+
+
+def _dispatch_table(handlers: dict[int, Callable]) -> list[Callable]:
+    """Returns a 256 entry table indexed by opcode, opcodes without a handler fall back to
+    qcode_not_implemented"""
+    table = [qcode_not_implemented] * 256
+    for op_code, handler in handlers.items():
+        table[op_code] = handler
+
+    return table
+
+
+# Dense dispatch tables, the primary table includes the procedure call and return opcodes
+opcode_table = _dispatch_table(opcode_handler | opcode_proc_handler)
+opcode_0x57_table = _dispatch_table(opcode_0x57_handler)
+opcode_0xED_table = _dispatch_table(opcode_0xED_handler)
+opcode_0xFF_table = _dispatch_table(opcode_0xFF_handler)
+
+# Dispatch tables of the opcodes following a prefix byte
+opcode_prefix_tables = {
+    0x57: opcode_0x57_table,
+    0xED: opcode_0xED_table,
+    0xFF: opcode_0xFF_table,
+}
@@ -0,0 +1,202 @@
+import hashlib
+import marshal
+import mmap
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from .loader import loader, opo_header, embedded_file
+from .decoder import decode_procedure
+from .opcodes import opcode_table, opcode_prefix_tables
+
+import logging
+import logging.config
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+"""
+The procedure cache stores the parsed headers, procedure table and decoded instruction streams of an
+executable, keyed by a hash of its content, so loading an unchanged file again skips parsing.
+
+Handlers are not marshallable, cached instructions hold (op_code, opcode_hint, operand_pc, next_pc,
+operands) and are bound to the handlers of the current dispatch tables when the procedure is first
+called. Superinstructions and compiled blocks are not cached, they are rebuilt as usual.
+"""
+
+# Caching is disabled by default, or per executable when loading
+CACHE_PROCEDURES = False
+
+PROCEDURE_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "pyopo")
+
+# Increment when the parsed or decoded format changes, invalidating existing cache files
+PROCEDURE_CACHE_VERSION = 3
+
+# Procedure table entry fields not stored, bound to the loaded file instead
+UNCACHED_FIELDS = {"src_file", "binary", "qcode", "instructions", "compiled_blocks"}
+
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(PROCEDURE_CACHE_DIRECTORY, f"{content_hash}.marshal")
+
+
+def unbind_instructions(
+    instructions: list[Optional[tuple]],
+) -> list[Optional[tuple]]:
+    """Returns a decoded instruction stream without its handlers, for marshalling"""
+    return [
+        instruction[1:] if instruction is not None else None
+        for instruction in instructions
+    ]
+
+
+def bind_instructions(
+    cached_instructions: list[Optional[tuple]],
+) -> list[Optional[tuple]]:
+    """Returns a cached instruction stream with each instruction bound to the handler of its opcode"""
+    instructions = []
+
+    for instruction in cached_instructions:
+        if instruction is None:
+            instructions.append(None)
+            continue
+
+        op_code, opcode_hint = instruction[0], instruction[1]
+        if opcode_hint is None:
+            handler = opcode_table[op_code]
+        else:
+            handler = opcode_prefix_tables[opcode_hint][op_code]
+
+        instructions.append((handler, *instruction))
+
+    return instructions
+
+
+def load_procedure_cache(binary: mmap.mmap, file: str) -> Optional[tuple]:
+    """Returns the cached (header, embedded_files, procedure_table) of an executable, None if the
+    content has not been cached or the cache file is unusable"""
+    content_hash = hashlib.sha256(binary).hexdigest()
+
+    try:
+        with open(_cache_path(content_hash), "rb") as f:
+            cached = marshal.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        _logger.warning(f"Unable to read procedure cache of {file}: {e}")
+        return None
+
+    if (
+        not isinstance(cached, dict)
+        or cached.get("version") != PROCEDURE_CACHE_VERSION
+        or cached.get("hash") != content_hash
+        or cached.get("length") != len(binary)
+    ):
+        _logger.info(f"Ignoring stale procedure cache of {file}")
+        return None
+
+    header = opo_header()
+    for field, value in cached["header"].items():
+        setattr(header, field, value)
+
+    embedded_files = [
+        embedded_file(start_offset, end_offset, type)
+        for start_offset, end_offset, type in cached["embedded_files"]
+    ]
+
+    procedure_table = []
+    for procedure in cached["procedure_table"]:
+        procedure["src_file"] = file
+        procedure["binary"] = binary
+        procedure["qcode"] = memoryview(binary)[
+            procedure["qcode_offset"] : procedure["qcode_offset"]
+            + procedure["qcode_len"]
+        ]
+        procedure["global_declarations"] = OrderedDict(
+            procedure["global_declarations"]
+        )
+        procedure["global_references"] = OrderedDict(procedure["global_references"])
+
+        procedure_table.append(procedure)
+
+    _logger.info(f"Loaded {len(procedure_table)} procedures of {file} from the cache")
+
+    return (header, embedded_files, procedure_table)
+
+
+def store_procedure_cache(
+    binary: mmap.mmap,
+    file: str,
+    header: opo_header,
+    embedded_files: list,
+    procedure_table: list,
+) -> None:
+    """Parses and decodes every procedure of the table, storing them to the cache. The cached
+    instruction streams are also left on the entries, to be bound on their first call"""
+
+    cached_procedures = []
+
+    for procedure in procedure_table:
+        if not procedure["parsed"]:
+            loader._parse_procedure(procedure)
+
+        if "cached_instructions" not in procedure:
+            procedure["cached_instructions"] = unbind_instructions(
+                decode_procedure(procedure["qcode"])
+            )
+
+        cached_procedure = {
+            field: value
+            for field, value in procedure.items()
+            if field not in UNCACHED_FIELDS
+        }
+
+        # Call sites are linked once loaded
+        called_procedures = [
+            {
+                field: value
+                for field, value in cp_entry.items()
+                if field != "procedure"
+            }
+            for cp_entry in procedure["called_procedures"]
+        ]
+        cached_procedure["called_procedures"] = called_procedures
+        cached_procedure["cached_cp"] = {
+            cp_entry["ee"]: cp_entry for cp_entry in called_procedures
+        }
+
+        # Ordered by insertion, marshal only supports plain dicts
+        cached_procedure["global_declarations"] = dict(
+            procedure["global_declarations"]
+        )
+        cached_procedure["global_references"] = dict(procedure["global_references"])
+
+        cached_procedures.append(cached_procedure)
+
+    content_hash = hashlib.sha256(binary).hexdigest()
+    cached = {
+        "version": PROCEDURE_CACHE_VERSION,
+        "hash": content_hash,
+        "length": len(binary),
+        "header": dict(vars(header)),
+        "embedded_files": [
+            (e.start_offset, e.end_offset, e.type) for e in embedded_files
+        ],
+        "procedure_table": cached_procedures,
+    }
+
+    cache_path = _cache_path(content_hash)
+    try:
+        os.makedirs(PROCEDURE_CACHE_DIRECTORY, exist_ok=True)
+
+        # Written to a temporary file first, so concurrent loads never see a partial cache file
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            marshal.dump(cached, f)
+        os.replace(temp_path, cache_path)
+    except (OSError, ValueError) as e:
+        _logger.warning(f"Unable to write procedure cache of {file}: {e}")
+        return
+
+    _logger.info(f"Stored {len(cached_procedures)} procedures of {file} to the cache")
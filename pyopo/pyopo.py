@@ -1,5 +1,6 @@
 import struct
 import json
+import mmap
 import sys
 import os
 import time
@@ -11,24 +12,40 @@ from .loader import *
 
 
 from .opcodes import *
+from .decoder import decode_procedure, decode_from
+from .superinstructions import fuse_procedure, FUSE_SUPERINSTRUCTIONS
+from .compiler import compile_procedure, COMPILE_BASIC_BLOCKS
+from .procedure_cache import (
+    bind_instructions,
+    load_procedure_cache,
+    store_procedure_cache,
+    CACHE_PROCEDURES,
+)
 from .window_manager import WindowManager
 from .dialog_manager import *
 from .filehandler_dbf import *
 from .filehandler_filesystem import *
 
 from .hals import *
+from .clock import real_clock, virtual_clock
+from .input_source import input_source, pygame_input, scripted_input
 
 from .heap import *
+from .var_stack import STACK_IMPLEMENTATION, STACK_IMPLEMENTATIONS
 
 # Debuggers
 from .debugger.debugger_dsf import DebuggerDSF
 from .debugger.debugger_profiler import DebuggerProfiler
+from .debugger.debugger_trace import DebuggerTrace
 
+# Default heap size (bytes)
 DATA_STACK_FRAME_SIZE = 64 * 1024
 
 import logging
 import logging.config
 
+from .trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -37,6 +54,20 @@ PROFILE_DUMP_TIMESPAN = 120
 
 UI_FPS = 15
 
+# Longest time waited for input while awaiting a key press, dialog or menu (seconds)
+MAX_INPUT_WAIT = 1.0
+
+# Shortest time waited for input, so an elapsed deadline can not spin the host loop (seconds)
+MIN_INPUT_WAIT = 0.01
+
+# Time waited for input by a program idly polling KEY (seconds)
+KEY_POLL_WAIT = 1.0 / UI_FPS
+
+# Number of instructions executed between host ticks, auto-tuned within the limits to meet UI_FPS
+INSTRUCTION_BUDGET = 1000
+INSTRUCTION_BUDGET_MIN = 100
+INSTRUCTION_BUDGET_MAX = 100000
+
 KEY_TRANSLATION = {
     pygame.K_LALT: 290,  # Menu
     pygame.K_RALT: 291,  # Help
@@ -53,19 +84,54 @@ class executable:
     def __init__(
         self,
         file: str,
-        binary: bytes,
+        binary: mmap.mmap,
         header: opo_header,
         procedure_table,
         embedded_files,
+        fuse_superinstructions: bool = FUSE_SUPERINSTRUCTIONS,
+        headless: bool = False,
+        compile_basic_blocks: bool = COMPILE_BASIC_BLOCKS,
+        stack_implementation: str = STACK_IMPLEMENTATION,
+        clock: Optional[real_clock | virtual_clock] = None,
+        parse_procedures_eagerly: bool = PARSE_PROCEDURES_EAGERLY,
+        cache_procedures: bool = CACHE_PROCEDURES,
+        heap_size: int = DATA_STACK_FRAME_SIZE,
+        growable_heap: bool = False,
+        heap_file: Optional[str] = None,
+        bytes_strings: bool = BYTES_STRINGS,
     ):
         self.file = file
         self.binary = binary
         self.header = header
         self.procedure_table = procedure_table
 
+        # Whether common instruction sequences were fused, modules loaded via LOADM follow suit
+        self.fuse_superinstructions = fuse_superinstructions
+
+        # Whether procedures are compiled into basic blocks when first called
+        self.compile_basic_blocks = compile_basic_blocks
+
+        # Whether string values are bytes of the Psion character set, modules loaded via LOADM follow suit
+        self.bytes_strings = bytes_strings
+
+        # The operand stack implementation, "debug" checks for stack underflow and untyped values
+        self.stack_implementation = stack_implementation
+
+        # The time seen by the program (date and time functions, PAUSE, timers), a virtual clock skips sleeps
+        self.clock = clock if clock is not None else real_clock()
+
+        # Whether parsed procedures are stored to the procedure cache, modules loaded via LOADM follow suit
+        self.cache_procedures = cache_procedures
+
         # Create a ref cache of the proc table for faster lookups
         self.update_procedure_call_cache()
 
+        # Whether procedure bodies are parsed when loading, rather than on their first call
+        self.parse_procedures_eagerly = parse_procedures_eagerly
+        if parse_procedures_eagerly:
+            for proc in self.procedure_table:
+                self.parse_procedure(proc)
+
         # Modules (LOADM)
         self.modules = []
 
@@ -79,9 +145,16 @@ class executable:
         # Debugging Tools
         self.memory_debugger = None
         self.profiler_debugger = None
+        self.trace_debugger = None
+
+        # Without a display, input is taken from a script rather than PyGame events
+        self.headless = headless
+        self.input_source: input_source = (
+            scripted_input() if headless else pygame_input()
+        )
 
         # Graphical Emulation Layers
-        self.window_manager = WindowManager(executable=self)
+        self.window_manager = WindowManager(executable=self, headless=headless)
         self.dialog_manager = None
         self.menu_manager = None
 
@@ -103,22 +176,38 @@ class executable:
         # Awaiting for a pause event
         self.pause_await = False
 
+        # KEY polls without a key press or drawing, once idle the host waits a short time for input
+        self.idle_key_polls = 0
+        self.key_poll_wait = False
+
         # Runtime information
         self.proc_stack = []
 
+        # Globals visible to the executing procedure, name -> (DSF offset, declaring frame, string length)
+        self.global_index: Dict[str, tuple[int, "stack_entry", int]] = {}
+        self.running = False
+
+        # Instructions executed between host ticks
+        self.instruction_budget = INSTRUCTION_BUDGET
+        self.auto_tune_instruction_budget = True
+
         # Cached ref to current executing procedure
         self._current_proc: stack_entry = None
 
-        self.stack = stack()
+        self.stack = STACK_IMPLEMENTATIONS[stack_implementation]()
         self.data_stack = data_stack(
-            DATA_STACK_FRAME_SIZE, debugger=self.memory_debugger
-        )  # 32kb base memory
+            heap_size,
+            debugger=self.memory_debugger,
+            growable=growable_heap,
+            backing_file=heap_file,
+            bytes_strings=bytes_strings,
+        )
 
         # io handles
         self.io_handles = []
 
         # Abstraction layers for io functionality to specific resources
-        self.io_hals = {"TIM:": hal_tim(self.data_stack)}
+        self.io_hals = {"TIM:": hal_tim(self.data_stack, self.clock)}
 
         # Calculator Memory
         self.calc_mem = {
@@ -145,45 +234,165 @@ class executable:
             if proc_name not in self.procedure_table_caller_lookup:
                 self.procedure_table_caller_lookup[proc_name] = proc
 
-    @staticmethod
-    def load_executable(file: str) -> Self:
-        """Loads a .OPO or .OPA file, returning its runtime environment"""
+        self.link_procedure_calls()
 
+    def link_procedure_calls(self) -> None:
+        """Links each call site (called procedure entry) to the procedure it calls, so calls do not
+        look up the callee by name. Procedures not in the table (not yet loaded via LOADM) are None"""
+        for proc in self.procedure_table:
+            if "instructions" in proc:
+                self.link_call_sites(proc)
+
+    def link_call_sites(self, proc: dict) -> None:
+        """Links the call sites of a parsed procedure, callees may still be stubs"""
+        for cp_entry in proc["called_procedures"]:
+            cp_entry["procedure"] = self.procedure_table_caller_lookup.get(
+                cp_entry["name"].upper(), None
+            )
+
+    def parse_procedure(self, proc: dict) -> None:
+        """Parses and decodes a procedure table stub, if not already, ready to be called"""
+        if "instructions" in proc:
+            return
+
+        if not proc["parsed"]:
+            loader._parse_procedure(proc)
+
+        # Decode the procedure's QCode once, rather than on every instruction
+        cached_instructions = proc.pop("cached_instructions", None)
+        if cached_instructions is not None:
+            proc["instructions"] = bind_instructions(cached_instructions)
+        else:
+            proc["instructions"] = decode_procedure(proc["qcode"])
+
+        if self.fuse_superinstructions:
+            fuse_procedure(proc["instructions"], self.bytes_strings)
+
+        self.link_call_sites(proc)
+
+    @staticmethod
+    def load_executable(
+        file: str,
+        fuse_superinstructions: bool = FUSE_SUPERINSTRUCTIONS,
+        headless: bool = False,
+        compile_basic_blocks: bool = COMPILE_BASIC_BLOCKS,
+        stack_implementation: str = STACK_IMPLEMENTATION,
+        clock: Optional[real_clock | virtual_clock] = None,
+        parse_procedures_eagerly: bool = PARSE_PROCEDURES_EAGERLY,
+        cache_procedures: bool = CACHE_PROCEDURES,
+        heap_size: int = DATA_STACK_FRAME_SIZE,
+        growable_heap: bool = False,
+        heap_file: Optional[str] = None,
+        bytes_strings: bool = BYTES_STRINGS,
+    ) -> Self:
+        """Loads a .OPO or .OPA file, returning its runtime environment
+
+        Unless disabled, common instruction sequences are fused into superinstructions and procedures
+        are compiled into basic blocks when first called. Procedure bodies are parsed on their first
+        call, unless parse_procedures_eagerly (e.g. to validate a file). With cache_procedures the
+        parsed and decoded procedures are stored to (and reloaded from) the procedure cache. The
+        heap is heap_size bytes, extended as needed up to MAX_HEAP_SIZE if growable_heap, and memory
+        maps heap_file if given so it can be inspected by another process. The operand stack is one of
+        STACK_IMPLEMENTATIONS. With bytes_strings string values are bytes of the Psion character set
+        rather than decoded text, decoded only where shown or used as file names. A headless runtime
+        has no display and takes its input from queue_input, with a virtual_clock it also runs
+        without waiting on sleeps"""
+
+        # The file is memory mapped, procedures' QCode are views of it rather than copies
         binary = None
         with open(file, "rb") as f:
-            binary = f.read()
-
-        header = loader._readheader(binary)
+            binary = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-        embedded_files = []
-        embedded_files_offset = 20 + 1 + len(header.source_filename)
-        if header.second_header_offset != embedded_files_offset:
-            # If the Second Header Offset is more than offset 20 + QStr, then there is embedded files
-            _logger.info(f"{embedded_files_offset} vs {header.second_header_offset}")
-            embedded_files = loader._readembeddedfiles(
-                binary, embedded_files_offset, header.second_header_offset
+        cached = load_procedure_cache(binary, file) if cache_procedures else None
+        if cached is not None:
+            header, embedded_files, procedure_table = cached
+        else:
+            header = loader._readheader(binary)
+
+            embedded_files = []
+            embedded_files_offset = 20 + 1 + len(header.source_filename)
+            if header.second_header_offset != embedded_files_offset:
+                # If the Second Header Offset is more than offset 20 + QStr, then there is embedded files
+                _logger.info(
+                    f"{embedded_files_offset} vs {header.second_header_offset}"
+                )
+                embedded_files = loader._readembeddedfiles(
+                    binary, embedded_files_offset, header.second_header_offset
+                )
+
+            procedure_table = loader._read_procedure_table(
+                header.procedure_table_offset, header.translator_version, binary, file
             )
 
-        procedure_table = loader._read_procedure_table(
-            header.procedure_table_offset, header.translator_version, binary, file
+            if cache_procedures:
+                store_procedure_cache(
+                    binary, file, header, embedded_files, procedure_table
+                )
+
+        return executable(
+            file,
+            binary,
+            header,
+            procedure_table,
+            embedded_files,
+            fuse_superinstructions=fuse_superinstructions,
+            headless=headless,
+            compile_basic_blocks=compile_basic_blocks,
+            stack_implementation=stack_implementation,
+            clock=clock,
+            parse_procedures_eagerly=parse_procedures_eagerly,
+            cache_procedures=cache_procedures,
+            heap_size=heap_size,
+            growable_heap=growable_heap,
+            heap_file=heap_file,
+            bytes_strings=bytes_strings,
         )
 
-        return executable(file, binary, header, procedure_table, embedded_files)
-
     def set_filesystem_path(self, path: str) -> None:
         """Sets the local filesystem location to the base of the emulated Psion filesystem"""
         self.drive_path = path
 
+    def queue_input(self, keys: list) -> None:
+        """Queues scripted key presses, PyGame key codes or characters optionally paired with the time
+        they are due (see scripted_input). Input is taken from the script from then on"""
+        if not isinstance(self.input_source, scripted_input):
+            self.input_source = scripted_input()
+
+        self.input_source.queue(keys)
+
+    def set_input_source(self, source: input_source) -> None:
+        """Sets where key presses are taken from, e.g. a scripted_input replaying by instruction count"""
+        self.input_source = source
+
+    def is_key_down(self, key: int) -> bool:
+        """Returns if a key (PyGame key code) is currently held down"""
+        return self.input_source.is_key_down(key)
+
     def attach_dsf_debugger(self) -> None:
         """Attach debug and analysis tooling to the Heap and Data Stack Frames contained therein"""
         self.memory_debugger = DebuggerDSF(
-            executable=self, dsf_size=DATA_STACK_FRAME_SIZE
+            executable=self, dsf_size=self.data_stack.size
         )
 
     def attach_profiler(self) -> None:
-        """Attach a performance profiling tool to the interpreter"""
+        """Attach a performance profiling tool to the interpreter.
+
+        Timings are per opcode, so superinstructions and compiled blocks (which execute several
+        opcodes as one handler) are switched off, and procedures already decoded are decoded again"""
         self.profiler_debugger = DebuggerProfiler()
 
+        self.fuse_superinstructions = False
+        self.compile_basic_blocks = False
+
+        for proc in self.procedure_table:
+            proc.pop("instructions", None)
+            proc.pop("compiled_blocks", None)
+
+    def attach_tracer(self, stream) -> None:
+        """Attach a structured trace of procedure calls, returns, key presses and stops, written to
+        the stream as JSON lines"""
+        self.trace_debugger = DebuggerTrace(stream)
+
     def __str__(self) -> str:
         return self.file
 
@@ -215,236 +424,383 @@ class executable:
 
     def execute(self):
         # Add first procedure to the stack
-        self.proc_stack.append(stack_entry(self.procedure_table[0].copy(), self))
+        # The shared table entry, so its compiled blocks are reused if it is called again
+        self.proc_stack.append(stack_entry(self.procedure_table[0], self))
         self._current_proc = self.proc_stack[-1]  # Cache ref
 
         profiling_starttime = time.time()
 
-        while True:
+        # Scripted input is timed from the start of execution, instructions are counted in dispatches
+        self.execution_start_time = self.clock.now()
+        self.instructions_executed = 0
+
+        self.running = True
+
+        while self.running:
             # Process the PyGame inputs in the event loop
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    _logger.info("User has triggered App exit")
-                    pygame.quit()
-                    return
-
-                # checking if keydown event happened or not
-                if event.type == pygame.KEYDOWN:
-                    # if keydown event happened
-                    # than printing a string to output
-
-                    # Translate certain keys
-                    if event.key in KEY_TRANSLATION:
-                        # Left Alt = MENU
-                        _logger.info(
-                            f" - Translating {pygame.key.name(event.key)} to {KEY_TRANSLATION[event.key]}"
-                        )
-                        self.last_keypress = KEY_TRANSLATION[event.key]
-                    elif event.key < 255:
-                        # Only store the values of the keys that are in range
-                        _logger.info(f"A key has been pressed: {event.key}")
-                        self.last_keypress = event.key
-                    else:
-                        continue
-
-                    if self.dialog_manager and self.dialog_manager.show:
-                        # Handle the Keypress in respect to the dialog
-
-                        if event.key == pygame.K_ESCAPE:
-                            # Exit the dialog
-                            _logger.info("User has quit the dialog, not saving results")
-                            self.stack.push(0, 0)
-
-                            self.dialog_manager = None  # Clean up dialog
-
-                            # The KEY value (last keypress) is result on dialog completion
-                            self.last_keypress = 0
-                            self.window_manager.composite(self, True)
-
-                        elif (
-                            event.key == pygame.K_RETURN
-                            or event.key in self.dialog_manager.get_button_keycodes()
-                        ):
-                            # Exit the dialog
-
-                            _logger.debug("Store results of dialog")
-                            dialog_return_val = self.dialog_manager.handle_DIALOG(
-                                self.data_stack
-                            )
-
-                            if dialog_return_val == None:
-                                dialog_return_val = int(event.key)
-
-                            # Add the dialog return to the stack
-                            self.stack.push(0, dialog_return_val)
-
-                            self.dialog_manager = None  # Clean up dialog
-
-                            # The KEY value (last keypress) is result on dialog completion
-                            self.last_keypress = 0
-                            self.window_manager.composite(self, True)
-                        else:
-                            # Pass over the keypress to the dialog manager
-                            self.dialog_manager.handle_keypress(self.last_keypress)
-                    elif self.menu_manager and self.menu_manager.show:
-                        if event.key == pygame.K_ESCAPE:
-                            # Exit the dialog
-                            _logger.info("User has quit the menu, not saving results")
-                            self.stack.push(0, 0)
-
-                            self.menu_manager = None  # Clean up menu
-
-                            # The KEY value (last keypress) is result on dialog completion
-                            self.last_keypress = 0
-                        elif event.key == pygame.K_RETURN:
-                            # Exit the menu
-
-                            _logger.info("Store results of menu")
-                            menu_return_val = self.menu_manager.handle_MENU()
-
-                            # Add the char of the selected menu option
-                            self.stack.push(0, menu_return_val)
-
-                            self.menu_manager = None  # Clean up Menu
-
-                            # The KEY value (last keypress) is result on menu completion
-                            self.last_keypress = 0
-                        else:
-                            self.menu_manager.handle_keypress(event.key)
-                    elif self.get_await:
-                        # The program has paused execution while awaiting for a key to be pressed, this is now complete
-                        self.get_await = False
-
-                        # Push the last character to the stack for consumption
-                        if self.get_await_str:
-                            _logger.debug(f" - GET$ = {self.last_keypress}")
-                            self.stack.push(3, chr(self.last_keypress))
-                        else:
-                            _logger.debug(f" - GET = {self.last_keypress}")
-                            self.stack.push(0, self.last_keypress)
-
-                        self.last_keypress = 0
-
-                        # Force composition
-                        self.window_manager.composite(self, True)
-                    elif self.pause_await:
-                        self.pause_await = False
-
-            # Determine if we need to pause execution while awaiting a key press or action
-            awaiting_action = self.get_await or self.pause_await
-            awaiting_action = (
-                awaiting_action
-                or (self.dialog_manager and self.dialog_manager.show)
-                or (self.menu_manager and self.menu_manager.show)
-            )
+            self.process_events()
+            if not self.running:
+                break
 
-            if awaiting_action:
+            if self.awaiting_action():
                 self.window_manager.composite(self)
 
-                _logger.debug(" - AWAITING KEYPRESS")
+                if TRACE:
+                    _logger.debug(" - AWAITING KEYPRESS")
 
-                time.sleep(1.0 / UI_FPS)  # Simulate 30FPS
+                if not self.headless:
+                    # Wait for input, or until the screen or a timer next needs attention
+                    self.input_source.wait(self, self.next_deadline())
                 continue
 
             # Handle any awaiting IO actions
             for hal_ref in self.io_hals.values():
                 hal_ref.process_io()
 
-            # Execute instruction from the topmost procedure
-            check_flags = self._current_proc.execute_instruction()
+            # Execute a batch of instructions from the topmost procedure between host ticks
+            batch_starttime = time.perf_counter()
+            executed = self.execute_batch(
+                self.input_source.instruction_budget(self, self.instruction_budget)
+            )
+            self.instructions_executed += executed
+
+            # Input replayed by instruction count needs batches independent of the host's speed
+            if (
+                self.auto_tune_instruction_budget
+                and not self.input_source.by_instructions
+            ):
+                self.tune_instruction_budget(
+                    executed, time.perf_counter() - batch_starttime
+                )
+
+            if not self.running:
+                break
+
+            if self.key_poll_wait:
+                # The program is idly polling KEY, wait for input rather than spinning
+                self.key_poll_wait = False
+                self.input_source.wait(self, min(KEY_POLL_WAIT, self.next_deadline()))
 
             # Composite the applications graphics
             last_render_delta = (
                 datetime.datetime.now() - self.window_manager.last_render_time
             )
-            if last_render_delta.microseconds > 1000000 / UI_FPS:
+            if last_render_delta.total_seconds() > 1.0 / UI_FPS:
                 self.window_manager.composite(self)
 
-            if check_flags:
-                # The execution resulted in flags being set
+            if time.time() - profiling_starttime > PROFILE_DUMP_TIMESPAN:
+                break
 
-                if self._current_proc.flag_stop:
-                    _logger.info(" - User has requested application STOP")
-                    break
-                elif self._current_proc.flag_callproc:
-                    # The Callee Procedure has flagged it is calling another procedure
+        if self.profiler_debugger:
+            # Dump out debug information if the profiler is attached
+            self.profiler_debugger.dump_timings()
 
-                    # Via LOADM there may be more than 1 instance of a procedure with the same name.
+        if self.trace_debugger:
+            self.trace_debugger.close()
 
-                    proc_call = self.procedure_table_caller_lookup.get(
-                        self._current_proc.flag_callproc.upper(), None
-                    )
+    def next_deadline(self) -> float:
+        """Returns the seconds until the next timed event (sprite animation, GIPRINT expiry, timers),
+        between MIN_INPUT_WAIT and MAX_INPUT_WAIT"""
+        deadlines = [MAX_INPUT_WAIT, self.window_manager.next_deadline()]
+        deadlines.extend(hal_ref.next_deadline() for hal_ref in self.io_hals.values())
 
-                    if not proc_call:
-                        # Unable to find named procedure
-                        raise ("Procedure not found")
-
-                    """
-                    proc_call = list(
-                        filter(
-                            lambda p: p["name"].upper()
-                            == self._current_proc.flag_callproc.upper(),
-                            self.procedure_table,
-                        )
-                    )
-                    if len(proc_call) == 0:
-                        # Unable to find named procedure
-                        proc_names = list(
-                            map(lambda p: p["name"].upper(), self.procedure_table)
-                        )
-                        _logger.warn("Unable to determine CALLEE PROC")
-                        _logger.warn(proc_names)
-                        raise ("Procedure not found")
-                    elif len(proc_call) > 0:
-                        _logger.warning(
-                            f"More than one procedure entry exists for {self._current_proc.flag_callproc.upper()}"
-                        )
-                    """
-
-                    # Reset the procedure calling flag
-                    self._current_proc.flag_callproc = None
-
-                    # Add the called procedure to the stack
-                    self.proc_stack.append(stack_entry(proc_call, self))
-                    self._current_proc = self.proc_stack[-1]
-
-                    # OPO adds 2 stack entries per param when calling, verify type codes and remove them
-                    for param in self._current_proc.procedure["parameters"]:
-                        param["value"], callee_type = self.stack.pop_2()
-
-                        if param["type"] != callee_type:
-                            raise ("Invalid PROC call, type mismatch")
-
-                elif self._current_proc.flag_return:
-                    # The procedure is being returned, or has completed execution
-
-                    # Free procedure memory
-                    self.data_stack.free_frame(
-                        self._current_proc.data_stack_frame_offset
-                    )
+        return max(
+            MIN_INPUT_WAIT,
+            min(deadline for deadline in deadlines if deadline is not None),
+        )
+
+    def process_events(self) -> None:
+        """Process the inputs, stopping execution if the user has exited the app"""
+        self.input_source.poll(self)
+
+    def handle_key_down(self, key: int) -> None:
+        """Handle a key (PyGame key code) being pressed"""
+        # Translate certain keys
+        if key in KEY_TRANSLATION:
+            # Left Alt = MENU
+            _logger.info(
+                f" - Translating {pygame.key.name(key)} to {KEY_TRANSLATION[key]}"
+            )
+            self.last_keypress = KEY_TRANSLATION[key]
+        elif key < 255:
+            # Only store the values of the keys that are in range
+            _logger.info(f"A key has been pressed: {key}")
+            self.last_keypress = key
+        else:
+            return
+
+        if self.trace_debugger:
+            self.trace_debugger.event("key", key=self.last_keypress)
+
+        if self.dialog_manager and self.dialog_manager.show:
+            # Handle the Keypress in respect to the dialog
+
+            if key == pygame.K_ESCAPE:
+                # Exit the dialog
+                _logger.info("User has quit the dialog, not saving results")
+                self.stack.push(0, 0)
+
+                self.dialog_manager = None  # Clean up dialog
+
+                # The KEY value (last keypress) is result on dialog completion
+                self.last_keypress = 0
+                self.window_manager.composite(self, True)
+
+            elif (
+                key == pygame.K_RETURN
+                or key in self.dialog_manager.get_button_keycodes()
+            ):
+                # Exit the dialog
+
+                if TRACE:
+                    _logger.debug("Store results of dialog")
+                dialog_return_val = self.dialog_manager.handle_DIALOG(self.data_stack)
+
+                if dialog_return_val == None:
+                    dialog_return_val = int(key)
+
+                # Add the dialog return to the stack
+                self.stack.push(0, dialog_return_val)
+
+                self.dialog_manager = None  # Clean up dialog
+
+                # The KEY value (last keypress) is result on dialog completion
+                self.last_keypress = 0
+                self.window_manager.composite(self, True)
+            else:
+                # Pass over the keypress to the dialog manager
+                self.dialog_manager.handle_keypress(self.last_keypress)
+        elif self.menu_manager and self.menu_manager.show:
+            if key == pygame.K_ESCAPE:
+                # Exit the dialog
+                _logger.info("User has quit the menu, not saving results")
+                self.stack.push(0, 0)
+
+                self.menu_manager = None  # Clean up menu
+
+                # The KEY value (last keypress) is result on dialog completion
+                self.last_keypress = 0
+            elif key == pygame.K_RETURN:
+                # Exit the menu
+
+                _logger.info("Store results of menu")
+                menu_return_val = self.menu_manager.handle_MENU()
+
+                # Add the char of the selected menu option
+                self.stack.push(0, menu_return_val)
+
+                self.menu_manager = None  # Clean up Menu
+
+                # The KEY value (last keypress) is result on menu completion
+                self.last_keypress = 0
+            else:
+                self.menu_manager.handle_keypress(key)
+        elif self.get_await:
+            # The program has paused execution while awaiting for a key to be pressed, this is now complete
+            self.get_await = False
+
+            # Push the last character to the stack for consumption
+            if self.get_await_str:
+                if TRACE:
+                    _logger.debug(f" - GET$ = {self.last_keypress}")
+                # Character codes are of the Psion character set, keys beyond it have no character
+                key_str = (
+                    bytes([self.last_keypress]) if self.last_keypress < 256 else b""
+                )
+                if not self.bytes_strings:
+                    key_str = key_str.decode(QSTR_ENCODING)
+
+                self.stack.push(3, key_str)
+            else:
+                if TRACE:
+                    _logger.debug(f" - GET = {self.last_keypress}")
+                self.stack.push(0, self.last_keypress)
+
+            self.last_keypress = 0
+
+            # Force composition
+            self.window_manager.composite(self, True)
+        elif self.pause_await:
+            self.pause_await = False
+
+    def awaiting_action(self) -> bool:
+        """Determine if we need to pause execution while awaiting a key press or action"""
+        awaiting_action = self.get_await or self.pause_await
+        awaiting_action = (
+            awaiting_action
+            or (self.dialog_manager and self.dialog_manager.show)
+            or (self.menu_manager and self.menu_manager.show)
+        )
+
+        return bool(awaiting_action)
 
-                    # Remove the procedure from the stack, carry on previous procedure
-                    self.proc_stack.pop()
+    def execute_batch(self, budget: int) -> int:
+        """Executes up to budget instructions, returning the number executed.
 
-                    if len(self.proc_stack) == 0:
-                        _logger.info("Application has completed execution")
-                        break
+        The batch ends early when execution stops or a blocking opcode (GET, PAUSE, DIALOG, MENU)
+        yields to the host"""
 
-                    self._current_proc = self.proc_stack[-1]  # Cache new ref
+        for executed in range(1, budget + 1):
+            if not self._current_proc.execute_instruction():
+                continue
 
-                    _logger.info(
-                        f" - Returning execution to PROC {self._current_proc.procedure['name']}"
+            # The execution resulted in flags being set
+            if self._current_proc.flag_stop:
+                _logger.info(" - User has requested application STOP")
+                if self.trace_debugger:
+                    self.trace_debugger.event(
+                        "stop", proc=self._current_proc.procedure["name"]
                     )
-                else:
-                    # Other Flag occured
-                    break
+                self.running = False
+            elif self._current_proc.flag_callproc:
+                # The Callee Procedure has flagged it is calling another procedure
+                self.call_procedure()
+                continue
+            elif self._current_proc.flag_return:
+                # The procedure is being returned, or has completed execution
+                self.return_procedure()
+                if self.running:
+                    continue
+            elif self._current_proc.flag_error:
+                # Other Flag occured
+                self.running = False
+
+            # Execution has stopped, or the opcode is awaiting the host
+            return executed
+
+        return budget
+
+    def tune_instruction_budget(self, executed: int, batch_duration: float) -> None:
+        """Scales the instruction budget so that a batch of instructions lasts a host tick (1 / UI_FPS)"""
+        if executed < self.instruction_budget:
+            # Batches ended early by a blocking opcode are not representative
+            return
+
+        target_budget = INSTRUCTION_BUDGET_MAX
+        if batch_duration > 0:
+            target_budget = executed * (1.0 / UI_FPS) / batch_duration
+
+        # Limit the rate of change to smooth over slow opcodes (e.g. PAUSE)
+        target_budget = min(
+            max(target_budget, self.instruction_budget / 2), self.instruction_budget * 2
+        )
 
-            if time.time() - profiling_starttime > PROFILE_DUMP_TIMESPAN:
-                break
+        self.instruction_budget = int(
+            min(max(target_budget, INSTRUCTION_BUDGET_MIN), INSTRUCTION_BUDGET_MAX)
+        )
 
-        if self.profiler_debugger:
-            # Dump out debug information if the profiler is attached
-            self.profiler_debugger.dump_timings()
+    def set_instruction_budget(self, budget: int, auto_tune: bool = False) -> None:
+        """Sets the number of instructions executed between host ticks (input, IO and graphics).
+
+        If auto_tune is set the budget is used as a starting point and adjusted to meet UI_FPS"""
+        self.instruction_budget = budget
+        self.auto_tune_instruction_budget = auto_tune
+
+    def declare_globals(self, proc: "stack_entry") -> None:
+        """Adds the globals declared by a procedure entering the stack to the global index, the first
+        (outermost) declaration of a name is the one referenced"""
+        for name, gd in proc.procedure["global_declarations"].items():
+            if name not in self.global_index:
+                self.global_index[name] = (
+                    proc.data_stack_frame_offset + gd["data_stack_frame_offset"],
+                    proc,
+                    gd["string_length"],
+                )
+
+    def release_globals(self, proc: "stack_entry") -> None:
+        """Removes the globals declared by a procedure leaving the stack from the global index"""
+        for name in proc.procedure["global_declarations"]:
+            global_entry = self.global_index.get(name)
+            if global_entry is not None and global_entry[1] is proc:
+                del self.global_index[name]
+
+    def call_procedure(self, proc_call: Optional[dict] = None) -> None:
+        """Add a procedure to the stack, either a linked callee or the procedure flagged by name by the
+        current procedure"""
+        if proc_call is None:
+            # Via LOADM there may be more than 1 instance of a procedure with the same name.
+            proc_call = self.procedure_table_caller_lookup.get(
+                self._current_proc.flag_callproc.upper(), None
+            )
+
+            if not proc_call:
+                # Unable to find named procedure
+                raise ("Procedure not found")
+
+            # Reset the procedure calling flag
+            self._current_proc.flag_callproc = None
+
+        """
+        proc_call = list(
+            filter(
+                lambda p: p["name"].upper()
+                == self._current_proc.flag_callproc.upper(),
+                self.procedure_table,
+            )
+        )
+        if len(proc_call) == 0:
+            # Unable to find named procedure
+            proc_names = list(
+                map(lambda p: p["name"].upper(), self.procedure_table)
+            )
+            _logger.warn("Unable to determine CALLEE PROC")
+            _logger.warn(proc_names)
+            raise ("Procedure not found")
+        elif len(proc_call) > 0:
+            _logger.warning(
+                f"More than one procedure entry exists for {self._current_proc.flag_callproc.upper()}"
+            )
+        """
+
+        if self.trace_debugger:
+            self.trace_debugger.event(
+                "call",
+                proc=proc_call["name"],
+                caller=self._current_proc.procedure["name"],
+                depth=len(self.proc_stack),
+            )
+
+        # Add the called procedure to the stack
+        self.proc_stack.append(stack_entry(proc_call, self))
+        self._current_proc = self.proc_stack[-1]
+
+        # OPO adds 2 stack entries per param when calling, verify type codes and remove them
+        parameters = self._current_proc.parameters
+        for param in self._current_proc.procedure["parameters"]:
+            value, callee_type = self.stack.pop_2()
+
+            if param["type"] != callee_type:
+                raise ("Invalid PROC call, type mismatch")
+
+            parameters.append((callee_type, value))
+
+    def return_procedure(self) -> None:
+        """Remove the returning procedure from the stack, carrying on the previous procedure"""
+        if self.trace_debugger:
+            self.trace_debugger.event(
+                "return",
+                proc=self._current_proc.procedure["name"],
+                depth=len(self.proc_stack) - 1,
+            )
+
+        # Free procedure memory
+        self.release_globals(self._current_proc)
+        self.data_stack.pop_frame(self._current_proc.data_stack_frame_offset)
+
+        # Remove the procedure from the stack, carry on previous procedure
+        self.proc_stack.pop()
+
+        if len(self.proc_stack) == 0:
+            _logger.info("Application has completed execution")
+            self.running = False
+            return
+
+        self._current_proc = self.proc_stack[-1]  # Cache new ref
+
+        if TRACE:
+            _logger.debug(
+                f" - Returning execution to PROC {self._current_proc.procedure['name']}"
+            )
 
     def open_dbf(self, filename: str, d: int, vars, readonly):
         self.databases.append(
@@ -501,18 +857,36 @@ class stack_entry:
         # Cache for EE references used by the procedure
         self.ee_dsf_cache: Dict[int, int] = {}
 
+        # Cache for EE array references, (DSF offset, string length)
+        self.ee_array_cache: Dict[int, tuple[int, int]] = {}
+
+        # The (type, value) of each parameter of this activation, indexed by the procedure's parameter_slots
+        self.parameters: list[tuple[int, Any]] = []
+
         # Link to the parent executable
         self.executable = executable
 
         self.procedure = procedure_table_entry
 
+        # Procedures are parsed on their first call
+        executable.parse_procedure(self.procedure)
+
         # The program counter, the iterator of the current qcode offset
         self._program_counter = 0
 
         # The bytecode for the procedure entry
-        self._qcode: bytes = self.procedure["qcode"]
+        self._qcode: memoryview = self.procedure["qcode"]
         self._qcode_len = len(self._qcode)
 
+        # The pre-decoded instruction stream, indexed by program counter
+        self._instructions: list = self.procedure["instructions"]
+
+        if self.executable.compile_basic_blocks and "compiled_blocks" not in self.procedure:
+            # Compile the procedure on its first call, only procedures that are executed are compiled
+            self.procedure["compiled_blocks"] = compile_procedure(
+                self.procedure, self.executable.bytes_strings
+            )
+
         self._last_executed_opcode = None
 
         # DIR$ returns an iterator, which is stored to the procedure
@@ -530,23 +904,13 @@ class stack_entry:
         # Error Handling
         self.error_handler_offset = 0
 
-        # Allocate Procedure Memory
-        self.data_stack_frame_offset = self.executable.data_stack.allocate_frame(
-            size=self.procedure["data_stack_frame_size"]
+        # Allocate Procedure Memory, populated with the array/string information of the procedure
+        self.data_stack_frame_offset = self.executable.data_stack.push_frame(
+            size=self.procedure["data_stack_frame_size"],
+            image=self.procedure["frame_image"],
         )
 
-        # Populate Data Stack Frame with array/string information
-        for str_dec in self.procedure["string_declarations"]:
-            self.executable.data_stack.memory[
-                self.data_stack_frame_offset + str_dec
-            ] = self.procedure["string_declarations"][str_dec]["length"]
-
-        for arr_dec in self.procedure["array_declarations"]:
-            self.executable.data_stack.write(
-                0,
-                arr_dec["length"],
-                self.data_stack_frame_offset + arr_dec["data_stack_frame_offset"],
-            )
+        self.executable.declare_globals(self)
 
     def set_program_counter(self, index: int) -> None:
         self._program_counter = index
@@ -611,139 +975,60 @@ class stack_entry:
         return val
 
     def execute_instruction(self) -> bool:
+        """Executes the pre-decoded instruction at the program counter.
+
+        The opcode is not fetched or looked up, but the handler is entered with the program counter at
+        its operands and reads them from the QCode itself (see decoder)"""
         if self._program_counter >= self._qcode_len:
             # Finished execution of the procedure by hitting the end of the QCode
-            _logger.info("Procedure Execution Complete")
-            self.flag_return = True
-            return True
-
-        op_code = self.read_qcode_byte()
-        opcode_hint = None
-
-        op_code_handler = None
-
-        if op_code == 0x53:
-            # Call a procedure
-            ee = self.read_qcode_uint16()
-
-            cp_match = self.procedure["cached_cp"].get(ee, None)
-            if not cp_match:
-                _logger.warning("Failed to determine called procedure")
-                self.flag_error = True
-                return True
-
-            self.flag_callproc = cp_match["name"]
-            _logger.info(
-                f" - PROCEDURE CALL! EE Ref {ee} - Calling PROC {self.flag_callproc}:"
-            )
-
-            return True
-        elif op_code == 0x6B:
-            # @(...) operator - Call a procedure
-            args = self.read_qcode_byte()
-            return_type = self.read_qcode_byte()
-            _logger.info(f"Return Type: {return_type}")
-
-            for _ in range(args):
-                # Retrieve the arguments
-                type_code = self.executable.stack.pop()
-                arg_name = self.executable.stack.pop()
-
-            # We do not currently use the arguments to validate the callee
-
-            self.flag_callproc = self.executable.stack.pop()
-
-            # Add in the type code to the calling proc name, return type 0 is float
-            if return_type != 0:
-                # Floats don't have a return type character as they do not have a symbol
-                self.flag_callproc += chr(return_type)
-
-            _logger.info(
-                f" - Calling @ PROC {self.flag_callproc}(args = {args}) Return type = {return_type}:"
-            )
-
-            return True
-
-        elif op_code == 0x57:
-            # Opcode subset with 0x57 hint
-            opcode_hint = 0x57
-            op_code = self.read_qcode_byte()
-            _logger.debug(
-                f"Opcode: 0x57 {hex(op_code)} - {self._program_counter-1} / {self.procedure['qcode_len']}"
-            )
-
-            op_code_handler = opcode_0x57_handler.get(op_code)
-        elif op_code in [0x74, 0x75, 0x76, 0x77]:
-            _logger.info(" - 0x74 - 0x77 RETURN called")
-
-            # Store default values (none provided)
-            if op_code == 0x74:
-                self.executable.stack.push(0, 0)
-            elif op_code == 0x75:
-                self.executable.stack.push(1, 0)
-            elif op_code == 0x76:
-                self.executable.stack.push(2, 0.0)
-            elif op_code == 0x77:
-                self.executable.stack.push(3, "")
-
+            if TRACE:
+                _logger.debug("Procedure Execution Complete")
             self.flag_return = True
             return True
-        elif op_code == 0xC0:
-            _logger.info(
-                f" - 0xCO RETURN pop+ called - {self._program_counter} / {self.procedure['qcode_len']} / {len(self.executable.stack.stack_frame)}"
-            )
-            self.flag_return = True
-            return True
-        elif op_code == 0xED:
-            # Opcode subset with 0xED hint
-            opcode_hint = 0xED
-            op_code = self.read_qcode_byte()
-            _logger.debug(
-                f"Opcode: 0xED {hex(op_code)} - {self._program_counter-1} / {self.procedure['qcode_len']} / {len(self.executable.stack.stack_frame)}"
-            )
-
-            op_code_handler = opcode_0xED_handler.get(op_code)
 
-        elif op_code == 0xFF:
-            # Opcode subset with 0xFF hint
-            opcode_hint = 0xFF
-            op_code = self.read_qcode_byte()
-            _logger.debug(
-                f"Opcode: 0xFF {hex(op_code)} - {self._program_counter-1} / {self.procedure['qcode_len']} / {len(self.executable.stack.stack_frame)}"
+        instruction = self._instructions[self._program_counter]
+        if instruction is None:
+            # The offset was not reached by the decode sweep, decode it on demand
+            instruction = decode_from(
+                self._qcode, self._instructions, self._program_counter
             )
 
-            op_code_handler = opcode_0xFF_handler.get(op_code)
-
-        elif op_code in opcode_handler:
-            # Execute the Opcode
+        (
+            op_code_handler,
+            op_code,
+            opcode_hint,
+            self._program_counter,
+            _,
+            _,
+        ) = instruction
+
+        # Unimplemented opcodes are dispatched to qcode_not_implemented, which flags an error
+        try:
+            self._last_executed_opcode = op_code
+
+            profiler = self.executable.profiler_debugger
+            if profiler:
+                opcode_starttime = time.perf_counter_ns()
+                check_flags = op_code_handler(
+                    self, self.executable.data_stack, self.executable.stack
+                )
+                profiler.store_timing(
+                    time.perf_counter_ns() - opcode_starttime, op_code, opcode_hint
+                )
+            else:
+                check_flags = op_code_handler(
+                    self, self.executable.data_stack, self.executable.stack
+                )
 
-            _logger.debug(
-                f"Opcode: {hex(op_code)} - {self._program_counter} / {self.procedure['qcode_len']} / {len(self.executable.stack.stack_frame)}"
-            )
-            op_code_handler = opcode_handler[op_code]
-
-        if op_code_handler:
-            try:
-                opcode_starttime = time.time()
-                self._last_executed_opcode = op_code
-                op_code_handler(self, self.executable.data_stack, self.executable.stack)
-                opcode_endtime = time.time()
-                opcode_duration = opcode_endtime - opcode_starttime
-
-                if self.executable.profiler_debugger:
-                    self.executable.profiler_debugger.store_timing(
-                        opcode_duration, self._last_executed_opcode, opcode_hint
-                    )
-            except Exception as e:
-                if self._op_code_trapped:
-                    # _logger.warning(f" - Error Occured and Trapped: {e}")
-                    pass
-                else:
-                    # No error handling was present
-                    raise (e)
-        else:
-            # _logger.error(f"Opcode not yet implemented: {hex(opcode_hint) if opcode_hint else ''} {hex(op_code)}")
-            self.flag_error = True
-            return True
+            if check_flags:
+                # Procedure calls and returns flag the executable to switch procedure
+                return True
+        except Exception as e:
+            if self._op_code_trapped:
+                # _logger.warning(f" - Error Occured and Trapped: {e}")
+                pass
+            else:
+                # No error handling was present
+                raise (e)
 
         return self.flag_stop
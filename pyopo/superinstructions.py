@@ -0,0 +1,341 @@
+import operator
+from typing import Callable, Optional
+
+from pyopo.opcode_handlers import qcode_var, qcode_cmp, qcode_maths
+from pyopo.heap import READERS, WRITERS, to_int16_address
+
+from .opcodes import qcode_not_implemented
+
+from .decoder import (
+    INSTR_HANDLER,
+    INSTR_OPCODE,
+    INSTR_OPCODE_HINT,
+    INSTR_OPERAND_PC,
+    INSTR_NEXT_PC,
+    INSTR_OPERANDS,
+    constant_value,
+)
+
+import logging
+import logging.config
+
+logging.config.fileConfig(fname="logger.conf")
+_logger = logging.getLogger()
+# _logger.setLevel(logging.DEBUG)
+
+# Superinstruction fusion can be disabled globally, or per executable when loading
+FUSE_SUPERINSTRUCTIONS = True
+
+"""
+Superinstruction fusion is an optional pass over a decoded instruction stream. Short sequences of
+instructions that are common in OPL loops are replaced by a single handler that has the same
+observable effect on the heap, stack and program counter, without pushing intermediate values.
+
+The fused instruction replaces only the entry of the first instruction of the sequence, the entries
+of the following instructions are left as they were. A jump into the middle of a fused sequence
+therefore still executes the original instructions.
+
+While an error is trapped the superinstruction defers to the handler of the first instruction it
+replaced, as compiled blocks do, so a trapped error leaves the program counter at an instruction
+boundary and execution resumes with the original instructions.
+"""
+
+# Handlers which push the value of a local variable LL+
+LOCAL_VALUE = {qcode_var.qcode_push_var}
+
+# Handlers which push the address of a local variable LL+
+LOCAL_ADDR = {qcode_var.qcode_push_addr}
+
+# Handlers which push a constant from the QCode
+CONSTANT = {
+    qcode_var.qcode_push_vv_plus,
+    qcode_var.qcode_push_vv_word,
+    qcode_var.qcode_push_vv_long,
+    qcode_var.qcode_push_vv_word_to_long,
+}
+
+# Handlers whose pushed value is known without executing any other instruction
+VALUE = LOCAL_VALUE | CONSTANT
+
+EE_VALUE = {qcode_var.qcode_push_ee_value}
+
+COMPARE = {
+    qcode_cmp.qcode_cmp_less_than,
+    qcode_cmp.qcode_cmp_less_than_equal,
+    qcode_cmp.qcode_cmp_greater,
+    qcode_cmp.qcode_cmp_greater_equal,
+    qcode_cmp.qcode_cmp_equals,
+    qcode_cmp.qcode_cmp_not_equals,
+}
+
+BRANCH = {qcode_cmp.qcode_cmp_if}
+
+ARITHMETIC = {qcode_maths.qcode_cmp_plus, qcode_maths.qcode_cmp_minus}
+
+UNSIGNED = {qcode_var.qcode_uadd, qcode_var.qcode_usub}
+
+STORE = {qcode_var.qcode_store_pop1_in_pop2}
+
+# Comparison opcodes 0x30 - 0x47, 4 opcodes (one per type) for each operator
+COMPARE_OPERATORS = [
+    operator.lt,
+    operator.le,
+    operator.gt,
+    operator.ge,
+    operator.eq,
+    operator.ne,
+]
+
+# Database field addresses are beyond regular heap addresses, see qcode_push_addr_field
+DATABASE_ADDR_BASE = 1024 * 1024
+
+
+def _value_reader(instruction: tuple, bytes_strings: bool) -> Callable:
+    """Returns a function of (procedure, data_stack) returning the value the instruction pushes"""
+    if instruction[INSTR_HANDLER] in CONSTANT:
+        value = constant_value(instruction, bytes_strings)
+        return lambda procedure, data_stack: value
+
+    read = READERS[instruction[INSTR_OPCODE]]
+    offset = instruction[INSTR_OPERANDS][0]
+    return lambda procedure, data_stack: read(
+        data_stack, procedure.data_stack_frame_offset + offset
+    )
+
+
+def _fuse_local_cmp_if(
+    pc: int, instructions: list[tuple], bytes_strings: bool
+) -> Callable:
+    """LL+ VALUE CMP IF - compare a local with a value and jump if false"""
+    left, right, compare, branch = instructions
+    interpreted = left[INSTR_HANDLER]
+
+    read_left = READERS[left[INSTR_OPCODE]]
+    left_offset = left[INSTR_OPERANDS][0]
+    compare_operator = COMPARE_OPERATORS[(compare[INSTR_OPCODE] - 0x30) // 4]
+
+    # Jump offsets are relative to the start of the IF opcode
+    branch_pc = branch[INSTR_OPERAND_PC] - 1
+    jump_pc = branch_pc + branch[INSTR_OPERANDS][0]
+    fallthrough_pc = branch[INSTR_NEXT_PC]
+
+    if right[INSTR_HANDLER] in CONSTANT:
+        right_value = constant_value(right, bytes_strings)
+
+        def fused_local_cmp_const_if(procedure, data_stack, stack):
+            if procedure._op_code_trapped:
+                return interpreted(procedure, data_stack, stack)
+
+            if compare_operator(
+                read_left(data_stack, procedure.data_stack_frame_offset + left_offset),
+                right_value,
+            ):
+                procedure.set_program_counter(fallthrough_pc)
+            else:
+                procedure.set_program_counter(jump_pc)
+
+        return fused_local_cmp_const_if
+
+    read_right = READERS[right[INSTR_OPCODE]]
+    right_offset = right[INSTR_OPERANDS][0]
+
+    def fused_local_cmp_local_if(procedure, data_stack, stack):
+        if procedure._op_code_trapped:
+            return interpreted(procedure, data_stack, stack)
+
+        frame_offset = procedure.data_stack_frame_offset
+        if compare_operator(
+            read_left(data_stack, frame_offset + left_offset),
+            read_right(data_stack, frame_offset + right_offset),
+        ):
+            procedure.set_program_counter(fallthrough_pc)
+        else:
+            procedure.set_program_counter(jump_pc)
+
+    return fused_local_cmp_local_if
+
+
+def _fuse_local_update(
+    pc: int, instructions: list[tuple], bytes_strings: bool
+) -> Callable:
+    """LL= LL+ VALUE +/- STORE - a local updated by a value, e.g. i% = i% + 1"""
+    addr, left, right, arithmetic, store = instructions
+    interpreted = addr[INSTR_HANDLER]
+
+    addr_offset = addr[INSTR_OPERANDS][0]
+    read_left = READERS[left[INSTR_OPCODE]]
+    left_offset = left[INSTR_OPERANDS][0]
+    read_right = _value_reader(right, bytes_strings)
+    subtract = arithmetic[INSTR_HANDLER] is qcode_maths.qcode_cmp_minus
+    write_store = WRITERS[store[INSTR_OPCODE] - 0x84]
+    next_pc = store[INSTR_NEXT_PC]
+
+    def fused_local_update(procedure, data_stack, stack):
+        if procedure._op_code_trapped:
+            return interpreted(procedure, data_stack, stack)
+
+        frame_offset = procedure.data_stack_frame_offset
+
+        a = read_left(data_stack, frame_offset + left_offset)
+        b = read_right(procedure, data_stack)
+
+        write_store(
+            data_stack, a - b if subtract else a + b, frame_offset + addr_offset
+        )
+        procedure.set_program_counter(next_pc)
+
+    return fused_local_update
+
+
+def _fuse_local_assign(
+    pc: int, instructions: list[tuple], bytes_strings: bool
+) -> Callable:
+    """LL= VALUE STORE - a local assigned a value, e.g. i% = 0"""
+    addr, value, store = instructions
+    interpreted = addr[INSTR_HANDLER]
+
+    addr_offset = addr[INSTR_OPERANDS][0]
+    read_value = _value_reader(value, bytes_strings)
+    write_store = WRITERS[store[INSTR_OPCODE] - 0x84]
+    next_pc = store[INSTR_NEXT_PC]
+
+    def fused_local_assign(procedure, data_stack, stack):
+        if procedure._op_code_trapped:
+            return interpreted(procedure, data_stack, stack)
+
+        write_store(
+            data_stack,
+            read_value(procedure, data_stack),
+            procedure.data_stack_frame_offset + addr_offset,
+        )
+        procedure.set_program_counter(next_pc)
+
+    return fused_local_assign
+
+
+def _fuse_ee_unsigned_store(
+    pc: int, instructions: list[tuple], bytes_strings: bool
+) -> Callable:
+    """EE+ VALUE UADD/USUB STORE - an unsigned update of an external stored to the address on the stack"""
+    ee, value, unsigned, store = instructions
+    interpreted = ee[INSTR_HANDLER]
+
+    ee_operand_pc = ee[INSTR_OPERAND_PC]
+    read_value = _value_reader(value, bytes_strings)
+    subtract = unsigned[INSTR_HANDLER] is qcode_var.qcode_usub
+    store_op_code = store[INSTR_OPCODE]
+    write_store = WRITERS[store_op_code - 0x84]
+    next_pc = store[INSTR_NEXT_PC]
+
+    to_uint16 = lambda v: qcode_var.STRUCT_FORMAT_UINT16.unpack_from(
+        qcode_var.STRUCT_FORMAT_INT16.pack(v)
+    )[0]
+
+    def fused_ee_unsigned_store(procedure, data_stack, stack):
+        if procedure._op_code_trapped:
+            return interpreted(procedure, data_stack, stack)
+
+        # EE resolution (globals, externals and parameters) is left to the original handler
+        procedure.set_program_counter(ee_operand_pc)
+        qcode_var.qcode_push_ee_value(procedure, data_stack, stack)
+
+        x = to_uint16(stack.pop())
+        y = to_uint16(read_value(procedure, data_stack))
+        result = to_int16_address(x - y if subtract else x + y)
+
+        addr = stack.pop()
+        if addr >= DATABASE_ADDR_BASE:
+            # Database fields are stored by the original handler
+            stack.push(4, addr)
+            stack.push(0, result)
+            procedure._last_executed_opcode = store_op_code
+            qcode_var.qcode_store_pop1_in_pop2(procedure, data_stack, stack)
+        else:
+            write_store(data_stack, result, addr)
+
+        procedure.set_program_counter(next_pc)
+
+    return fused_ee_unsigned_store
+
+
+# Table of fused patterns, checked in order. Each is a name, the sets of handlers each instruction
+# of the sequence must match and a builder returning the superinstruction handler.
+FUSED_PATTERNS: list[tuple[str, tuple[set, ...], Callable]] = [
+    ("local_cmp_if", (LOCAL_VALUE, VALUE, COMPARE, BRANCH), _fuse_local_cmp_if),
+    (
+        "local_update",
+        (LOCAL_ADDR, LOCAL_VALUE, VALUE, ARITHMETIC, STORE),
+        _fuse_local_update,
+    ),
+    ("local_assign", (LOCAL_ADDR, VALUE, STORE), _fuse_local_assign),
+    (
+        "ee_unsigned_store",
+        (EE_VALUE, VALUE, UNSIGNED, STORE),
+        _fuse_ee_unsigned_store,
+    ),
+]
+
+MAX_PATTERN_LENGTH = max(len(pattern) for _, pattern, _ in FUSED_PATTERNS)
+
+
+def _instruction_sequence(
+    instructions: list[Optional[tuple]], pc: int, length: int
+) -> list[tuple]:
+    """Returns up to length decoded instructions following the fall through path from pc"""
+    sequence = []
+
+    while len(sequence) < length and pc is not None and pc < len(instructions):
+        instruction = instructions[pc]
+        if instruction is None or instruction[INSTR_HANDLER] is qcode_not_implemented:
+            break
+
+        sequence.append(instruction)
+        pc = instruction[INSTR_NEXT_PC]
+
+    return sequence
+
+
+def fuse_procedure(
+    instructions: list[Optional[tuple]], bytes_strings: bool = False
+) -> int:
+    """Replaces common instruction sequences in a decoded instruction stream with superinstructions,
+    string constants are bytes if bytes_strings.
+
+    Returns the number of sequences fused"""
+
+    fused_count = 0
+
+    for pc in range(len(instructions)):
+        if instructions[pc] is None:
+            continue
+
+        sequence = _instruction_sequence(instructions, pc, MAX_PATTERN_LENGTH)
+
+        for name, pattern, builder in FUSED_PATTERNS:
+            if len(sequence) < len(pattern):
+                continue
+
+            if not all(
+                instruction[INSTR_HANDLER] in handlers
+                for instruction, handlers in zip(sequence, pattern)
+            ):
+                continue
+
+            matched = sequence[: len(pattern)]
+            first = matched[0]
+
+            # The fused instruction keeps the opcode of the first instruction, handlers of that
+            # opcode which are called by the superinstruction rely on it
+            instructions[pc] = (
+                builder(pc, matched, bytes_strings),
+                first[INSTR_OPCODE],
+                first[INSTR_OPCODE_HINT],
+                first[INSTR_OPERAND_PC],
+                matched[-1][INSTR_NEXT_PC],
+                (name,),
+            )
+
+            fused_count += 1
+            break
+
+    return fused_count
@@ -0,0 +1,6 @@
+import os
+
+# Debug logging in the interpreter and opcode handlers is guarded by TRACE, so log messages are never
+# formatted unless tracing is enabled. The switch is read once from the environment (PYOPO_TRACE=1)
+# when the interpreter is imported, the logger level (logger.conf) still filters the output.
+TRACE = os.environ.get("PYOPO_TRACE", "") not in ("", "0")
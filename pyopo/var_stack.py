@@ -1,5 +1,11 @@
 from typing import Any
 
+# The operand stack used by an executable, one of STACK_IMPLEMENTATIONS
+STACK_IMPLEMENTATION = "typed"
+
+# Initial number of entries of the typed stack, it grows as required
+TYPED_STACK_CAPACITY = 256
+
 
 class stack:
     """The variable stack is a 2 variable tuple LIFO stack
@@ -14,23 +20,22 @@ class stack:
         4 - Addr
 
     Most (if not all) opcodes do not use the type information, as it is expected the compiler has already
-    performed type checking. It is however used for debugging purposes to diagnose incorrect opcode inputs.
+    performed type checking. It is however used for debugging purposes to diagnose incorrect opcode inputs,
+    see debug_stack.
     """
 
     def __init__(self):
         self.stack_frame: list[tuple[int, Any]] = []
 
+    def __len__(self) -> int:
+        return len(self.stack_frame)
+
     def pop(self) -> Any:
         """Pop the top variable value from the stack"""
-        assert len(self.stack_frame) > 0
-
         return self.stack_frame.pop()[1]
 
     def pop_n(self, n: int) -> tuple[Any, ...]:
         """Pops the top n variable values from the stack"""
-        assert n > 0
-        assert len(self.stack_frame) >= n
-
         popped_vals = [self.stack_frame.pop()[1] for _ in range(n)]
         popped_vals.reverse()
 
@@ -47,26 +52,136 @@ class stack:
 
         Note: For n=2 this function is faster than pop_n(2)
         """
-        assert len(self.stack_frame) > 0
-
         _, b = self.stack_frame.pop()
         _, a = self.stack_frame.pop()
         return (a, b)
 
     def pop_with_type(self) -> tuple[int, Any]:
         """Pop the top variable value from the stack as well as its type code"""
-        assert len(self.stack_frame) > 0
-
         return self.stack_frame.pop()
 
     def push(self, type: int, value: Any) -> None:
         """Push a value and its type code to the top of the stack"""
+        self.stack_frame.append((type, value))
+
+    def peek(self) -> tuple[int, Any]:
+        """Peek the top variable and its type code from the stack"""
+        return self.stack_frame[-1]
+
+
+class debug_stack(stack):
+    """The tuple stack, asserting the stack does not underflow and pushed values are typed"""
+
+    def pop(self) -> Any:
+        assert len(self.stack_frame) > 0
+
+        return super().pop()
+
+    def pop_n(self, n: int) -> tuple[Any, ...]:
+        assert n > 0
+        assert len(self.stack_frame) >= n
+
+        return super().pop_n(n)
+
+    def pop_2(self) -> tuple[Any, Any]:
+        assert len(self.stack_frame) > 1
+
+        return super().pop_2()
+
+    def pop_with_type(self) -> tuple[int, Any]:
+        assert len(self.stack_frame) > 0
+
+        return super().pop_with_type()
+
+    def push(self, type: int, value: Any) -> None:
         assert value is not None
         assert type is not None
         assert type >= 0 and type <= 4
 
-        self.stack_frame.append((type, value))
+        super().push(type, value)
+
+
+class typed_stack:
+    """The variable stack held as parallel preallocated lists of type codes and values.
+
+    Pushing and popping a value does not allocate a (type, value) tuple, entries above the top of the
+    stack are left in place and overwritten by later pushes. The interface is that of stack.
+    """
+
+    __slots__ = ("types", "values", "top")
+
+    def __init__(self, capacity: int = TYPED_STACK_CAPACITY):
+        self.types: list[int] = [0] * capacity
+        self.values: list[Any] = [0] * capacity
+
+        # Index of the next free entry
+        self.top = 0
+
+    def __len__(self) -> int:
+        return self.top
+
+    def grow(self) -> None:
+        """Doubles the capacity of the stack"""
+        capacity = len(self.values)
+        self.types.extend([0] * capacity)
+        self.values.extend([0] * capacity)
+
+    def pop(self) -> Any:
+        """Pop the top variable value from the stack"""
+        top = self.top - 1
+        if top < 0:
+            raise IndexError("pop from empty stack")
+
+        self.top = top
+        return self.values[top]
+
+    def pop_n(self, n: int) -> tuple[Any, ...]:
+        """Pops the top n variable values from the stack"""
+        top = self.top
+        if top < n:
+            raise IndexError("pop from empty stack")
+
+        self.top = top - n
+        return tuple(self.values[top - n : top])
+
+    def pop_2(self) -> tuple[Any, Any]:
+        """Returns the values of the top two stack entries, see stack.pop_2"""
+        top = self.top
+        if top < 2:
+            raise IndexError("pop from empty stack")
+
+        self.top = top - 2
+        values = self.values
+        return (values[top - 2], values[top - 1])
+
+    def pop_with_type(self) -> tuple[int, Any]:
+        """Pop the top variable value from the stack as well as its type code"""
+        top = self.top - 1
+        if top < 0:
+            raise IndexError("pop from empty stack")
+
+        self.top = top
+        return (self.types[top], self.values[top])
+
+    def push(self, type: int, value: Any) -> None:
+        """Push a value and its type code to the top of the stack"""
+        top = self.top
+        try:
+            self.values[top] = value
+        except IndexError:
+            self.grow()
+            self.values[top] = value
+
+        self.types[top] = type
+        self.top = top + 1
 
     def peek(self) -> tuple[int, Any]:
         """Peek the top variable and its type code from the stack"""
-        return self.stack_frame[-1]
+        top = self.top - 1
+        if top < 0:
+            raise IndexError("peek at empty stack")
+
+        return (self.types[top], self.values[top])
+
+
+STACK_IMPLEMENTATIONS = {"tuple": stack, "typed": typed_stack, "debug": debug_stack}
@@ -11,6 +11,8 @@ from functools import lru_cache
 import pygame
 from pygame.locals import *
 
+from .trace import TRACE
+
 logging.config.fileConfig(fname="logger.conf")
 _logger = logging.getLogger()
 # _logger.setLevel(logging.DEBUG)
@@ -316,8 +318,9 @@ class Window:
         bytepacked_width = data_size
         data_size *= img_height
 
-        _logger.debug(f"Width: {img_width}, Height = {img_height}")
-        _logger.debug(f"Data Size: {data_size}, Byte Width = {bytepacked_width}")
+        if TRACE:
+            _logger.debug(f"Width: {img_width}, Height = {img_height}")
+            _logger.debug(f"Data Size: {data_size}, Byte Width = {bytepacked_width}")
 
         # Write out image header (Image 1 - Black Plane)
         f.write(struct.pack("<H", 0))  # CRC of iamge data - Currently ignored
@@ -480,11 +483,13 @@ class Window:
 
     def gGMODE(self, mode: int) -> None:
         self.gGMODE_mode = mode
-        _logger.debug(f"gGMODE = {mode}")
+        if TRACE:
+            _logger.debug(f"gGMODE = {mode}")
 
     def gTMODE(self, mode: int) -> None:
         self.gTMODE_mode = mode
-        _logger.debug(f"gTMODE = {mode}")
+        if TRACE:
+            _logger.debug(f"gTMODE = {mode}")
 
     def gVISIBLE(self, mode: int) -> None:
         self.visible = mode
@@ -951,19 +956,22 @@ class Window:
 
 
 class WindowManager:
-    def __init__(self, executable, width=480, height=160) -> None:
+    def __init__(self, executable, width=480, height=160, headless=False) -> None:
         self.width = width
         self.height = height
 
         self.executable = executable
 
+        # When headless there is no display, windows are only rendered to off-screen buffers
+        self.headless = headless
+
         _logger.info("Initialising Display")
         self.init_sdl(width, height)
 
         self.default_font = pygame.font.SysFont("arial", 10)
         self.default_font_bold = pygame.font.SysFont("arial", 10, bold=True)
 
-        pygame.display.set_caption(
+        self.set_window_name(
             executable.header.source_filename.split("\\")[-1].replace("\0", "")
         )
 
@@ -1092,10 +1100,11 @@ class WindowManager:
             bmp_offset + 12 + struct.unpack_from("<L", bytes, bmp_offset + 8)[0]
         )
 
-        _logger.debug("Creating surface from binary stream")
-        _logger.debug(f" - Width: {width}")
-        _logger.debug(f" - Height: {height}")
-        _logger.debug(f" - Data Offset: {data_offset}")
+        if TRACE:
+            _logger.debug("Creating surface from binary stream")
+            _logger.debug(f" - Width: {width}")
+            _logger.debug(f" - Height: {height}")
+            _logger.debug(f" - Data Offset: {data_offset}")
 
         bitmap_surface = pygame.Surface((width, height))
         bitmap_surface.fill((255, 255, 255, 255))
@@ -1107,7 +1116,8 @@ class WindowManager:
             # The byte width is rounded up to an even number
             byte_width += 1
 
-        _logger.debug(f"Byte Width: {byte_width}")
+        if TRACE:
+            _logger.debug(f"Byte Width: {byte_width}")
 
         bmp_d_off = data_offset
         for h in range(height):
@@ -1128,7 +1138,7 @@ class WindowManager:
 
     def GIPRINT(self, prompt: str, c: int) -> None:
         self.giprint = {
-            "start_ts": datetime.datetime.now(),
+            "start_ts": self.executable.clock.now(),
             "prompt": prompt,
             "location": c,
         }
@@ -1153,20 +1163,105 @@ class WindowManager:
         self.windows.pop(index_to_pop)
 
     def init_sdl(self, width: int, height: int) -> None:
-        pygame.init()
-
         debugger_height = 0
         if self.executable.memory_debugger:
             # There is a memory debugger to visualise too
             debugger_height = height * OPO_WINDOW_SCALE
 
         size = (width * OPO_WINDOW_SCALE, height * OPO_WINDOW_SCALE + debugger_height)
-        self.screen_render_surface = pygame.display.set_mode(size)
+
+        if self.headless:
+            # Only the font module is required to render off-screen, no display is created
+            pygame.font.init()
+            self.screen_render_surface = pygame.Surface(size)
+        else:
+            pygame.init()
+            self.screen_render_surface = pygame.display.set_mode(size)
 
         # This is the buffer surface all others will blit onto
         self.screen_buffer = pygame.Surface((width, height))
 
     def composite(self, executable, force=False):
+        if self.headless:
+            # There is no display to present to, the screen buffer is composited on demand
+            return
+
+        self.composite_screen_buffer(executable, force)
+
+        # Scale the screen
+        scaled_surface = pygame.transform.scale(
+            self.screen_buffer,
+            (self.screen_render_surface.get_width(), self.height * OPO_WINDOW_SCALE),
+        )
+
+        # Blit onto the render surface
+        self.screen_render_surface.blit(
+            scaled_surface,
+            (0, 0, self.screen_render_surface.get_width(), scaled_surface.get_height()),
+        )
+
+        if executable.memory_debugger:
+            # Composite the debugger if required
+            executable.memory_debugger.composite()
+
+            # Render the memory debugger onto the graphics surface too
+            scaled_surface = pygame.transform.scale(
+                executable.memory_debugger.debug_surface,
+                (
+                    self.screen_render_surface.get_width(),
+                    self.height * OPO_WINDOW_SCALE,
+                ),
+            )
+
+            self.screen_render_surface.blit(
+                scaled_surface,
+                (
+                    0,
+                    self.height * OPO_WINDOW_SCALE,
+                    self.screen_render_surface.get_width(),
+                    scaled_surface.get_height(),
+                ),
+            )
+
+        pygame.display.flip()
+
+        self.last_render_time = datetime.datetime.now()
+
+    def draw_pending(self) -> bool:
+        """Returns if anything has been drawn since the screen was last composited, never when headless
+        as there is no screen to present to"""
+        if self.headless:
+            return False
+
+        return self.update_required or any(w.update_required for w in self.windows)
+
+    def next_deadline(self) -> Optional[float]:
+        """Returns the seconds until the screen next changes without drawing (a sprite animation frame or
+        GIPRINT expiring), None if it only changes when drawn to"""
+        deadlines = []
+
+        if DrawableSprite.draw_sprite:
+            # Sprites are animated in tenths of a second
+            deadlines.append(0.1)
+
+        if self.giprint:
+            shown = self.executable.clock.now() - self.giprint["start_ts"]
+            deadlines.append(max(0.0, 2.0 - shown.total_seconds()))
+
+        return min(deadlines, default=None)
+
+    def expire_giprint(self) -> None:
+        """Closes the GIPRINT once it has been shown for 2 seconds, redrawing the screen without it"""
+        if self.giprint and self.executable.clock.now() - self.giprint[
+            "start_ts"
+        ] > datetime.timedelta(seconds=2):
+            self.giprint = None
+            self.update_required = True
+
+    def composite_screen_buffer(self, executable, force=False) -> None:
+        """Composites the windows, sprites, dialogs and menus onto the unscaled screen buffer"""
+        self.expire_giprint()
+
         windows_update_required = self.gupdate_enabled and next(
             (True for w in self.windows if w.update_required), False
         )
@@ -1332,49 +1427,6 @@ class WindowManager:
                             font_surface, (self.width - font_surface.get_width() - 2, 2)
                         )
 
-                if datetime.datetime.now() - self.giprint[
-                    "start_ts"
-                ] > datetime.timedelta(seconds=2):
-                    # Close GIPRINT
-                    self.giprint = None
-
-        # Scale the screen
-        scaled_surface = pygame.transform.scale(
-            self.screen_buffer,
-            (self.screen_render_surface.get_width(), self.height * OPO_WINDOW_SCALE),
-        )
-
-        # Blit onto the render surface
-        self.screen_render_surface.blit(
-            scaled_surface,
-            (0, 0, self.screen_render_surface.get_width(), scaled_surface.get_height()),
-        )
-
-        if executable.memory_debugger:
-            # Composite the debugger if required
-            executable.memory_debugger.composite()
-
-            # Render the memory debugger onto the graphics surface too
-            scaled_surface = pygame.transform.scale(
-                executable.memory_debugger.debug_surface,
-                (
-                    self.screen_render_surface.get_width(),
-                    self.height * OPO_WINDOW_SCALE,
-                ),
-            )
-
-            self.screen_render_surface.blit(
-                scaled_surface,
-                (
-                    0,
-                    self.height * OPO_WINDOW_SCALE,
-                    self.screen_render_surface.get_width(),
-                    scaled_surface.get_height(),
-                ),
-            )
-
-        pygame.display.flip()
-
     def gUSE(self, id: int) -> None:
         for i in range(len(self.windows)):
             if self.windows[i].ID == id:
@@ -1571,11 +1623,14 @@ class WindowManager:
 
     def get_window_name(self) -> str:
         self.update_required = True
-        return pygame.display.get_caption()[0]
+        return self.window_name
 
     def set_window_name(self, name: str) -> None:
         self.update_required = True
-        pygame.display.set_caption(name)
+        self.window_name = name
+
+        if not self.headless:
+            pygame.display.set_caption(name)
 
     @lru_cache(maxsize=1024)
     def create_text_surface(
@@ -1629,7 +1684,7 @@ class WindowManager:
 
         sprite = DrawableSprite._sprites[DrawableSprite._current_sprite]
 
-        sprite.start_time_tenths = int(datetime.datetime.now().timestamp()) * 10
+        sprite.start_time_tenths = int(self.executable.clock.now().timestamp()) * 10
         sprite.xpos = dx
         sprite.ypos = dy
 
@@ -1650,7 +1705,8 @@ class WindowManager:
 
         # Check to see if the animation idx needs incrementing
         tenths_delta = (
-            int(datetime.datetime.now().timestamp()) * 10 - sprite.start_time_tenths
+            int(self.executable.clock.now().timestamp()) * 10
+            - sprite.start_time_tenths
         )
 
         # mod it to the max timespan